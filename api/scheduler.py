@@ -0,0 +1,40 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from services.metrics import metrics
+
+MAX_CONCURRENT_REQUESTS = 4
+
+
+class RateLimiter:
+    """Spaces out request start times. One instance is shared by every API client in the process."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.last_request_time = 0
+        self.lock = Lock()
+
+    def wait(self):
+        start = time.perf_counter()
+        with self.lock:
+            elapsed = time.time() - self.last_request_time
+            if elapsed < self.delay:
+                time.sleep(self.delay - elapsed)
+            self.last_request_time = time.time()
+        metrics.observe("rate_limiter_wait_seconds", time.perf_counter() - start)
+
+
+shared_limiter = RateLimiter(0.34)
+
+_pool = None
+_pool_lock = Lock()
+
+
+def request_pool():
+    """Thread pool for running API calls concurrently. Requests still go out at the shared rate limit,
+    but their latencies overlap instead of adding up."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS, thread_name_prefix="wfm-request")
+        return _pool
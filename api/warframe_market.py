@@ -1,11 +1,25 @@
-import requests
+import json
+import os
 import time
-from threading import Lock
+import requests
 from datetime import datetime
+from api.scheduler import shared_limiter
+from services.metrics import metrics
 
 class WarframeMarketAPI:
-    ITEMS_URL_V2 = "https://api.warframe.market/v2/items"
-    ORDERS_URL_V2 = "https://api.warframe.market/v2/orders/item/{url_name}"
+    # Point TENNOFLIP_API_URL (or base_url) at tools/fake_market_server.py to work offline.
+    DEFAULT_BASE_URL = "https://api.warframe.market"
+    ITEMS_PATH_V2 = "/v2/items"
+    ORDERS_PATH_V2 = "/v2/orders/item/{url_name}"
+    ITEM_PATH_V2 = "/v2/items/{url_name}"
+    ITEM_PATH_V1 = "/v1/items/{url_name}"
+
+    # How often a 429 is waited out (per its Retry-After header) before it is treated as an error
+    RATE_LIMIT_RETRIES = 3
+    MAX_RETRY_AFTER = 10.0
+    
+    # Catalog fields that get_items() maps to their own keys; the rest is kept under "meta"
+    ITEM_FIELDS = ("id", "slug", "en", "i18n", "thumb", "tags", "maxRank", "max_rank", "ducats", "tradingTax", "trading_tax", "vaulted")
     
     HEADERS = {
         "Platform": "pc",
@@ -15,12 +29,13 @@ class WarframeMarketAPI:
         "Referer": "https://warframe.market/"
     }
     
-    def __init__(self):
+    def __init__(self, limiter=None, base_url=None):
+        self.base_url = (base_url or os.environ.get("TENNOFLIP_API_URL") or self.DEFAULT_BASE_URL).rstrip("/")
+        self.items_url = self.base_url + self.ITEMS_PATH_V2
         self.session = requests.Session()
         self.session.headers.update(self.HEADERS)
-        self.last_request_time = 0
-        self.rate_limit_delay = 0.34
-        self.lock = Lock()
+        # Every tab, popup and scan shares one limiter so together they stay under the API limit.
+        self.limiter = limiter or shared_limiter
 
     def _log_call(self, url, status_code=None):
         timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
@@ -30,20 +45,35 @@ class WarframeMarketAPI:
             print(f"[{timestamp}] API REQUEST: GET | URL: {url}")
 
     def _wait_for_rate_limit(self):
-        with self.lock:
-            current_time = time.time()
-            elapsed = current_time - self.last_request_time
-            if elapsed < self.rate_limit_delay:
-                time.sleep(self.rate_limit_delay - elapsed)
-            self.last_request_time = time.time()
+        self.limiter.wait()
+
+    def _get(self, url, endpoint):
+        """GET with logging. Waits out 429 responses a few times before handing them back."""
+        for attempt in range(self.RATE_LIMIT_RETRIES + 1):
+            self._log_call(url)
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url)
+            except requests.RequestException:
+                metrics.observe("api_request_seconds", time.perf_counter() - start, endpoint=endpoint, status="error")
+                raise
+            metrics.observe("api_request_seconds", time.perf_counter() - start, endpoint=endpoint, status=response.status_code)
+            self._log_call(url, response.status_code)
+            if response.status_code != 429 or attempt == self.RATE_LIMIT_RETRIES:
+                return response
+            try:
+                retry_after = float(response.headers.get("Retry-After", 1))
+            except ValueError:
+                retry_after = 1.0
+            time.sleep(min(max(retry_after, 0.0), self.MAX_RETRY_AFTER))
+            self._wait_for_rate_limit()
+        return response
 
     def get_items(self):
         """Fetches all items from the API."""
         self._wait_for_rate_limit()
         try:
-            self._log_call(self.ITEMS_URL_V2)
-            response = self.session.get(self.ITEMS_URL_V2)
-            self._log_call(self.ITEMS_URL_V2, response.status_code)
+            response = self._get(self.items_url, "items")
             response.raise_for_status()
             data = response.json()
             items = []
@@ -54,56 +84,68 @@ class WarframeMarketAPI:
                     "item_name": i.get("en", {}).get("item_name", i.get("slug").replace("_", " ").title()),
                     "thumb": i.get("thumb"),
                     "tags": i.get("tags", []),
-                    "max_rank": i.get("max_rank", -1)
+                    "max_rank": i.get("maxRank", i.get("max_rank", -1)),
+                    "ducats": i.get("ducats"),
+                    "trading_tax": i.get("tradingTax", i.get("trading_tax")),
+                    "vaulted": i.get("vaulted"),
+                    # Everything else the catalog sends, minus the bulky translations
+                    "meta": {k: v for k, v in i.items() if k not in self.ITEM_FIELDS}
                 })
             return items
         except requests.RequestException as e:
             print(f"Error fetching items (V2): {e}")
             return []
 
-    def get_orders(self, url_name):
-        """Fetches active orders for a specific item."""
+    @staticmethod
+    def parse_orders(body):
+        """Turns a raw orders response body into order dicts with the V1 field names added."""
+        if not body:
+            return []
+        orders = json.loads(body).get("data", [])
+        
+        normalized_orders = []
+        for o in orders:
+            normalized = o.copy()
+            if "type" in o and "order_type" not in o:
+                normalized["order_type"] = o["type"]
+            if "rank" in o and "mod_rank" not in o:
+                normalized["mod_rank"] = o["rank"]
+            normalized_orders.append(normalized)
+            
+        return normalized_orders
+
+    def get_orders_raw(self, url_name):
+        """Downloads the orders of an item without decoding them; b"" if the item is unknown.
+
+        For handing the body to another process (see services.price_pool). Errors are raised.
+        """
         self._wait_for_rate_limit()
-        url = self.ORDERS_URL_V2.format(url_name=url_name)
+        url = self.base_url + self.ORDERS_PATH_V2.format(url_name=url_name)
+        response = self._get(url, "orders")
+        if response.status_code == 404:
+            return b""
+        response.raise_for_status()
+        return response.content
+
+    def get_orders(self, url_name, raise_errors=False):
+        """Fetches active orders for a specific item. Network errors return [] unless raise_errors is set."""
         try:
-            self._log_call(url)
-            response = self.session.get(url)
-            self._log_call(url, response.status_code)
-            if response.status_code == 404:
-                return []
-            response.raise_for_status()
-            
-            data = response.json()
-            orders = data.get("data", [])
-            
-            normalized_orders = []
-            for o in orders:
-                normalized = o.copy()
-                if "type" in o and "order_type" not in o:
-                    normalized["order_type"] = o["type"]
-                if "rank" in o and "mod_rank" not in o:
-                    normalized["mod_rank"] = o["rank"]
-                normalized_orders.append(normalized)
-                
-            return normalized_orders
-            
-        except requests.RequestException as e:
+            return self.parse_orders(self.get_orders_raw(url_name))
+        except (requests.RequestException, ValueError) as e:
+            if raise_errors:
+                raise
             print(f"Error fetching orders for {url_name}: {e}")
             return []
 
     def get_item_details(self, url_name):
         """Fetches detailed information about a specific item, including set parts if any."""
         self._wait_for_rate_limit()
-        url = f"https://api.warframe.market/v2/items/{url_name}" 
+        url = self.base_url + self.ITEM_PATH_V2.format(url_name=url_name)
         try:
-            self._log_call(url)
-            response = self.session.get(url)
-            self._log_call(url, response.status_code)
+            response = self._get(url, "item")
             if response.status_code == 404:
-                 url_v1 = f"https://api.warframe.market/v1/items/{url_name}"
-                 self._log_call(url_v1)
-                 response = self.session.get(url_v1)
-                 self._log_call(url_v1, response.status_code)
+                 url_v1 = self.base_url + self.ITEM_PATH_V1.format(url_name=url_name)
+                 response = self._get(url_v1, "item_v1")
             
             response.raise_for_status()
             data = response.json()
@@ -134,7 +176,8 @@ class WarframeMarketAPI:
                     "slug": slug,
                     "url_name": slug,
                     "item_name": name,
-                    "en": {"item_name": name}
+                    "en": {"item_name": name},
+                    "quantity": item.get("quantityInSet") or item.get("quantity_for_set") or 1
                 })
             return normalized_set
             
@@ -1,3 +1,5 @@
+import argparse
+import multiprocessing
 import sys
 import os
 from PySide6.QtWidgets import QApplication
@@ -5,7 +7,18 @@ from PySide6.QtGui import QIcon
 from ui.main_window import MainWindow
 
 def main():
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(prog="tennoflip")
+    parser.add_argument("--profile", nargs="?", const="", metavar="DIR",
+                        help="Profile the session and write a report to DIR (defaults to profiles/<timestamp>) on exit.")
+    parser.add_argument("--profile-memory", action="store_true", help="With --profile, also track peak memory (much slower).")
+    args, qt_args = parser.parse_known_args()
+
+    profiler = None
+    if args.profile is not None:
+        from services.profiler import SamplingProfiler, default_output_dir
+        profiler = SamplingProfiler(args.profile or default_output_dir(), memory=args.profile_memory).start()
+
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setApplicationName("Tenno Flip")
     
     # Set app icon
@@ -16,7 +29,13 @@ def main():
     window = MainWindow()
     window.show()
     
-    sys.exit(app.exec())
+    code = app.exec()
+    if profiler:
+        print(profiler.stop())
+        print(f"Profile written to {profiler.output_dir}")
+    sys.exit(code)
 
 if __name__ == "__main__":
+    # Price pool workers of a frozen build start this executable again; let them be workers.
+    multiprocessing.freeze_support()
     main()
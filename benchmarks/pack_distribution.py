@@ -0,0 +1,78 @@
+"""Times the pack return distribution used by the Arcane Packs tab.
+
+    python benchmarks/pack_distribution.py                 # cached prices from cache.db
+    python benchmarks/pack_distribution.py --synthetic     # random prices, no database needed
+    python benchmarks/pack_distribution.py --samples 200000
+
+Reports how long the exact convolution takes for every pack (what happens on each price update)
+and how far a Monte Carlo run of the same packs lands from the exact numbers.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from services import pack_distribution
+from services.vosfor_calculator import VosforCalculator
+
+
+def load_calculator(synthetic, seed):
+    if synthetic:
+        # Every slug stands in for its own item id; nothing touches the API or the database.
+        calc = VosforCalculator(api=object(), db=object())
+        slugs = {slug for pack in calc.definitions.load().values() for tier in pack['tiers'].values() for slug in tier}
+        calc.load_definitions(items=[{"id": slug, "url_name": slug} for slug in slugs])
+        rng = random.Random(seed)
+        calc.prices = {slug: {"avg": rng.uniform(3, 80), "cheapest": rng.uniform(2, 60)} for slug in sorted(slugs)}
+        calc.rebuild_tier_sums()
+        return calc
+    calc = VosforCalculator()
+    calc.load_prices()
+    return calc
+
+
+def time_it(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", action="store_true", help="Use random prices instead of the cache database.")
+    parser.add_argument("--samples", type=int, default=100000, help="Monte Carlo samples per pack.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    calc = load_calculator(args.synthetic, args.seed)
+    names = list(calc.packs)
+
+    exact_time = time_it(lambda: [calc.pack_risk(n, mode) for n in names for mode in calc.MODES], args.runs)
+    print(f"exact, {len(names)} packs x {len(calc.MODES)} modes: {exact_time * 1000:8.2f} ms")
+
+    mc_time = time_it(lambda: [calc.pack_risk(n, method="monte_carlo", samples=args.samples, seed=args.seed) for n in names], 1)
+    print(f"monte carlo, {len(names)} packs, {args.samples} samples each: {mc_time * 1000:8.2f} ms")
+
+    print(f"\n{'Pack':<24}{'mean':>9}{'mean MC':>9}{'std':>8}{'std MC':>8}{'P(loss)':>9}{'MC':>8}")
+    for name in names:
+        ex = calc.pack_risk(name)
+        mc = calc.pack_risk(name, method="monte_carlo", samples=args.samples, seed=args.seed)
+        print(f"{name:<24}{ex['mean']:>9.2f}{mc['mean']:>9.2f}{ex['std']:>8.2f}{mc['std']:>8.2f}"
+              f"{ex['p_loss']:>9.3f}{mc['p_loss']:>8.3f}")
+
+    single = pack_distribution.draw_distribution(calc.pack_tiers(names[0]))
+    print(f"\nLargest single-draw support: {max(len(pack_distribution.draw_distribution(calc.pack_tiers(n))) for n in names)} values "
+          f"(first pack: {len(single)} values, {len(pack_distribution.sum_distribution(single))} after 3 draws)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Compares full order-book snapshots with keyframe + delta snapshots.
+
+    python benchmarks/snapshots.py                         # replays the books in data/snapshots.db
+    python benchmarks/snapshots.py --source other.db       # ... or in another recorded archive
+    python benchmarks/snapshots.py --synthetic             # simulated books, no recording needed
+
+Every recorded book is written again, in order, into a store that keeps only full snapshots and
+into one that uses deltas. Reports stored bytes per refresh and how long reading a book back at a
+random timestamp takes.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data.snapshots import SnapshotStore, KEYFRAME_INTERVAL, orders_to_rows
+
+
+def recorded_books(path):
+    """[(item_id, item_type, timestamp, orders)] of every snapshot in an archive, oldest first."""
+    store = SnapshotStore(path)
+    cursor = store.conn.cursor()
+    cursor.execute("SELECT item_id, item_type, timestamp FROM snapshots ORDER BY timestamp")
+    books = [(item_id, item_type, ts, store.get_orders(item_id, ts)) for item_id, item_type, ts in cursor.fetchall()]
+    store.close()
+    return books
+
+
+def synthetic_books(items, refreshes, churn, seed):
+    """Order books that drift between refreshes: some orders leave, some are repriced, new ones arrive."""
+    rng = random.Random(seed)
+
+    def new_order():
+        return {"id": "%024x" % rng.getrandbits(96), "order_type": rng.choice(("sell", "sell", "buy")),
+                "platinum": rng.randint(1, 400), "mod_rank": rng.choice((None, 0, 0, 5)),
+                "user": {"status": rng.choice(("ingame", "online", "offline"))}}
+
+    state = {f"item{i:04d}": [new_order() for _ in range(rng.randint(20, 200))] for i in range(items)}
+    books = []
+    ts = 1_700_000_000.0
+    for _ in range(refreshes):
+        for item_id, orders in state.items():
+            orders = [o for o in orders if rng.random() > churn]
+            orders = [dict(o, platinum=max(1, o["platinum"] + rng.randint(-5, 5))) if rng.random() < churn else o
+                      for o in orders]
+            orders += [new_order() for _ in range(int(len(orders) * churn) + 1)]
+            state[item_id] = orders
+            ts += 1
+            books.append((item_id, "part", ts, [dict(o) for o in orders]))
+    return books
+
+
+def run(books, keyframe_interval, lookups, seed):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SnapshotStore(os.path.join(tmp, "bench.db"), keyframe_interval=keyframe_interval)
+        start = time.perf_counter()
+        for item_id, item_type, ts, orders in books:
+            store.save(item_id, item_type, orders, ts)
+        write_time = time.perf_counter() - start
+        stats = store.stats()
+
+        rng = random.Random(seed)
+        samples = []
+        for item_id, _, ts, orders in rng.sample(books, min(lookups, len(books))):
+            start = time.perf_counter()
+            rebuilt = store.get_orders(item_id, ts)
+            samples.append(time.perf_counter() - start)
+            # Compare the fields the store keeps (id, platinum, rank, side, status), not just the count.
+            if sorted(orders_to_rows(rebuilt)) != sorted(orders_to_rows(orders)):
+                raise RuntimeError(f"Reconstruction mismatch for {item_id} at {ts}")
+
+        start = time.perf_counter()
+        latest = sum(1 for _ in store.iter_latest())
+        latest_time = time.perf_counter() - start
+        store.close()
+
+    return {
+        "bytes_per_refresh": stats["bytes"] / max(1, stats["snapshots"]),
+        "keyframes": stats["keyframes"],
+        "write_ms": write_time * 1000 / max(1, len(books)),
+        "lookup_ms": statistics.median(samples) * 1000 if samples else 0.0,
+        "lookup_p95_ms": sorted(samples)[int(len(samples) * 0.95)] * 1000 if samples else 0.0,
+        "latest_ms": latest_time * 1000,
+        "items": latest
+    }
+
+
+def report(label, r):
+    print(f"{label:>6}: {r['bytes_per_refresh']:8.0f} B/refresh | {r['keyframes']:5} keyframes | "
+          f"write {r['write_ms']:6.2f} ms | lookup {r['lookup_ms']:6.2f} ms (p95 {r['lookup_p95_ms']:6.2f}) | "
+          f"latest of {r['items']} items {r['latest_ms']:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", help="Recorded archive to replay (defaults to data/snapshots.db).")
+    parser.add_argument("--synthetic", action="store_true", help="Simulate books instead of replaying a recording.")
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--refreshes", type=int, default=24)
+    parser.add_argument("--churn", type=float, default=0.05, help="Share of orders that change per refresh.")
+    parser.add_argument("--keyframe-interval", type=int, default=KEYFRAME_INTERVAL)
+    parser.add_argument("--lookups", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        books = synthetic_books(args.items, args.refreshes, args.churn, args.seed)
+    else:
+        source = args.source or os.path.join(ROOT, "data", "snapshots.db")
+        if not os.path.exists(source):
+            parser.error(f"{source} does not exist; record one with `cli.py scan --snapshots` or use --synthetic")
+        books = recorded_books(source)
+    if not books:
+        parser.error("No order books to replay")
+
+    print(f"Replaying {len(books)} order books of {len({b[0] for b in books})} items")
+    full = run(books, 1, args.lookups, args.seed)
+    delta = run(books, args.keyframe_interval, args.lookups, args.seed)
+    report("full", full)
+    report("delta", delta)
+    print(f"Delta storage is {full['bytes_per_refresh'] / max(1, delta['bytes_per_refresh']):.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Measures time-to-first-paint of the main window.
+
+    python benchmarks/startup.py               # lazy pages (current behaviour)
+    python benchmarks/startup.py --eager       # build every page up front, like before
+    python benchmarks/startup.py --compare     # run both and print the difference
+
+Every run happens in a fresh process so import time is included. Set QT_QPA_PLATFORM=offscreen
+to run it without a display.
+"""
+import time
+
+_STARTED = time.perf_counter()
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child(eager):
+    sys.path.insert(0, ROOT)
+    from PySide6.QtCore import QObject, QEvent
+    from PySide6.QtWidgets import QApplication
+
+    app = QApplication(sys.argv[:1])
+    imported = time.perf_counter()
+
+    from ui.main_window import MainWindow
+
+    class FirstPaint(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint and obj is window:
+                painted = time.perf_counter()
+                print(json.dumps({
+                    "qt_import": imported - _STARTED,
+                    "window_built": built - _STARTED,
+                    "first_paint": painted - _STARTED
+                }), flush=True)
+                # Fetcher threads may still be running; there is nothing to clean up in a benchmark.
+                os._exit(0)
+            return False
+
+    window = MainWindow()
+    if eager:
+        window.build_all_pages()
+    built = time.perf_counter()
+
+    paint_filter = FirstPaint()
+    window.installEventFilter(paint_filter)
+    window.show()
+    app.exec()
+
+
+def measure(eager, runs):
+    samples = []
+    for _ in range(runs):
+        cmd = [sys.executable, os.path.abspath(__file__), "--child"] + (["--eager"] if eager else [])
+        out = subprocess.run(cmd, capture_output=True, text=True, timeout=120, cwd=ROOT)
+        lines = [l for l in out.stdout.splitlines() if l.startswith("{")]
+        if not lines:
+            raise RuntimeError(f"Benchmark child failed:\n{out.stderr}")
+        samples.append(json.loads(lines[-1]))
+    return {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+
+
+def report(label, result):
+    print(f"{label:>6}: first paint {result['first_paint'] * 1000:7.1f} ms | "
+          f"window built {result['window_built'] * 1000:7.1f} ms | Qt import {result['qt_import'] * 1000:6.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--eager", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.eager)
+        return
+
+    if args.compare:
+        eager = measure(True, args.runs)
+        lazy = measure(False, args.runs)
+        report("eager", eager)
+        report("lazy", lazy)
+        print(f"Speedup: {eager['first_paint'] / lazy['first_paint']:.2f}x")
+    else:
+        report("eager" if args.eager else "lazy", measure(args.eager, args.runs))
+
+
+if __name__ == "__main__":
+    main()
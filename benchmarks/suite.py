@@ -0,0 +1,435 @@
+"""End-to-end benchmarks for the pricing, database, scan and table hot paths.
+
+    python benchmarks/suite.py                                   # everything, printed
+    python benchmarks/suite.py --only pricing database           # some groups
+    python benchmarks/suite.py --output before.json              # save the results
+    python benchmarks/suite.py --baseline before.json            # run and compare against a saved run
+    python benchmarks/suite.py --compare before.json after.json  # compare two saved runs, run nothing
+
+Everything runs on a synthetic catalog (tools/fake_market_server.py) in a temporary database, so
+nothing touches cache.db or the real API. Scans go through a local fake server with
+`--latency` ms per request. The ui group needs PySide6 and runs offscreen.
+
+Comparisons look at each benchmark's median and exit with 1 when one got slower than
+`--threshold` (default 15%), so it can gate a change in a script.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data.database import Database
+from services.order_stream import OrderBook, normalize_order
+from services.price_calculator import PriceCalculator
+from services.price_pool import PricePool
+from tools.fake_market_server import FakeMarket, FakeMarketServer, synthetic_catalog, synthetic_orders
+
+GROUPS = ("pricing", "database", "ui", "scan")
+
+
+def measure(fn, runs, warmup=1):
+    """Median / p95 / min wall time of fn() in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {"median_ms": statistics.median(samples), "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+            "min_ms": samples[0], "runs": runs}
+
+
+def book(rng, arcane, size):
+    """A synthetic order book in the get_orders() shape."""
+    return [normalize_order(o) for o in synthetic_orders(rng, arcane, 5, size)]
+
+
+class Context:
+    """The synthetic catalog and a temporary cache.db with `history` price rows per item."""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmp.name, "cache.db")
+        self.items, self.set_parts = synthetic_catalog(args.arcanes, args.sets, args.seed)
+        self.db = Database(self.db_file)
+        self.db.save_items(self.items)
+        self.catalog = self.db.get_all_items()
+        self.arcanes = [i for i in self.catalog if i['item_type'] == 'arcane']
+        self.sets = [i for i in self.catalog if 'set' in i['tags']]
+        self.parts = [i for i in self.catalog if 'component' in i['tags']]
+        self.history_seconds = self.seed_history()
+
+    def price_rows(self, ts):
+        rng = self.rng
+        arcanes = [(i['id'], 5, rng.uniform(5, 80), rng.uniform(100, 1500), rng.uniform(-50, 200),
+                    rng.uniform(5, 80), rng.uniform(100, 1500), rng.uniform(-50, 200), ts) for i in self.arcanes]
+        sets = [(i['id'], rng.uniform(20, 300), rng.uniform(20, 300), ts) for i in self.sets]
+        parts = [(i['id'], rng.uniform(2, 80), rng.uniform(2, 80), ts) for i in self.parts]
+        return arcanes, sets, parts
+
+    def seed_history(self):
+        start = time.perf_counter()
+        ts = time.time() - self.args.history * 3600
+        for step in range(self.args.history):
+            arcanes, sets, parts = self.price_rows(ts + step * 3600)
+            self.db.replace_prices(arcanes=arcanes, sets=sets, parts=parts)
+        return time.perf_counter() - start
+
+    def close(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+
+def bench_pricing(ctx, args):
+    rng = random.Random(args.seed)
+    arcane_books = [book(rng, True, rng.randint(150, 600)) for _ in range(20)]
+    item_books = [book(rng, False, rng.randint(30, 150)) for _ in range(20)]
+    results = {
+        "pricing.summarize_arcane": measure(lambda: [PriceCalculator.summarize_arcane(b) for b in arcane_books], args.runs),
+        "pricing.summarize_item": measure(lambda: [PriceCalculator.summarize_item(b) for b in item_books], args.runs),
+        "pricing.calculate_rank_prices": measure(
+            lambda: [PriceCalculator.calculate_rank_prices(b, "arcane") for b in arcane_books], args.runs),
+    }
+
+    # One order changing in a live book (services.order_stream) against pricing the whole book again.
+    live = OrderBook('arcane')
+    live.replace(arcane_books[0])
+    ids = list(live.orders)
+
+    def update_one():
+        order = dict(live.orders[rng.choice(ids)])
+        order["platinum"] = max(1, order["platinum"] + rng.randint(-5, 5))
+        live.upsert(order)
+        live.summary()
+
+    results["pricing.order_book_update"] = measure(update_one, args.runs * 20)
+    for name in ("pricing.summarize_arcane", "pricing.summarize_item", "pricing.calculate_rank_prices"):
+        results[name]["per_book_us"] = results[name]["median_ms"] * 1000 / 20
+
+    # Raw response bodies decoded and priced on this thread, then across --processes workers.
+    jobs = []
+    for i in range(args.pool_books):
+        arcane = i % 2 == 0
+        body = json.dumps({"data": synthetic_orders(rng, arcane, 5, rng.randint(30, 300))}).encode()
+        jobs.append((i, "json", body, "arcane" if arcane else "set", 5))
+    for name, processes in (("pricing.parse_and_price", 0), ("pricing.price_pool", args.processes)):
+        with PricePool(processes) as pool:
+            results[name] = measure(lambda: list(pool.map(jobs)), max(1, args.runs // 2))
+        results[name]["books"] = len(jobs)
+        results[name]["processes"] = processes
+    return results
+
+
+def bench_database(ctx, args):
+    db = ctx.db
+    arcane_ids = [i['id'] for i in ctx.arcanes]
+    part_ids = [i['id'] for i in ctx.parts]
+    rng = random.Random(args.seed)
+
+    results = {
+        "database.get_all_items": measure(db.get_all_items, args.runs),
+        "database.get_latest_arcane_prices": measure(db.get_latest_arcane_prices, args.runs),
+        "database.get_latest_set_prices": measure(db.get_latest_set_prices, args.runs),
+        "database.get_latest_part_prices": measure(db.get_latest_part_prices, args.runs),
+        "database.get_latest_part_prices_subset": measure(lambda: db.get_latest_part_prices(part_ids[:200]), args.runs),
+        "database.get_arcane_price": measure(lambda: [db.get_arcane_price(rng.choice(arcane_ids)) for _ in range(100)], args.runs),
+    }
+
+    ts = time.time()
+
+    def save_prices():
+        # What a scan does per fetched item: one committed row each.
+        for item_id in arcane_ids[:100]:
+            db.save_arcane_price(item_id, 5, 10.0, 300.0, 20.0, 9.0, 280.0, 10.0, ts)
+
+    results["database.save_arcane_price"] = measure(save_prices, args.runs)
+
+    step = [0]
+
+    def replace_all():
+        step[0] += 1
+        arcanes, sets, parts = ctx.price_rows(ts + step[0])
+        db.replace_prices(arcanes=arcanes, sets=sets, parts=parts)
+
+    results["database.replace_prices"] = measure(replace_all, max(1, args.runs // 2))
+    results["database.replace_prices"]["rows"] = len(ctx.arcanes) + len(ctx.sets) + len(ctx.parts)
+    return results
+
+
+def check_qt_refcounts():
+    """Stops the run when the installed PySide6 drops a reference to True on every signal emit.
+
+    PySide6 6.12.0 does that on Python 3.11 and older, and the tens of thousands of signals in the ui
+    and scan groups end in a bool_dealloc abort halfway through. See requirements.txt.
+    """
+    try:
+        import PySide6
+        from PySide6.QtCore import QObject, Signal
+    except ImportError:
+        return
+
+    class Probe(QObject):
+        fired = Signal(str)
+
+    probe = Probe()
+    probe.fired.connect(lambda _: None)
+    before = sys.getrefcount(True)
+    for _ in range(3):
+        probe.fired.emit("x")
+    if sys.getrefcount(True) < before:
+        raise SystemExit(f"PySide6 {PySide6.__version__} on Python {platform.python_version()} leaks references "
+                         f"on every signal and would crash the ui and scan benchmarks. Install PySide6<6.12 "
+                         f"or use Python 3.12+ (see requirements.txt), or run with --only pricing database.")
+
+
+def close_qt():
+    """Deletes the widgets and the application object before the interpreter starts tearing down."""
+    if "PySide6.QtCore" not in sys.modules:
+        return
+    from PySide6.QtCore import QCoreApplication, QEvent
+    from PySide6.QtWidgets import QApplication
+
+    app = QCoreApplication.instance()
+    if app is None:
+        return
+    if isinstance(app, QApplication):
+        for widget in QApplication.topLevelWidgets():
+            widget.close()
+            widget.deleteLater()
+    QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+    app.shutdown()
+
+
+def bench_ui(ctx, args):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtCore import QCoreApplication, QEvent, Qt
+    from PySide6.QtWidgets import QApplication
+    from ui.item_table import ItemTableWidget
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    results = {}
+    for category, rows in (("arcane", ctx.arcanes), ("warframe", None)):
+        widget = ItemTableWidget(category, db_file=ctx.db_file)
+        widget.resize(900, 700)
+        widget.show()
+        app.processEvents()
+        widget.loader.wait()
+        app.processEvents()
+        count = widget.model.rowCount()
+
+        def populate():
+            widget.populate_table()
+            app.processEvents()
+
+        def sort_all():
+            for column in range(widget.model.columnCount()):
+                for order in (Qt.AscendingOrder, Qt.DescendingOrder):
+                    widget.proxy.sort(column, order)
+                    app.processEvents()
+
+        def search():
+            for query in ("a", "synth 01", "arcne synthetc", "prime blue", ""):
+                widget.filter_items(query)
+                app.processEvents()
+
+        def flush():
+            for url_name in widget.model.url_names:
+                widget.pending_updates[url_name] = ({'avg': random.uniform(5, 50), 'cheapest': 4.0},
+                                                    {'avg': 300.0, 'cheapest': 250.0, 'flip': 12.0, 'flip_avg': 20.0})
+            widget.flush_price_updates()
+            app.processEvents()
+
+        for name, fn in (("populate_table", populate), ("sort", sort_all), ("filter", search), ("flush_updates", flush)):
+            key = f"ui.{category}.{name}"
+            results[key] = measure(fn, args.runs)
+            results[key]["rows"] = count
+
+        widget.price_fetcher.stop()
+        widget.price_fetcher.wait()
+        widget.close()
+        widget.deleteLater()
+        QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+    return results
+
+
+def bench_scan(ctx, args):
+    import api.scheduler
+    from PySide6.QtCore import QCoreApplication, Qt
+    from api.warframe_market import WarframeMarketAPI
+    from services.market_scanner import MarketScanner
+    from ui.item_table import PriceFetcherThread
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    api.scheduler.shared_limiter.delay = args.limiter_delay
+    server = FakeMarketServer(FakeMarket(ctx.items, ctx.set_parts, seed=args.seed), port=0,
+                              latency=args.latency, seed=args.seed).start()
+    # Request logging would dominate the timings.
+    WarframeMarketAPI._log_call = lambda self, url, status_code=None: None
+
+    items = [(i['id'], i['url_name'], 'arcane', 5) for i in ctx.arcanes[:args.scan_items // 2]]
+    items += [(i['id'], i['url_name'], 'warframe', 5) for i in ctx.sets[:args.scan_items - len(items)]]
+    results = {}
+    try:
+        api_client = WarframeMarketAPI(base_url=server.url)
+
+        # The GUI path: one PriceFetcherThread working through a checkpointed queue.
+        os.environ["TENNOFLIP_API_URL"] = server.url
+        fetcher = PriceFetcherThread("bench", ctx.db_file)
+        done = []
+        fetcher.price_updated.connect(lambda *a: done.append(a), Qt.DirectConnection)
+        start = time.perf_counter()
+        fetcher.add_to_queue(items, force_refresh=True)
+        fetcher.start()
+        while len(done) < len(items) and time.perf_counter() - start < 600:
+            app.processEvents()
+            time.sleep(0.005)
+        elapsed = time.perf_counter() - start
+        fetcher.stop()
+        fetcher.wait()
+        results["scan.price_fetcher_thread"] = {"median_ms": elapsed * 1000, "items": len(done),
+                                                "items_per_s": len(done) / elapsed, "runs": 1}
+
+        for workers in (1, args.workers):
+            scanner = MarketScanner(api_client, Database(ctx.db_file))
+            start = time.perf_counter()
+            stats = scanner.scan(items, workers=workers, force_refresh=True)
+            elapsed = time.perf_counter() - start
+            results[f"scan.market_scanner_{workers}w"] = {"median_ms": elapsed * 1000, "items": stats["fetched"],
+                                                          "failed": stats["failed"], "items_per_s": stats["fetched"] / elapsed,
+                                                          "runs": 1}
+        results["scan.server"] = {"requests": server.snapshot_stats().get("requests", 0), "latency_ms": args.latency}
+    finally:
+        server.stop()
+        os.environ.pop("TENNOFLIP_API_URL", None)
+    return results
+
+
+BENCHMARKS = {"pricing": bench_pricing, "database": bench_database, "ui": bench_ui, "scan": bench_scan}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    if {"ui", "scan"} & set(args.only or GROUPS):
+        check_qt_refcounts()
+    print(f"Building a synthetic catalog of {args.arcanes} arcanes and {args.sets} sets "
+          f"with {args.history} hours of price history...")
+    ctx = Context(args)
+    print(f"  {len(ctx.catalog)} items, history written in {ctx.history_seconds:.1f}s")
+    results = {}
+    try:
+        for group in args.only or GROUPS:
+            try:
+                group_results = BENCHMARKS[group](ctx, args)
+            except ImportError as e:
+                print(f"Skipping {group}: {e}")
+                continue
+            results.update(group_results)
+            for name, r in group_results.items():
+                print(format_result(name, r))
+    finally:
+        close_qt()
+        ctx.close()
+
+    return {
+        "revision": git_revision(),
+        "created": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "compare")},
+        "results": results
+    }
+
+
+def format_result(name, r):
+    line = f"  {name:<44}"
+    if "median_ms" in r:
+        line += f" {r['median_ms']:10.2f} ms"
+    if "p95_ms" in r:
+        line += f" (p95 {r['p95_ms']:.2f})"
+    extras = [f"{k}={v:.1f}" if isinstance(v, float) else f"{k}={v}" for k, v in r.items()
+              if k not in ("median_ms", "p95_ms", "min_ms", "runs")]
+    return line + ("  " + " ".join(extras) if extras else "")
+
+
+def compare(old, new, threshold, noise_ms=0.05):
+    """Prints old vs new medians and returns the names that got slower than the threshold."""
+    print(f"Comparing {old.get('revision') or 'old'} -> {new.get('revision') or 'new'}")
+    regressions = []
+    for name, r in new["results"].items():
+        before = old["results"].get(name, {}).get("median_ms")
+        after = r.get("median_ms")
+        if before is None or after is None:
+            continue
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold and after - before > noise_ms:
+            flag = "  SLOWER"
+            regressions.append(name)
+        elif change < -threshold and before - after > noise_ms:
+            flag = "  faster"
+        print(f"  {name:<44} {before:10.2f} -> {after:10.2f} ms {change:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=GROUPS, help="Benchmark groups to run.")
+    parser.add_argument("--arcanes", type=int, default=2000, help="Synthetic arcanes in the catalog.")
+    parser.add_argument("--sets", type=int, default=1500, help="Synthetic sets in the catalog (4 parts each).")
+    parser.add_argument("--history", type=int, default=48, help="Price rows per item already in the database.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--scan-items", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Worker processes for pricing.price_pool.")
+    parser.add_argument("--pool-books", type=int, default=2000, help="Order books priced per pricing.price_pool run.")
+    parser.add_argument("--latency", type=float, default=30.0, help="Fake server latency per request, in ms.")
+    parser.add_argument("--limiter-delay", type=float, default=0.0,
+                        help="Seconds between requests (the app uses 0.34; 0 measures everything else).")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare the results against this earlier JSON file.")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two saved runs and exit.")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative slowdown that counts as a regression.")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.compare[1], encoding="utf-8") as f:
+            new = json.load(f)
+        return 1 if compare(old, new, args.threshold) else 0
+
+    report = run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {len(report['results'])} results to {args.output}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            old = json.load(f)
+        return 1 if compare(old, report, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,494 @@
+import time
+
+_STARTED = time.perf_counter()
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import requests
+from pathlib import Path
+from api.warframe_market import WarframeMarketAPI
+from data.database import Database
+from data.snapshots import SnapshotStore
+from services.access_tracker import CacheWarmer
+from services.catalog import CATEGORIES, load_catalog, filter_by_category
+from services.arbitrage_scanner import ArbitrageScanner
+from services.ducat_scanner import DucatScanner
+from services.flip_optimizer import FlipOptimizer
+from services.market_scanner import MarketScanner
+from services.metrics import metrics
+from services.profiler import SamplingProfiler, default_output_dir
+from services.order_stream import OrderStreamSubscriber, open_transport
+from services.price_pool import PricePool
+from services.repricer import reprice
+from services.relic_ev import (RelicCalculator, RELICS_FILE, REFINEMENTS, DROP_TABLE_URL, import_drop_table,
+                               save_relics)
+from services.set_components import SetComponentsService
+
+SUMMARY_FIELDS = {
+    "arcane": ["max_rank", "avg_r0", "low_r0", "avg_max", "low_max", "avg_flip", "low_flip"],
+    "item": ["avg", "low"]
+}
+
+
+def build_scan_items(catalog, categories):
+    """Turns catalog rows into scanner work items, keeping the category each one was picked for."""
+    scan_items = []
+    names = {}
+    seen = set()
+    for category in categories:
+        for item in filter_by_category(catalog, category):
+            if item['id'] in seen:
+                continue
+            seen.add(item['id'])
+            names[item['id']] = item['item_name']
+            scan_items.append((item['id'], item['url_name'], category, MarketScanner.DEFAULT_MAX_RANK))
+    return scan_items, names
+
+
+def write_results(rows, output, fmt=None):
+    path = Path(output)
+    fmt = fmt or path.suffix.lstrip(".").lower()
+
+    if fmt == "json":
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+    elif fmt == "csv":
+        fields = []
+        for row in rows:
+            fields.extend(k for k in row if k not in fields)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        raise ValueError(f"Unsupported output format: {fmt or path.suffix}")
+
+
+def run_scan(args):
+    categories = CATEGORIES if args.category == "all" else (args.category,)
+
+    api = WarframeMarketAPI()
+    db = Database(args.db) if args.db else Database()
+    snapshots = SnapshotStore(args.snapshots_db) if args.snapshots else None
+    pool = PricePool(args.processes) if args.processes else None
+    scanner = MarketScanner(api, db, snapshots, pricing_pool=pool)
+
+    catalog = load_catalog(api, db, refresh=args.refresh_catalog)
+    scan_items, names = build_scan_items(catalog, categories)
+    startup_time = time.perf_counter() - _STARTED
+
+    rows = []
+
+    def on_result(item, summary, from_cache):
+        item_id, url_name, category, _ = item
+        kind = "arcane" if category == "arcane" else "item"
+        row = {"id": item_id, "url_name": url_name, "item_name": names[item_id], "category": category}
+        row.update({k: summary.get(k) for k in SUMMARY_FIELDS[kind]})
+        row["cached"] = from_cache
+        rows.append(row)
+
+    print(f"Scanning {len(scan_items)} items ({', '.join(categories)}) with {args.workers} worker(s)...")
+    try:
+        stats = scanner.run_job(f"cli:{args.category}", scan_items, workers=args.workers, force_refresh=args.force,
+                                on_result=on_result, resume=not args.no_resume)
+    finally:
+        if pool:
+            pool.close()
+    if stats["resumed"]:
+        print(f"Resumed scan job #{stats['job_id']} ({stats['items']} items were left)")
+
+    if args.output:
+        rows.sort(key=lambda r: (r["category"], r["item_name"]))
+        write_results(rows, args.output, args.format)
+        print(f"Wrote {len(rows)} rows to {args.output}")
+
+    elapsed = stats["elapsed"]
+    throughput = stats["fetched"] / elapsed if elapsed > 0 else 0.0
+    print(f"Startup time: {startup_time:.2f}s")
+    print(f"Scan time: {elapsed:.2f}s | items: {stats['items']} | fetched: {stats['fetched']} "
+          f"| cached: {stats['cached']} | failed: {stats['failed']}")
+    print(f"Throughput: {throughput:.2f} fetched items/s")
+    if stats["failed"]:
+        print(f"Scan job #{stats['job_id']} is kept; run the same scan again to retry the {stats['failed']} failed items.")
+    return 0 if stats["failed"] == 0 else 1
+
+
+def run_components(args):
+    api = WarframeMarketAPI()
+    db = Database(args.db) if args.db else Database()
+
+    catalog = load_catalog(api, db, refresh=args.refresh_catalog)
+
+    def on_progress(done, total):
+        if done % 25 == 0 or done == total:
+            print(f"{done}/{total} sets")
+
+    stats = SetComponentsService(api, db).prefetch_all(catalog, force=args.force, on_progress=on_progress)
+    if stats["up_to_date"]:
+        print(f"Set components are up to date ({stats['sets']} sets).")
+    else:
+        print(f"Stored components for {stats['fetched']} sets, {stats['failed']} failed.")
+    return 0 if stats["failed"] == 0 else 1
+
+
+def print_spread_table(title, rows):
+    print(title)
+    if not rows:
+        print("  (none)")
+        return
+    print(f"  {'Set':<36} {'Set':>9} {'Parts':>9} {'Spread':>9} {'%':>7}")
+    for r in rows:
+        print(f"  {r['item_name'][:36]:<36} {r['set_price']:>8.1f}p {r['parts_total']:>8.1f}p {r['spread']:>+8.1f}p {r['spread_pct']:>+6.1f}%")
+
+
+def run_arbitrage(args):
+    api = WarframeMarketAPI()
+    db = Database(args.db) if args.db else Database()
+    catalog = load_catalog(api, db)
+
+    if not db.get_all_set_components():
+        print("No set compositions stored yet, downloading them first...")
+        SetComponentsService(api, db).prefetch_all(catalog)
+
+    arbitrage = ArbitrageScanner(MarketScanner(api, db), db)
+    results, stats = arbitrage.scan(catalog, workers=args.workers, force_refresh=args.force,
+                                    mode=args.mode, resume=not args.no_resume)
+
+    buy_parts = [r for r in results if r['spread'] > 0][:args.top]
+    buy_set = [r for r in reversed(results) if r['spread'] < 0][:args.top]
+    print_spread_table("Buy parts -> sell set:", buy_parts)
+    print_spread_table("Buy set -> sell parts:", buy_set)
+
+    if args.output:
+        write_results(results, args.output, args.format)
+        print(f"Wrote {len(results)} rows to {args.output}")
+
+    print(f"Sets: {stats['sets']} | priced: {len(results)} | requests: {stats['requests']} "
+          f"| reused from cache: {stats['cached']} | failed: {stats['failed']} | time: {stats['elapsed']:.2f}s")
+    return 0 if stats["failed"] == 0 else 1
+
+
+def run_flips(args):
+    db = Database(args.db) if args.db else Database()
+
+    if args.scan:
+        api = WarframeMarketAPI()
+        catalog = load_catalog(api, db)
+        scan_items, _ = build_scan_items(catalog, ("arcane",))
+        stats = MarketScanner(api, db).run_job("cli:flips", scan_items, workers=args.workers, force_refresh=args.force)
+        print(f"Scanned {stats['items']} arcanes: {stats['fetched']} fetched, {stats['cached']} cached, {stats['failed']} failed.")
+
+    start = time.perf_counter()
+    results = FlipOptimizer(db).optimize(mode=args.mode, sort_by=args.sort)
+    elapsed = time.perf_counter() - start
+
+    print(f"  {'Arcane':<32} {'Buy':>8} {'Sell':>8} {'Profit':>9} {'ROI':>7}  Plan")
+    for r in results[:args.top]:
+        print(f"  {r['item_name'][:32]:<32} {r['cost']:>7.0f}p {r['sell']:>7.0f}p {r['profit']:>+8.0f}p {r['roi']:>+6.0f}%  {r['plan_text']}")
+
+    if args.output:
+        rows = [{k: v for k, v in r.items() if k != 'plan'} for r in results]
+        write_results(rows, args.output, args.format)
+        print(f"Wrote {len(results)} rows to {args.output}")
+
+    print(f"Ranked {len(results)} arcanes in {elapsed * 1000:.1f} ms")
+    return 0
+
+
+def run_relics(args):
+    db = Database(args.db) if args.db else Database()
+    calc = RelicCalculator(db, args.relics)
+    calc.load_prices()
+    if not calc.relics:
+        print(f"No relics defined in {args.relics}. Run `cli.py import-relics` or add their drop tables there first.")
+        return 1
+
+    if args.fetch:
+        stats = calc.refresh_prices(MarketScanner(WarframeMarketAPI(), db), workers=args.workers)
+        print(f"Priced {stats['items']} rewards: {stats['fetched']} fetched, {stats['failed']} failed.")
+
+    start = time.perf_counter()
+    results = calc.results(mode=args.mode, sort_by=args.sort)
+    elapsed = time.perf_counter() - start
+
+    print(f"  {'Relic':<20}" + "".join(f"{r.title():>13}" for r in REFINEMENTS) + "  Unpriced")
+    for r in results[:args.top]:
+        print(f"  {r['name'][:20]:<20}" + "".join(f"{r[ref]:>12.1f}p" for ref in REFINEMENTS) + f"  {r['unpriced']:>8}")
+
+    if args.output:
+        write_results(results, args.output, args.format)
+        print(f"Wrote {len(results)} rows to {args.output}")
+
+    missing = len(calc.missing)
+    print(f"Evaluated {len(results)} relics in {elapsed * 1000:.1f} ms"
+          + (f" | {missing} rewards have no cached price (use --fetch)" if missing else ""))
+    return 0
+
+
+def run_import_relics(args):
+    db = Database(args.db) if args.db else Database()
+    if os.path.exists(args.source):
+        with open(args.source, encoding="utf-8") as f:
+            data = json.load(f)
+    else:
+        try:
+            response = requests.get(args.source, timeout=60)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"Could not download {args.source}: {e}")
+            return 1
+
+    catalog = load_catalog(WarframeMarketAPI(), db)
+    relics = import_drop_table(data, catalog)
+    if not relics:
+        print(f"No relics found in {args.source}.")
+        return 1
+    save_relics(relics, args.relics)
+
+    known = {item['url_name'] for item in catalog}
+    rewards = {r['item'] for relic in relics for r in relic['rewards']}
+    unknown = sorted(rewards - known)
+    print(f"Imported {len(relics)} relics with {len(rewards)} different rewards into {args.relics}")
+    if unknown:
+        print(f"{len(unknown)} rewards are not on warframe.market and count as 0p: "
+              + ", ".join(unknown[:10]) + (", ..." if len(unknown) > 10 else ""))
+    return 0
+
+
+def run_ducats(args):
+    api = WarframeMarketAPI()
+    db = Database(args.db) if args.db else Database()
+    catalog = load_catalog(api, db, refresh=args.refresh_catalog)
+    if not any(item.get('ducats') for item in catalog):
+        print("The cached catalog has no ducat values yet, downloading it again...")
+        catalog = load_catalog(api, db, refresh=True)
+
+    results, stats = DucatScanner(MarketScanner(api, db), db).scan(
+        catalog, workers=args.workers, force_refresh=args.force, resume=not args.no_resume, refresh=not args.cached)
+
+    print(f"  {'Part':<40} {'Ducats':>7} {'Price':>8} {'Ducats/p':>9}")
+    for r in results[:args.top]:
+        print(f"  {r['item_name'][:40]:<40} {r['ducats']:>7} {r['low']:>7.0f}p {r['ducats_per_plat']:>9.2f}")
+
+    if args.output:
+        write_results(results, args.output, args.format)
+        print(f"Wrote {len(results)} rows to {args.output}")
+
+    print(f"Parts: {stats['parts']} | priced: {len(results)} | requests: {stats['requests']} "
+          f"| failed: {stats['failed']} | time: {stats['elapsed']:.2f}s")
+    return 0 if stats["failed"] == 0 else 1
+
+
+def run_reprice(args):
+    db = Database(args.db) if args.db else Database()
+    snapshots = SnapshotStore(args.snapshots_db)
+    store = snapshots.stats()
+    if not store["snapshots"]:
+        print("No stored order books yet. Run a scan with --snapshots first.")
+        return 1
+
+    with PricePool(args.processes) as pool:
+        stats = reprice(db, snapshots, pool=pool if args.processes else None)
+    print(f"Re-priced {stats['items']} items ({stats['arcanes']} arcanes, {stats['sets']} sets, {stats['parts']} parts) "
+          f"in {stats['elapsed']:.2f}s from {store['snapshots']} snapshots ({store['bytes'] / 1024:.0f} KiB)")
+    return 0
+
+
+def run_warm(args):
+    db = Database(args.db) if args.db else Database()
+    warmer = CacheWarmer(MarketScanner(WarframeMarketAPI(), db), budget=args.budget, top=args.top)
+    ranked = warmer.tracker.ranked(args.top)
+    if not ranked:
+        print("No item accesses recorded yet; the app records them as you open, search and scroll through items.")
+        return 0
+
+    print(f"  {'Item':<40} {'Tab':<10} {'Score':>7} {'Hits':>6}")
+    for row in ranked:
+        print(f"  {row['url_name'][:40]:<40} {row['item_type']:<10} {row['score']:>7.2f} {row['hits']:>6}")
+    if args.list:
+        return 0
+
+    stats = warmer.warm(workers=args.workers)
+    if stats is None:
+        print("Every ranked price is already fresh.")
+        return 0
+    print(f"Warmed {stats['fetched']} prices | failed: {stats['failed']} | time: {stats['elapsed']:.2f}s")
+    return 0 if stats["failed"] == 0 else 1
+
+
+def run_stream(args):
+    db = Database(args.db) if args.db else Database()
+    names = {i['url_name']: i['item_name'] for i in db.get_all_items()}
+
+    def on_update(slug, item_type, summary):
+        if args.quiet:
+            return
+        if item_type == 'arcane':
+            print(f"  {names[slug][:40]:<40} r0 {summary['avg_r0']:>7.1f}p  max {summary['avg_max']:>7.1f}p  flip {summary['avg_flip']:>8.1f}p")
+        else:
+            print(f"  {names[slug][:40]:<40} avg {summary['avg']:>7.1f}p  low {summary['low']:>6.0f}p")
+
+    subscriber = OrderStreamSubscriber(open_transport(args.url), db, flush_interval=args.flush_interval, on_update=on_update)
+    start = time.perf_counter()
+    if args.duration:
+        timer = threading.Timer(args.duration, subscriber.stop)
+        timer.daemon = True
+        timer.start()
+    try:
+        subscriber.run()
+    except KeyboardInterrupt:
+        subscriber.stop()
+    except OSError as e:
+        print(f"Could not read the order stream at {args.url}: {e}")
+        return 1
+
+    stats = subscriber.stats
+    print(f"Events: {stats['events']} | ignored: {stats['ignored']} | books: {len(subscriber.books)} "
+          f"| saves: {stats['saved']} | time: {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="tennoflip", description="Tenno Flip headless tools.")
+    parser.add_argument("--api-url", help="warframe.market API base URL, e.g. tools/fake_market_server.py's "
+                                          "(defaults to $TENNOFLIP_API_URL or the real API).")
+    parser.add_argument("--metrics-file", help="Write request, cache and database metrics to this Prometheus text file at the end.")
+    parser.add_argument("--metrics-port", type=int, help="Serve the same metrics on http://127.0.0.1:PORT/metrics while running.")
+    parser.add_argument("--profile", nargs="?", const=default_output_dir(), metavar="DIR",
+                        help="Sample stacks, spans and memory while running and write a report to DIR "
+                             "(defaults to profiles/<timestamp>).")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="With --profile, also track peak memory per subsystem (much slower).")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    scan = sub.add_parser("scan", help="Refresh cached prices for a whole category.")
+    scan.add_argument("--category", choices=CATEGORIES + ("all",), default="all")
+    scan.add_argument("--workers", type=int, default=3, help="Parallel download threads (they share the rate limit).")
+    scan.add_argument("--force", action="store_true", help="Ignore cached prices that are still fresh.")
+    scan.add_argument("--no-resume", action="store_true", help="Start over instead of resuming an interrupted scan.")
+    scan.add_argument("--refresh-catalog", action="store_true", help="Download the item list again.")
+    scan.add_argument("--output", help="Also write the results to a .csv or .json file.")
+    scan.add_argument("--format", choices=("csv", "json"), help="Output format, guessed from --output by default.")
+    scan.add_argument("--processes", type=int, default=0,
+                      help="Decode and price order books in this many worker processes (0 = in the download threads).")
+    scan.add_argument("--snapshots", action="store_true", help="Also archive every fetched order book for re-pricing.")
+    scan.add_argument("--snapshots-db", help="Path of the order book archive (defaults to snapshots.db next to cache.db).")
+    scan.add_argument("--db", help="Path of the cache database (defaults to the app's cache.db).")
+    scan.set_defaults(func=run_scan)
+
+    arbitrage = sub.add_parser("arbitrage", help="Rank every set by set price minus the sum of its parts.")
+    arbitrage.add_argument("--mode", choices=("avg", "low"), default="avg", help="Average or lowest in-game prices.")
+    arbitrage.add_argument("--workers", type=int, default=3, help="Parallel download threads (they share the rate limit).")
+    arbitrage.add_argument("--top", type=int, default=15, help="Rows to print per direction.")
+    arbitrage.add_argument("--force", action="store_true", help="Ignore cached prices that are still fresh.")
+    arbitrage.add_argument("--no-resume", action="store_true", help="Start over instead of resuming an interrupted scan.")
+    arbitrage.add_argument("--output", help="Also write the full ranking to a .csv or .json file.")
+    arbitrage.add_argument("--format", choices=("csv", "json"), help="Output format, guessed from --output by default.")
+    arbitrage.add_argument("--db", help="Path of the cache database (defaults to the app's cache.db).")
+    arbitrage.set_defaults(func=run_arbitrage)
+
+    flips = sub.add_parser("flips", help="Rank arcanes by the profit of fusing lower ranks into max rank.")
+    flips.add_argument("--mode", choices=("avg", "low"), default="avg", help="Average or lowest in-game prices.")
+    flips.add_argument("--sort", choices=("profit", "roi"), default="profit")
+    flips.add_argument("--top", type=int, default=20, help="Rows to print.")
+    flips.add_argument("--scan", action="store_true", help="Refresh arcane prices before ranking.")
+    flips.add_argument("--workers", type=int, default=3, help="Parallel download threads (they share the rate limit).")
+    flips.add_argument("--force", action="store_true", help="With --scan, also refresh prices that are still fresh.")
+    flips.add_argument("--output", help="Also write the full ranking to a .csv or .json file.")
+    flips.add_argument("--format", choices=("csv", "json"), help="Output format, guessed from --output by default.")
+    flips.add_argument("--db", help="Path of the cache database (defaults to the app's cache.db).")
+    flips.set_defaults(func=run_flips)
+
+    relics = sub.add_parser("relics", help="Expected platinum of every relic at every refinement.")
+    relics.add_argument("--mode", choices=("avg", "low"), default="avg", help="Average or lowest in-game prices.")
+    relics.add_argument("--sort", choices=REFINEMENTS, default="radiant", help="Refinement to rank by.")
+    relics.add_argument("--top", type=int, default=20, help="Rows to print.")
+    relics.add_argument("--fetch", action="store_true", help="Download prices for rewards that are missing or stale.")
+    relics.add_argument("--workers", type=int, default=3, help="Parallel download threads (they share the rate limit).")
+    relics.add_argument("--relics", default=RELICS_FILE, help="Relic drop table file (defaults to data/relics.json).")
+    relics.add_argument("--output", help="Also write the results to a .csv or .json file.")
+    relics.add_argument("--format", choices=("csv", "json"), help="Output format, guessed from --output by default.")
+    relics.add_argument("--db", help="Path of the cache database (defaults to the app's cache.db).")
+    relics.set_defaults(func=run_relics)
+
+    import_relics = sub.add_parser("import-relics", help="Fill data/relics.json from the public relic drop table.")
+    import_relics.add_argument("source", nargs="?", default=DROP_TABLE_URL,
+                               help="URL or file in the drops.warframestat.us relics.json format (defaults to that URL).")
+    import_relics.add_argument("--relics", default=RELICS_FILE, help="Relic drop table file to write (defaults to data/relics.json).")
+    import_relics.add_argument("--db", help="Cache database whose catalog names the rewards (defaults to the app's cache.db).")
+    import_relics.set_defaults(func=run_import_relics)
+
+    ducats = sub.add_parser("ducats", help="Rank prime parts by ducats per platinum.")
+    ducats.add_argument("--top", type=int, default=25, help="Rows to print.")
+    ducats.add_argument("--cached", action="store_true", help="Only use cached prices, download nothing.")
+    ducats.add_argument("--workers", type=int, default=3, help="Parallel download threads (they share the rate limit).")
+    ducats.add_argument("--force", action="store_true", help="Ignore cached prices that are still fresh.")
+    ducats.add_argument("--no-resume", action="store_true", help="Start over instead of resuming an interrupted scan.")
+    ducats.add_argument("--refresh-catalog", action="store_true", help="Download the item list again.")
+    ducats.add_argument("--output", help="Also write the full ranking to a .csv or .json file.")
+    ducats.add_argument("--format", choices=("csv", "json"), help="Output format, guessed from --output by default.")
+    ducats.add_argument("--db", help="Path of the cache database (defaults to the app's cache.db).")
+    ducats.set_defaults(func=run_ducats)
+
+    reprice_cmd = sub.add_parser("reprice", help="Recompute cached prices from archived order books, offline.")
+    reprice_cmd.add_argument("--snapshots-db", help="Path of the order book archive (defaults to snapshots.db next to cache.db).")
+    reprice_cmd.add_argument("--processes", type=int, default=0,
+                             help="Decode and price the archived books in this many worker processes.")
+    reprice_cmd.add_argument("--db", help="Path of the cache database (defaults to the app's cache.db).")
+    reprice_cmd.set_defaults(func=run_reprice)
+
+    stream = sub.add_parser("stream", help="Keep cached prices live from an order event stream.")
+    stream.add_argument("url", help="tcp://host:port (see tools/fake_order_stream.py) or ws:// / wss://.")
+    stream.add_argument("--flush-interval", type=float, default=2.0, help="Seconds between database writes.")
+    stream.add_argument("--duration", type=float, help="Stop after this many seconds.")
+    stream.add_argument("--quiet", action="store_true", help="Do not print every price change.")
+    stream.add_argument("--db", help="Path of the cache database (defaults to the app's cache.db).")
+    stream.set_defaults(func=run_stream)
+
+    warm = sub.add_parser("warm", help="Refresh the prices of the items you look at most, like the app does when idle.")
+    warm.add_argument("--budget", type=int, default=CacheWarmer.BUDGET, help="Most prices to fetch.")
+    warm.add_argument("--top", type=int, default=CacheWarmer.TOP, help="Ranked items to consider.")
+    warm.add_argument("--workers", type=int, default=1, help="Parallel download threads (they share the rate limit).")
+    warm.add_argument("--list", action="store_true", help="Only print the ranking.")
+    warm.add_argument("--db", help="Path of the cache database (defaults to the app's cache.db).")
+    warm.set_defaults(func=run_warm)
+
+    components = sub.add_parser("components", help="Download which parts make up every set.")
+    components.add_argument("--force", action="store_true", help="Fetch every set again, even if already known.")
+    components.add_argument("--refresh-catalog", action="store_true", help="Download the item list again.")
+    components.add_argument("--db", help="Path of the cache database (defaults to the app's cache.db).")
+    components.set_defaults(func=run_components)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.api_url:
+        # Every WarframeMarketAPI created from here on, including inside services, picks this up.
+        os.environ["TENNOFLIP_API_URL"] = args.api_url
+    if args.metrics_file or args.metrics_port:
+        metrics.enable()
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    profiler = SamplingProfiler(args.profile, memory=args.profile_memory).start() if args.profile else None
+    try:
+        return args.func(args)
+    finally:
+        if profiler:
+            print(profiler.stop())
+            print(f"Profile written to {args.profile} (stacks.folded, trace.json, summary.txt)")
+        if args.metrics_file:
+            metrics.write_textfile(args.metrics_file)
+
+
+if __name__ == "__main__":
+    # --processes workers of a frozen build start this executable again; let them be workers.
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -3,16 +3,17 @@ import time
 import sys
 from pathlib import Path
 import json
+from services.metrics import connect
 
 class Database:
-    def __init__(self):
+    def __init__(self, db_file=None):
         if getattr(sys, 'frozen', False):
             base_dir = Path(sys.executable).parent
         else:
             base_dir = Path(__file__).parent
             
-        self.db_file = base_dir / "cache.db"
-        self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self.db_file = Path(db_file) if db_file else base_dir / "cache.db"
+        self.conn = connect(self.db_file, check_same_thread=False)
         self.create_tables()
 
     def create_tables(self):
@@ -83,9 +84,84 @@ class Database:
                 "key" TEXT PRIMARY KEY,
                 "value" TEXT
             );
+            
+            CREATE TABLE IF NOT EXISTS "scan_jobs" (
+                "id" INTEGER PRIMARY KEY AUTOINCREMENT,
+                "name" TEXT NOT NULL,
+                "status" TEXT NOT NULL,
+                "created" REAL,
+                "updated" REAL
+            );
+            
+            CREATE TABLE IF NOT EXISTS "scan_job_items" (
+                "job_id" INTEGER NOT NULL,
+                "item_id" TEXT NOT NULL,
+                "url_name" TEXT NOT NULL,
+                "item_type" TEXT NOT NULL,
+                "max_rank" INTEGER,
+                "force_refresh" INTEGER DEFAULT 0,
+                "state" TEXT NOT NULL,
+                "retries" INTEGER DEFAULT 0,
+                "error" TEXT,
+                "queued" REAL,
+                "updated" REAL,
+                PRIMARY KEY("job_id", "item_id"),
+                FOREIGN KEY("job_id") REFERENCES "scan_jobs"("id")
+            );
+            
+            CREATE TABLE IF NOT EXISTS "set_components" (
+                "set_item_id" TEXT NOT NULL,
+                "part_item_id" TEXT NOT NULL,
+                "quantity" INTEGER NOT NULL DEFAULT 1,
+                PRIMARY KEY("set_item_id", "part_item_id"),
+                FOREIGN KEY("set_item_id") REFERENCES "items"("id"),
+                FOREIGN KEY("part_item_id") REFERENCES "items"("id")
+            );
+            
+            CREATE TABLE IF NOT EXISTS "arcane_ranks" (
+                "item_id" TEXT NOT NULL,
+                "rank" INTEGER NOT NULL,
+                "avg_price" REAL,
+                "low_price" REAL,
+                "timestamp" REAL,
+                PRIMARY KEY("item_id", "rank"),
+                FOREIGN KEY("item_id") REFERENCES "items"("id")
+            );
+            
+            CREATE TABLE IF NOT EXISTS "item_access" (
+                "item_id" TEXT PRIMARY KEY,
+                "url_name" TEXT NOT NULL,
+                "item_type" TEXT NOT NULL,
+                "score" REAL NOT NULL DEFAULT 0,
+                "hits" INTEGER NOT NULL DEFAULT 0,
+                "last_access" REAL,
+                FOREIGN KEY("item_id") REFERENCES "items"("id")
+            );
+
+            CREATE INDEX IF NOT EXISTS "idx_parts_item_ts" ON "parts" ("item_id", "timestamp");
+            CREATE INDEX IF NOT EXISTS "idx_arcanes_item_ts" ON "arcanes" ("item_id", "timestamp");
+            CREATE INDEX IF NOT EXISTS "idx_sets_item_ts" ON "sets" ("item_id", "timestamp");
         ''')
+        self.migrate_items()
         self.conn.commit()
 
+    # Catalog fields added to the items table after it was first created
+    ITEM_COLUMNS = {
+        "max_rank": "INTEGER DEFAULT -1",
+        "ducats": "INTEGER",
+        "trading_tax": "INTEGER",
+        "vaulted": "INTEGER",
+        "meta": "TEXT"
+    }
+
+    def migrate_items(self):
+        cursor = self.conn.cursor()
+        cursor.execute("PRAGMA table_info(items)")
+        existing = {r[1] for r in cursor.fetchall()}
+        for column, definition in self.ITEM_COLUMNS.items():
+            if column not in existing:
+                cursor.execute(f'ALTER TABLE items ADD COLUMN "{column}" {definition}')
+
     def save_items(self, items):
         """Bulk saves items to the database after filtering by type."""
         cursor = self.conn.cursor()
@@ -105,58 +181,72 @@ class Database:
             if not item_type:
                 continue
                 
+            vaulted = item.get("vaulted")
             cursor.execute('''
-                INSERT OR REPLACE INTO items (id, url_name, item_name, item_type, tags)
-                VALUES (?, ?, ?, ?, ?)
+                INSERT OR REPLACE INTO items (id, url_name, item_name, item_type, tags, max_rank, ducats, trading_tax, vaulted, meta)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 item.get("id"),
                 item.get("url_name"),
                 item.get("item_name"),
                 item_type,
-                json.dumps(tags)
+                json.dumps(tags),
+                item.get("max_rank", -1),
+                item.get("ducats"),
+                item.get("trading_tax"),
+                None if vaulted is None else int(vaulted),
+                json.dumps(item.get("meta") or {})
             ))
         self.conn.commit()
 
+    def get_catalog_state(self):
+        """A cheap fingerprint of the items table; it changes whenever items are added or saved again."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COUNT(*), MAX(rowid) FROM items")
+        return cursor.fetchone()
+
     def get_all_items(self, item_type=None):
         cursor = self.conn.cursor()
         if item_type:
-            cursor.execute("SELECT id, url_name, item_name, item_type, tags FROM items WHERE item_type = ?", (item_type,))
+            cursor.execute("SELECT id, url_name, item_name, item_type, tags, max_rank, ducats, trading_tax, vaulted, meta FROM items WHERE item_type = ?", (item_type,))
         else:
-            cursor.execute("SELECT id, url_name, item_name, item_type, tags FROM items")
+            cursor.execute("SELECT id, url_name, item_name, item_type, tags, max_rank, ducats, trading_tax, vaulted, meta FROM items")
         
-        results = []
-        for r in cursor.fetchall():
-            results.append({
-                "id": r[0],
-                "url_name": r[1],
-                "item_name": r[2],
-                "item_type": r[3],
-                "tags": json.loads(r[4])
-            })
-        return results
+        return [self._item_row(r) for r in cursor.fetchall()]
+
+    @staticmethod
+    def _item_row(r):
+        return {
+            "id": r[0],
+            "url_name": r[1],
+            "item_name": r[2],
+            "item_type": r[3],
+            "tags": json.loads(r[4]),
+            "max_rank": r[5],
+            "ducats": r[6],
+            "trading_tax": r[7],
+            "vaulted": None if r[8] is None else bool(r[8]),
+            "meta": json.loads(r[9]) if r[9] else {}
+        }
 
     def get_item_by_id(self, item_id):
         cursor = self.conn.cursor()
-        cursor.execute("SELECT id, url_name, item_name, item_type, tags FROM items WHERE id = ?", (item_id,))
+        cursor.execute("SELECT id, url_name, item_name, item_type, tags, max_rank, ducats, trading_tax, vaulted, meta FROM items WHERE id = ?", (item_id,))
         r = cursor.fetchone()
-        if r:
-            return {"id": r[0], "url_name": r[1], "item_name": r[2], "item_type": r[3], "tags": json.loads(r[4])}
-        return None
+        return self._item_row(r) if r else None
 
     def get_item_by_slug(self, slug):
         cursor = self.conn.cursor()
-        cursor.execute("SELECT id, url_name, item_name, item_type, tags FROM items WHERE url_name = ?", (slug,))
+        cursor.execute("SELECT id, url_name, item_name, item_type, tags, max_rank, ducats, trading_tax, vaulted, meta FROM items WHERE url_name = ?", (slug,))
         r = cursor.fetchone()
-        if r:
-            return {"id": r[0], "url_name": r[1], "item_name": r[2], "item_type": r[3], "tags": json.loads(r[4])}
-        return None
+        return self._item_row(r) if r else None
 
-    def save_arcane_price(self, item_id, max_rank, avg_r0, avg_max, avg_flip, low_r0, low_max, low_flip):
+    def save_arcane_price(self, item_id, max_rank, avg_r0, avg_max, avg_flip, low_r0, low_max, low_flip, timestamp=None):
         cursor = self.conn.cursor()
         cursor.execute('''
             INSERT INTO arcanes (item_id, max_rank, avg_price_rank0, avg_price_max_rank, avg_flip, low_price_rank0, low_price_max_rank0, low_flip, timestamp)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (item_id, max_rank, avg_r0, avg_max, avg_flip, low_r0, low_max, low_flip, time.time()))
+        ''', (item_id, max_rank, avg_r0, avg_max, avg_flip, low_r0, low_max, low_flip, timestamp or time.time()))
         self.conn.commit()
 
     def get_arcane_price(self, item_id):
@@ -170,12 +260,47 @@ class Database:
             }
         return None
 
-    def save_set_price(self, item_id, avg_price, low_price):
+    def get_latest_arcane_prices(self):
+        """Returns the latest cached price row of every arcane, keyed by item id, in one query."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT item_id, max_rank, avg_price_rank0, avg_price_max_rank, avg_flip, low_price_rank0, low_price_max_rank0, low_flip, MAX(timestamp)
+            FROM arcanes GROUP BY item_id
+        ''')
+        results = {}
+        for r in cursor.fetchall():
+            results[r[0]] = {
+                "max_rank": r[1], "avg_r0": r[2], "avg_max": r[3], "avg_flip": r[4],
+                "low_r0": r[5], "low_max": r[6], "low_flip": r[7], "timestamp": r[8]
+            }
+        return results
+
+    def save_arcane_ranks(self, item_id, ranks, timestamp=None):
+        """Replaces the per-rank prices of an arcane with {rank: {"avg", "low"}}."""
+        cursor = self.conn.cursor()
+        now = timestamp or time.time()
+        cursor.execute("DELETE FROM arcane_ranks WHERE item_id = ?", (item_id,))
+        cursor.executemany(
+            "INSERT INTO arcane_ranks (item_id, rank, avg_price, low_price, timestamp) VALUES (?, ?, ?, ?, ?)",
+            [(item_id, rank, p['avg'], p['low'], now) for rank, p in ranks.items()]
+        )
+        self.conn.commit()
+
+    def get_all_arcane_ranks(self):
+        """Returns the per-rank prices of every arcane as item id -> {rank: {avg, low, timestamp}}."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT item_id, rank, avg_price, low_price, timestamp FROM arcane_ranks")
+        results = {}
+        for r in cursor.fetchall():
+            results.setdefault(r[0], {})[r[1]] = {"avg": r[2], "low": r[3], "timestamp": r[4]}
+        return results
+
+    def save_set_price(self, item_id, avg_price, low_price, timestamp=None):
         cursor = self.conn.cursor()
         cursor.execute('''
             INSERT INTO sets (item_id, avg_price, low_price, timestamp)
             VALUES (?, ?, ?, ?)
-        ''', (item_id, avg_price, low_price, time.time()))
+        ''', (item_id, avg_price, low_price, timestamp or time.time()))
         set_id = cursor.lastrowid
         self.conn.commit()
         return set_id
@@ -188,12 +313,53 @@ class Database:
             return {"id": r[0], "avg": r[1], "low": r[2], "timestamp": r[3]}
         return None
 
-    def save_part_price(self, set_id, item_id, avg_price, low_price):
+    def get_latest_set_prices(self):
+        """Returns the latest cached price row of every set, keyed by item id, in one query."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT item_id, id, avg_price, low_price, MAX(timestamp) FROM sets GROUP BY item_id")
+        return {r[0]: {"id": r[1], "avg": r[2], "low": r[3], "timestamp": r[4]} for r in cursor.fetchall()}
+
+    def save_part_price(self, set_id, item_id, avg_price, low_price, timestamp=None):
         cursor = self.conn.cursor()
         cursor.execute('''
             INSERT INTO parts (set_id, item_id, avg_price, low_price, timestamp)
             VALUES (?, ?, ?, ?, ?)
-        ''', (set_id, item_id, avg_price, low_price, time.time()))
+        ''', (set_id, item_id, avg_price, low_price, timestamp or time.time()))
+        self.conn.commit()
+
+    def replace_prices(self, arcanes=(), sets=(), parts=(), ranks=()):
+        """Rewrites derived prices in one transaction, e.g. after re-pricing stored order books.
+
+        Every row carries the timestamp of the fetch it came from and updates the row saved for
+        the same item at that time (inserting it if there is none), so price history is kept.
+        arcanes: (item_id, max_rank, avg_r0, avg_max, avg_flip, low_r0, low_max, low_flip, ts)
+        sets / parts: (item_id, avg, low, ts); ranks: (item_id, {rank: {"avg", "low"}}, ts)
+        """
+        cursor = self.conn.cursor()
+        for row in arcanes:
+            cursor.execute('''
+                UPDATE arcanes SET max_rank = ?, avg_price_rank0 = ?, avg_price_max_rank = ?, avg_flip = ?,
+                    low_price_rank0 = ?, low_price_max_rank0 = ?, low_flip = ?
+                WHERE item_id = ? AND timestamp = ?
+            ''', row[1:8] + (row[0], row[8]))
+            if cursor.rowcount == 0:
+                cursor.execute('''
+                    INSERT INTO arcanes (item_id, max_rank, avg_price_rank0, avg_price_max_rank, avg_flip, low_price_rank0, low_price_max_rank0, low_flip, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', row)
+        for table, rows in (("sets", sets), ("parts", parts)):
+            for item_id, avg, low, ts in rows:
+                cursor.execute(f"UPDATE {table} SET avg_price = ?, low_price = ? WHERE item_id = ? AND timestamp = ?",
+                               (avg, low, item_id, ts))
+                if cursor.rowcount == 0:
+                    cursor.execute(f"INSERT INTO {table} (item_id, avg_price, low_price, timestamp) VALUES (?, ?, ?, ?)",
+                                   (item_id, avg, low, ts))
+        for item_id, rank_prices, ts in ranks:
+            cursor.execute("DELETE FROM arcane_ranks WHERE item_id = ?", (item_id,))
+            cursor.executemany(
+                "INSERT INTO arcane_ranks (item_id, rank, avg_price, low_price, timestamp) VALUES (?, ?, ?, ?, ?)",
+                [(item_id, rank, p['avg'], p['low'], ts) for rank, p in rank_prices.items()]
+            )
         self.conn.commit()
 
     def get_parts_prices(self, set_id):
@@ -209,6 +375,58 @@ class Database:
             results.append({"id": r[0], "name": r[1], "avg": r[2], "low": r[3]})
         return results
 
+    def get_latest_part_prices(self, item_ids=None):
+        """Returns the latest cached price of each part, whichever set row it was saved under."""
+        cursor = self.conn.cursor()
+        query = "SELECT item_id, avg_price, low_price, MAX(timestamp) FROM parts"
+        params = ()
+        if item_ids is not None:
+            item_ids = list(item_ids)
+            if not item_ids:
+                return {}
+            query += f" WHERE item_id IN ({', '.join('?' * len(item_ids))})"
+            params = item_ids
+        cursor.execute(query + " GROUP BY item_id", params)
+        return {r[0]: {"avg": r[1], "low": r[2], "timestamp": r[3]} for r in cursor.fetchall()}
+
+    def save_set_components(self, set_item_id, components):
+        """Replaces the composition of a set with (part_item_id, quantity) pairs."""
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM set_components WHERE set_item_id = ?", (set_item_id,))
+        cursor.executemany(
+            "INSERT OR REPLACE INTO set_components (set_item_id, part_item_id, quantity) VALUES (?, ?, ?)",
+            [(set_item_id, part_id, quantity) for part_id, quantity in components]
+        )
+        self.conn.commit()
+
+    def get_set_components(self, set_item_id, include_unknown=False):
+        """Parts of a set. Parts missing from the catalog are stored by slug and only returned with
+        include_unknown, with an id of None."""
+        cursor = self.conn.cursor()
+        cursor.execute(f'''
+            SELECT i.id, c.part_item_id, i.url_name, i.item_name, c.quantity
+            FROM set_components c
+            {"LEFT JOIN" if include_unknown else "JOIN"} items i ON c.part_item_id = i.id
+            WHERE c.set_item_id = ?
+            ORDER BY COALESCE(i.item_name, c.part_item_id)
+        ''', (set_item_id,))
+        return [{"id": r[0], "url_name": r[2] or r[1], "item_name": r[3] or r[1].replace("_", " ").title(), "quantity": r[4]}
+                for r in cursor.fetchall()]
+
+    def get_all_set_components(self):
+        """Returns every known set composition as set item id -> list of parts, in one query."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT c.set_item_id, c.part_item_id, i.url_name, i.item_name, c.quantity
+            FROM set_components c
+            JOIN items i ON c.part_item_id = i.id
+            ORDER BY c.set_item_id, i.item_name
+        ''')
+        results = {}
+        for r in cursor.fetchall():
+            results.setdefault(r[0], []).append({"id": r[1], "url_name": r[2], "item_name": r[3], "quantity": r[4]})
+        return results
+
     def get_setting(self, key, default=None):
         cursor = self.conn.cursor()
         cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
@@ -220,5 +438,108 @@ class Database:
         cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, str(value)))
         self.conn.commit()
 
+    def get_item_access(self, item_ids=None):
+        """Returns item id -> access row, for the given items or all of them."""
+        cursor = self.conn.cursor()
+        query = "SELECT item_id, url_name, item_type, score, hits, last_access FROM item_access"
+        if item_ids is None:
+            cursor.execute(query)
+        else:
+            item_ids = list(item_ids)
+            cursor.execute(f"{query} WHERE item_id IN ({','.join('?' * len(item_ids))})", item_ids)
+        return {r[0]: {"item_id": r[0], "url_name": r[1], "item_type": r[2], "score": r[3], "hits": r[4], "last_access": r[5]}
+                for r in cursor.fetchall()}
+
+    def save_item_access(self, rows):
+        """Writes (item_id, url_name, item_type, score, hits, last_access) rows in one transaction."""
+        cursor = self.conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO item_access (item_id, url_name, item_type, score, hits, last_access)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', rows)
+        self.conn.commit()
+
+    def create_scan_job(self, name):
+        cursor = self.conn.cursor()
+        now = time.time()
+        cursor.execute("INSERT INTO scan_jobs (name, status, created, updated) VALUES (?, 'running', ?, ?)", (name, now, now))
+        self.conn.commit()
+        return cursor.lastrowid
+
+    def get_open_scan_job(self, name):
+        """Returns the latest unfinished job with this name, if any. Jobs that ended with failed items count as unfinished."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT id, name, status, created, updated FROM scan_jobs WHERE name = ? AND status IN ('running', 'failed') ORDER BY id DESC LIMIT 1", (name,))
+        r = cursor.fetchone()
+        if r:
+            return {"id": r[0], "name": r[1], "status": r[2], "created": r[3], "updated": r[4]}
+        return None
+
+    def finish_scan_job(self, job_id, status="done"):
+        cursor = self.conn.cursor()
+        cursor.execute("UPDATE scan_jobs SET status = ?, updated = ? WHERE id = ?", (status, time.time(), job_id))
+        self.conn.commit()
+
+    def retry_failed_scan_items(self, job_id):
+        """Gives the failed items of a resumed job a fresh set of retries."""
+        cursor = self.conn.cursor()
+        now = time.time()
+        cursor.execute("UPDATE scan_job_items SET state = 'pending', retries = 0, updated = ? WHERE job_id = ? AND state = 'failed'", (now, job_id))
+        cursor.execute("UPDATE scan_jobs SET status = 'running', updated = ? WHERE id = ?", (now, job_id))
+        self.conn.commit()
+
+    def add_scan_job_items(self, job_id, items, force_refresh=False, reset=True):
+        """Queues (item_id, url_name, item_type, max_rank) tuples.
+
+        Items already in the job go back to pending, unless reset is False, in which case they keep their state.
+        """
+        cursor = self.conn.cursor()
+        now = time.time()
+        if reset:
+            conflict = '''DO UPDATE SET
+                state = 'pending', retries = 0, error = NULL,
+                force_refresh = MAX(force_refresh, excluded.force_refresh),
+                queued = excluded.queued, updated = excluded.updated'''
+        else:
+            conflict = "DO NOTHING"
+        cursor.executemany(f'''
+            INSERT INTO scan_job_items (job_id, item_id, url_name, item_type, max_rank, force_refresh, state, retries, queued, updated)
+            VALUES (?, ?, ?, ?, ?, ?, 'pending', 0, ?, ?)
+            ON CONFLICT(job_id, item_id) {conflict}
+        ''', [(job_id, i[0], i[1], i[2], i[3], int(force_refresh), now, now) for i in items])
+        cursor.execute("UPDATE scan_jobs SET updated = ? WHERE id = ?", (now, job_id))
+        self.conn.commit()
+
+    def get_scan_job_items(self, job_id, max_retries=None):
+        """Returns the items of a job that still need work: pending ones and failed ones below max_retries."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT item_id, url_name, item_type, max_rank, force_refresh, state, retries, queued
+            FROM scan_job_items
+            WHERE job_id = ? AND (state = 'pending' OR (state = 'failed' AND (? IS NULL OR retries < ?)))
+            ORDER BY queued, rowid
+        ''', (job_id, max_retries, max_retries))
+        results = []
+        for r in cursor.fetchall():
+            results.append({
+                "item_id": r[0], "url_name": r[1], "item_type": r[2], "max_rank": r[3],
+                "force_refresh": bool(r[4]), "state": r[5], "retries": r[6], "queued": r[7]
+            })
+        return results
+
+    def get_scan_job_counts(self, job_id):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT state, COUNT(*) FROM scan_job_items WHERE job_id = ? GROUP BY state", (job_id,))
+        return dict(cursor.fetchall())
+
+    def set_scan_item_state(self, job_id, item_id, state, error=None):
+        cursor = self.conn.cursor()
+        retries_inc = 1 if state == "failed" else 0
+        cursor.execute('''
+            UPDATE scan_job_items SET state = ?, error = ?, retries = retries + ?, updated = ?
+            WHERE job_id = ? AND item_id = ?
+        ''', (state, error, retries_inc, time.time(), job_id, item_id))
+        self.conn.commit()
+
     def close(self):
         self.conn.close()
@@ -0,0 +1,256 @@
+import struct
+import sys
+import time
+import zlib
+from array import array
+from pathlib import Path
+from services.metrics import connect
+
+FORMAT_VERSION = 1
+ID_BYTES = 12
+STATUSES = ("offline", "online", "ingame")
+KEYFRAME_INTERVAL = 12
+_HEADER = struct.Struct("<BI")
+_DELTA_HEADER = struct.Struct("<BII")
+
+
+def _little_endian(column):
+    if sys.byteorder != "little":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column
+
+
+def orders_to_rows(orders):
+    """Reduces orders to (id, platinum, rank, flags) rows, keeping only what pricing reads.
+
+    flags holds sell/buy in bit 0 and the user status (index into STATUSES) above it.
+    """
+    rows = []
+    for o in orders:
+        rank = o.get("mod_rank")
+        status = (o.get("user") or {}).get("status", "offline")
+        status_code = STATUSES.index(status) if status in STATUSES else 0
+        try:
+            order_id = bytes.fromhex(o.get("id") or "")
+        except ValueError:
+            order_id = b""
+        rows.append((
+            order_id[:ID_BYTES].ljust(ID_BYTES, b"\0"),
+            int(o.get("platinum") or 0),
+            -1 if rank is None else rank,
+            (1 if o.get("order_type") == "sell" else 0) | status_code << 1
+        ))
+    return rows
+
+
+def rows_to_orders(rows):
+    """Rebuilds orders in the shape get_orders() returns, enough for PriceCalculator."""
+    return [{
+        "id": order_id.hex(),
+        "order_type": "sell" if flag & 1 else "buy",
+        "platinum": plat,
+        "mod_rank": None if rank < 0 else rank,
+        "user": {"status": STATUSES[flag >> 1]}
+    } for order_id, plat, rank, flag in rows]
+
+
+def _pack_rows(rows):
+    platinum = array("I", (r[1] for r in rows))
+    ranks = array("b", (r[2] for r in rows))
+    flags = array("B", (r[3] for r in rows))
+    return _little_endian(platinum).tobytes() + ranks.tobytes() + flags.tobytes() + b"".join(r[0] for r in rows)
+
+
+def _unpack_rows(raw, offset, count):
+    platinum = array("I")
+    platinum.frombytes(raw[offset:offset + 4 * count])
+    platinum = _little_endian(platinum)
+    offset += 4 * count
+    ranks = array("b", raw[offset:offset + count])
+    offset += count
+    flags = array("B", raw[offset:offset + count])
+    offset += count
+    ids = [raw[offset + i * ID_BYTES:offset + (i + 1) * ID_BYTES] for i in range(count)]
+    return list(zip(ids, platinum, ranks, flags)), offset + count * ID_BYTES
+
+
+def encode_rows(rows):
+    """Compressed columnar blob of a whole order book (a keyframe)."""
+    return zlib.compress(_HEADER.pack(FORMAT_VERSION, len(rows)) + _pack_rows(rows), 6)
+
+
+def decode_rows(blob):
+    raw = zlib.decompress(blob)
+    version, count = _HEADER.unpack_from(raw)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format {version}")
+    return _unpack_rows(raw, _HEADER.size, count)[0]
+
+
+def encode_orders(orders):
+    return encode_rows(orders_to_rows(orders))
+
+
+def decode_orders(blob):
+    return rows_to_orders(decode_rows(blob))
+
+
+def diff_books(previous, rows):
+    """Returns (removed ids, added or repriced rows) that turn `previous` into `rows`."""
+    current = {r[0]: r for r in rows}
+    old = {r[0]: r for r in previous}
+    removed = [order_id for order_id in old if order_id not in current]
+    changed = [r for order_id, r in current.items() if old.get(order_id) != r]
+    return removed, changed
+
+
+def encode_delta(removed, changed):
+    raw = _DELTA_HEADER.pack(FORMAT_VERSION, len(removed), len(changed)) + b"".join(removed) + _pack_rows(changed)
+    return zlib.compress(raw, 6)
+
+
+def apply_delta(rows, blob):
+    raw = zlib.decompress(blob)
+    version, removed_count, changed_count = _DELTA_HEADER.unpack_from(raw)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format {version}")
+
+    offset = _DELTA_HEADER.size
+    removed = {raw[offset + i * ID_BYTES:offset + (i + 1) * ID_BYTES] for i in range(removed_count)}
+    changed, _ = _unpack_rows(raw, offset + removed_count * ID_BYTES, changed_count)
+
+    book = {r[0]: r for r in rows if r[0] not in removed}
+    for r in changed:
+        book[r[0]] = r
+    return list(book.values())
+
+
+class SnapshotStore:
+    """Optional archive of raw order books, kept in its own database next to cache.db.
+
+    Lets prices be recomputed locally (see services.repricer) when the pricing rules change,
+    instead of downloading every order book again. Consecutive fetches of an item mostly list the
+    same orders, so only every `keyframe_interval`-th snapshot stores the whole book; the others
+    store the orders removed, added or repriced since the previous fetch.
+    """
+
+    def __init__(self, db_file=None, keyframe_interval=KEYFRAME_INTERVAL):
+        if getattr(sys, 'frozen', False):
+            base_dir = Path(sys.executable).parent
+        else:
+            base_dir = Path(__file__).parent
+
+        self.db_file = Path(db_file) if db_file else base_dir / "snapshots.db"
+        self.keyframe_interval = keyframe_interval
+        self.conn = connect(self.db_file, check_same_thread=False)
+        self.create_tables()
+
+    def create_tables(self):
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS "snapshots" (
+                "item_id" TEXT NOT NULL,
+                "timestamp" REAL NOT NULL,
+                "item_type" TEXT NOT NULL,
+                "orders_count" INTEGER NOT NULL,
+                "data" BLOB NOT NULL,
+                PRIMARY KEY("item_id", "timestamp")
+            );
+        ''')
+        cursor = self.conn.cursor()
+        cursor.execute("PRAGMA table_info(snapshots)")
+        if "is_keyframe" not in {r[1] for r in cursor.fetchall()}:
+            # Archives written before deltas existed only contain full snapshots.
+            cursor.execute('ALTER TABLE snapshots ADD COLUMN "is_keyframe" INTEGER NOT NULL DEFAULT 1')
+        self.conn.commit()
+
+    def _chain(self, item_id, timestamp=None):
+        """Rows from the last keyframe at or before `timestamp` up to `timestamp`, oldest first."""
+        ts = timestamp if timestamp is not None else float("inf")
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT timestamp, is_keyframe, data FROM snapshots
+            WHERE item_id = ? AND timestamp <= ? AND timestamp >= COALESCE(
+                (SELECT MAX(timestamp) FROM snapshots WHERE item_id = ? AND is_keyframe = 1 AND timestamp <= ?), 0)
+            ORDER BY timestamp
+        ''', (item_id, ts, item_id, ts))
+        return cursor.fetchall()
+
+    @staticmethod
+    def _replay(chain):
+        rows = None
+        for _, is_keyframe, data in chain:
+            rows = decode_rows(data) if is_keyframe else apply_delta(rows or [], data)
+        return rows
+
+    def save(self, item_id, item_type, orders, timestamp=None):
+        rows = orders_to_rows(orders)
+        chain = self._chain(item_id)
+
+        blob = None
+        ids_unique = len({r[0] for r in rows}) == len(rows) and all(any(r[0]) for r in rows)
+        if chain and len(chain) < self.keyframe_interval and ids_unique:
+            removed, changed = diff_books(self._replay(chain), rows)
+            # A delta that touches most of the book is no smaller than the book itself.
+            if len(removed) + len(changed) < len(rows):
+                blob = encode_delta(removed, changed)
+
+        is_keyframe = blob is None
+        if is_keyframe:
+            blob = encode_rows(rows)
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO snapshots (item_id, timestamp, item_type, orders_count, data, is_keyframe) VALUES (?, ?, ?, ?, ?, ?)",
+            (item_id, timestamp or time.time(), item_type, len(rows), blob, int(is_keyframe))
+        )
+        self.conn.commit()
+
+    def get_orders(self, item_id, timestamp=None):
+        """Order book of an item as it was at `timestamp` (the latest one by default), or None."""
+        rows = self._replay(self._chain(item_id, timestamp))
+        return rows_to_orders(rows) if rows is not None else None
+
+    def iter_latest(self, raw=False):
+        """Yields (item_id, item_type, timestamp, orders) for the newest snapshot of every item.
+
+        Reads each item's current keyframe chain in a single pass over the table. With `raw`, the
+        orders are left encoded (a decode_orders() blob) for pricing in another process.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT s.item_id, s.item_type, s.timestamp, s.is_keyframe, s.data
+            FROM snapshots s
+            JOIN (SELECT item_id, MAX(timestamp) AS ts FROM snapshots WHERE is_keyframe = 1 GROUP BY item_id) k
+              ON s.item_id = k.item_id AND s.timestamp >= k.ts
+            ORDER BY s.item_id, s.timestamp
+        ''')
+        def book(rows, blob):
+            if raw:
+                return blob if blob is not None else encode_rows(rows)
+            return rows_to_orders(rows if rows is not None else decode_rows(blob))
+
+        # (item_id, item_type, timestamp, rows, blob); a lone keyframe is only decoded if needed.
+        current = None
+        for item_id, item_type, timestamp, is_keyframe, data in cursor:
+            if current and current[0] != item_id:
+                yield current[0], current[1], current[2], book(current[3], current[4])
+                current = None
+            if is_keyframe:
+                current = (item_id, item_type, timestamp, None, data)
+            else:
+                rows = current[3] if current[3] is not None else decode_rows(current[4])
+                current = (item_id, item_type, timestamp, apply_delta(rows, data), None)
+        if current:
+            yield current[0], current[1], current[2], book(current[3], current[4])
+
+    def stats(self):
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT COUNT(*), COUNT(DISTINCT item_id), COALESCE(SUM(LENGTH(data)), 0), COALESCE(SUM(is_keyframe), 0)
+            FROM snapshots
+        ''')
+        count, items, size, keyframes = cursor.fetchone()
+        return {"snapshots": count, "items": items, "bytes": size, "keyframes": keyframes}
+
+    def close(self):
+        self.conn.close()
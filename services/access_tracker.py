@@ -0,0 +1,99 @@
+import time
+from data.database import Database
+from services.market_scanner import MarketScanner
+
+
+class AccessTracker:
+    """Remembers which items get looked at, so their prices can be refreshed before they're needed.
+
+    Every access adds the weight of its kind to the item's score, and a score halves for every
+    HALF_LIFE the item goes unused. Ranking by the decayed score counts how often an item is used
+    (LFU) without letting old habits outrank what is being looked at this week (LRU).
+    """
+
+    HALF_LIFE = 3 * 24 * 3600
+    WEIGHTS = {"popup": 5.0, "search": 2.0, "visible": 0.25}
+
+    def __init__(self, db=None, half_life=HALF_LIFE):
+        self.db = db or Database()
+        self.half_life = half_life
+
+    def decayed(self, score, last_access, now):
+        return score * 0.5 ** (max(0.0, now - (last_access or now)) / self.half_life)
+
+    def record(self, items, kind, now=None):
+        """Counts one access of kind `kind` to each of the (item_id, url_name, item_type) tuples."""
+        items = {item[0]: item for item in items}
+        if not items:
+            return
+        now = now or time.time()
+        weight = self.WEIGHTS[kind]
+        existing = self.db.get_item_access(items)
+        rows = []
+        for item_id, url_name, item_type in items.values():
+            row = existing.get(item_id)
+            score = weight + (self.decayed(row['score'], row['last_access'], now) if row else 0.0)
+            hits = (row['hits'] if row else 0) + 1
+            rows.append((item_id, url_name, item_type, score, hits, now))
+        self.db.save_item_access(rows)
+
+    def ranked(self, limit=None, now=None):
+        """Access rows with their decayed "score", highest first."""
+        now = now or time.time()
+        rows = list(self.db.get_item_access().values())
+        for row in rows:
+            row['score'] = self.decayed(row['score'], row['last_access'], now)
+        rows.sort(key=lambda r: -r['score'])
+        return rows[:limit] if limit else rows
+
+
+class CacheWarmer:
+    """Refreshes the prices of the most looked-at items before they expire, a few requests at a time.
+
+    Sets bring their parts along, so their details popups open warm as well. Items whose price is
+    younger than REFRESH_AGE of the cache TTL are left alone.
+    """
+
+    BUDGET = 12
+    TOP = 50
+    REFRESH_AGE = 0.75
+
+    def __init__(self, scanner=None, tracker=None, budget=BUDGET, top=TOP):
+        self.scanner = scanner or MarketScanner()
+        self.tracker = tracker or AccessTracker(self.scanner.db)
+        self.budget = budget
+        self.top = top
+
+    def needs_refresh(self, item_id, item_type, now):
+        cached = self.scanner.load_cached(item_id, item_type)
+        return not cached or now - cached['timestamp'] >= MarketScanner.CACHE_TTL * self.REFRESH_AGE
+
+    def plan(self, now=None):
+        """Scanner work items for the best-ranked stale prices, at most `budget` of them."""
+        now = now or time.time()
+        work = []
+        seen = set()
+        for row in self.tracker.ranked(self.top, now):
+            if len(work) >= self.budget:
+                break
+            item_id, item_type = row['item_id'], row['item_type']
+            if item_type == 'arcane':
+                cached = self.scanner.load_cached(item_id, item_type)
+                max_rank = cached['max_rank'] if cached and cached.get('max_rank') else MarketScanner.DEFAULT_MAX_RANK
+                candidates = [(item_id, row['url_name'], item_type, max_rank)]
+            else:
+                candidates = [(item_id, row['url_name'], item_type, MarketScanner.DEFAULT_MAX_RANK)]
+                candidates += [(c['id'], c['url_name'], 'part', MarketScanner.DEFAULT_MAX_RANK)
+                               for c in self.scanner.db.get_set_components(item_id)]
+            for item in candidates:
+                if item[0] not in seen and len(work) < self.budget and self.needs_refresh(item[0], item[2], now):
+                    work.append(item)
+                seen.add(item[0])
+        return work
+
+    def warm(self, on_result=None, workers=1):
+        """Fetches the planned items. Returns the scanner stats, or None when everything is warm."""
+        work = self.plan()
+        if not work:
+            return None
+        return self.scanner.scan(work, workers=workers, force_refresh=True, on_result=on_result)
@@ -0,0 +1,100 @@
+import time
+from data.database import Database
+from services.catalog import load_catalog
+from services.market_scanner import MarketScanner
+from services.metrics import metrics
+from services.set_components import catalog_sets
+
+
+class ArbitrageScanner:
+    """Compares every set's price with the sum of its parts across the whole catalog.
+
+    Parts shared by several sets are fetched once, and set or part prices that are still
+    inside the cache TTL are reused, so a full scan only requests what is actually stale.
+    """
+
+    def __init__(self, scanner=None, db=None):
+        self.db = db or Database()
+        self.scanner = scanner or MarketScanner(db=self.db)
+
+    def collect_work(self, sets, compositions, force_refresh=False):
+        """Returns the deduplicated list of stale sets and parts plus the fresh cached prices."""
+        now = time.time()
+        set_prices = self.db.get_latest_set_prices()
+        part_prices = self.db.get_latest_part_prices()
+
+        def is_fresh(cached):
+            fresh = cached is not None and not force_refresh and now - cached['timestamp'] < MarketScanner.CACHE_TTL
+            metrics.cache_check("arbitrage", cached is not None, fresh)
+            return fresh
+
+        prices = {}
+        work = {}
+        for s in sets:
+            cached = set_prices.get(s['id'])
+            if is_fresh(cached):
+                prices[s['id']] = cached
+            else:
+                work[s['id']] = (s['id'], s['url_name'], 'set', MarketScanner.DEFAULT_MAX_RANK)
+
+            for part in compositions[s['id']]:
+                if part['id'] in prices or part['id'] in work:
+                    continue
+                cached = part_prices.get(part['id'])
+                if is_fresh(cached):
+                    prices[part['id']] = cached
+                else:
+                    work[part['id']] = (part['id'], part['url_name'], 'part', MarketScanner.DEFAULT_MAX_RANK)
+
+        return list(work.values()), prices
+
+    def scan(self, catalog=None, workers=3, force_refresh=False, mode="avg", resume=True):
+        """Prices every set with a known composition and returns (results, stats).
+
+        Results are sorted by spread = set price - sum of parts, so the top rows are the best
+        "buy parts, sell set" flips and the bottom rows the best "buy set, sell parts" ones.
+        """
+        catalog = catalog if catalog is not None else load_catalog(self.scanner.api, self.db)
+        compositions = self.db.get_all_set_components()
+        sets = [s for s in catalog_sets(catalog) if compositions.get(s['id'])]
+
+        work, prices = self.collect_work(sets, compositions, force_refresh)
+
+        def on_result(item, summary, from_cache):
+            prices[item[0]] = summary
+
+        stats = {"sets": len(sets), "requests": len(work), "cached": len(prices)}
+        if work:
+            # Items are already known to be stale, so the scanner must not skip them as cached.
+            job_stats = self.scanner.run_job("arbitrage", work, workers=workers, force_refresh=True,
+                                             on_result=on_result, resume=resume)
+            stats["failed"] = job_stats["failed"]
+            stats["elapsed"] = job_stats["elapsed"]
+        else:
+            stats["failed"] = 0
+            stats["elapsed"] = 0.0
+
+        key = "low" if mode == "low" else "avg"
+        results = []
+        for s in sets:
+            set_price = (prices.get(s['id']) or {}).get(key) or 0
+            parts = compositions[s['id']]
+            part_values = [(prices.get(p['id']) or {}).get(key) or 0 for p in parts]
+            if set_price <= 0 or any(v <= 0 for v in part_values):
+                continue
+
+            parts_total = sum(v * p['quantity'] for v, p in zip(part_values, parts))
+            spread = set_price - parts_total
+            results.append({
+                "id": s['id'],
+                "url_name": s['url_name'],
+                "item_name": s['item_name'],
+                "set_price": set_price,
+                "parts_total": parts_total,
+                "spread": spread,
+                "spread_pct": spread / parts_total * 100 if parts_total else 0.0,
+                "parts": len(parts)
+            })
+
+        results.sort(key=lambda r: r['spread'], reverse=True)
+        return results, stats
@@ -0,0 +1,39 @@
+from api.warframe_market import WarframeMarketAPI
+from data.database import Database
+
+CATEGORIES = ("warframe", "primary", "secondary", "melee", "arcane")
+
+
+def matches_category(tags, category):
+    """Checks whether an item with the given tags belongs to one of the app's categories."""
+    if category == 'warframe':
+        return 'set' in tags and 'warframe' in tags
+    if category in ('primary', 'secondary', 'melee'):
+        return 'set' in tags and category in tags and 'weapon' in tags
+    if category == 'arcane':
+        return 'arcane_enhancement' in tags or 'arcane' in tags
+    return False
+
+
+def filter_by_category(items, category):
+    """Returns the catalog items shown on a category tab."""
+    filtered = [x for x in items if matches_category(x.get('tags', []), category)]
+
+    if not filtered and items and category == 'unknown':
+        filtered = items
+
+    return filtered
+
+
+def load_catalog(api=None, db=None, refresh=False):
+    """Loads the item catalog from the local cache, downloading it when the cache is empty."""
+    db = db or Database()
+    items = [] if refresh else db.get_all_items()
+
+    if not items:
+        api = api or WarframeMarketAPI()
+        api_items = api.get_items()
+        db.save_items(api_items)
+        items = db.get_all_items()
+
+    return items
@@ -0,0 +1,68 @@
+import time
+from data.database import Database
+from services.catalog import load_catalog
+from services.market_scanner import MarketScanner
+from services.metrics import metrics
+
+
+def ducat_items(catalog):
+    """Catalog items that can be traded in for ducats (prime parts, not whole sets)."""
+    return [item for item in catalog if item.get('ducats') and 'set' not in item.get('tags', [])]
+
+
+class DucatScanner:
+    """Ranks every prime part by ducats per platinum at the cheapest in-game price.
+
+    Works like ArbitrageScanner: fresh cached prices are reused from one bulk query and only the
+    stale parts are refreshed through a resumable scan job.
+    """
+
+    def __init__(self, scanner=None, db=None):
+        self.db = db or Database()
+        self.scanner = scanner or MarketScanner(db=self.db)
+
+    def scan(self, catalog=None, workers=3, force_refresh=False, resume=True, refresh=True):
+        """Returns (results, stats). Results are sorted by ducats per platinum, best first.
+
+        With refresh=False nothing is downloaded and parts without a cached price are left out.
+        """
+        catalog = catalog if catalog is not None else load_catalog(self.scanner.api, self.db)
+        parts = ducat_items(catalog)
+
+        now = time.time()
+        prices = self.db.get_latest_part_prices()
+        work = []
+        for part in parts:
+            cached = prices.get(part['id'])
+            fresh = bool(cached) and now - cached['timestamp'] < MarketScanner.CACHE_TTL
+            metrics.cache_check("ducats", bool(cached), fresh)
+            if force_refresh or not fresh:
+                work.append((part['id'], part['url_name'], 'part', MarketScanner.DEFAULT_MAX_RANK))
+
+        def on_result(item, summary, from_cache):
+            prices[item[0]] = summary
+
+        stats = {"parts": len(parts), "requests": len(work) if refresh else 0, "failed": 0, "elapsed": 0.0}
+        if refresh and work:
+            job_stats = self.scanner.run_job("ducats", work, workers=workers, force_refresh=True,
+                                             on_result=on_result, resume=resume)
+            stats["failed"] = job_stats["failed"]
+            stats["elapsed"] = job_stats["elapsed"]
+
+        results = []
+        for part in parts:
+            low = (prices.get(part['id']) or {}).get('low') or 0
+            if low <= 0:
+                continue
+            results.append({
+                "id": part['id'],
+                "url_name": part['url_name'],
+                "item_name": part['item_name'],
+                "ducats": part['ducats'],
+                "low": low,
+                "ducats_per_plat": part['ducats'] / low,
+                "vaulted": part.get('vaulted')
+            })
+
+        results.sort(key=lambda r: r['ducats_per_plat'], reverse=True)
+        return results, stats
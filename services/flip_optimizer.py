@@ -0,0 +1,104 @@
+from data.database import Database
+
+
+def fusion_units(rank):
+    """Rank 0 copies contained in one arcane of the given rank: (r+1)(r+2)/2."""
+    return (rank + 1) * (rank + 2) // 2
+
+
+def cheapest_fill(buy_prices, target_rank):
+    """Cheapest mix of lower-rank copies that fuses into exactly one arcane of `target_rank`.
+
+    `buy_prices` maps rank -> price of one copy. This is an unbounded knapsack that must fill
+    exactly fusion_units(target_rank) units, where a rank r copy is worth fusion_units(r) units.
+    Returns (cost, {rank: copies}), or (None, {}) when the target cannot be reached.
+    """
+    capacity = fusion_units(target_rank)
+    options = [(fusion_units(r), p, r) for r, p in buy_prices.items() if r < target_rank and p and p > 0]
+    if not options:
+        return None, {}
+
+    best = [0.0] + [None] * capacity
+    choice = [None] * (capacity + 1)
+    for units in range(1, capacity + 1):
+        for size, price, rank in options:
+            if size > units or best[units - size] is None:
+                continue
+            cost = best[units - size] + price
+            if best[units] is None or cost < best[units]:
+                best[units] = cost
+                choice[units] = (size, rank)
+
+    if best[capacity] is None:
+        return None, {}
+
+    plan = {}
+    units = capacity
+    while units:
+        size, rank = choice[units]
+        plan[rank] = plan.get(rank, 0) + 1
+        units -= size
+    return best[capacity], plan
+
+
+def describe_plan(plan):
+    return " + ".join(f"{count}x R{rank}" for rank, count in sorted(plan.items(), reverse=True))
+
+
+class FlipOptimizer:
+    """Ranks every arcane by the profit of buying lower-rank copies and selling one max rank copy.
+
+    Uses the per-rank prices in arcane_ranks, falling back to the rank 0 / max rank prices of the
+    arcanes table for arcanes scanned before per-rank prices were stored.
+    """
+
+    def __init__(self, db=None):
+        self.db = db or Database()
+
+    def load_rank_prices(self, mode="avg"):
+        """Returns item id -> (max rank, {rank: price}) for every priced arcane, from two queries."""
+        key = "low" if mode == "low" else "avg"
+        latest = self.db.get_latest_arcane_prices()
+        ranks = self.db.get_all_arcane_ranks()
+
+        books = {}
+        for item_id, summary in latest.items():
+            max_rank = summary['max_rank'] or 5
+            prices = {r: p[key] for r, p in ranks.get(item_id, {}).items()}
+            if not prices:
+                prices = {0: summary[f'{key}_r0'], max_rank: summary[f'{key}_max']}
+            books[item_id] = (max_rank, {r: p for r, p in prices.items() if p and p > 0})
+        return books
+
+    @staticmethod
+    def evaluate(max_rank, prices):
+        """Best flip of one arcane, or None when it has no max rank price or no way to build one."""
+        sell = prices.get(max_rank)
+        if not sell:
+            return None
+        cost, plan = cheapest_fill(prices, max_rank)
+        if cost is None:
+            return None
+        profit = sell - cost
+        return {"max_rank": max_rank, "sell": sell, "cost": cost, "profit": profit,
+                "roi": profit / cost * 100, "plan": plan}
+
+    def optimize(self, mode="avg", sort_by="profit", items=None):
+        """Evaluates every arcane in one pass and returns them sorted by profit or ROI (best first)."""
+        books = self.load_rank_prices(mode)
+        if items is None:
+            items = self.db.get_all_items('arcane')
+
+        results = []
+        for item in items:
+            book = books.get(item['id'])
+            if not book:
+                continue
+            flip = self.evaluate(*book)
+            if flip:
+                flip.update({"id": item['id'], "url_name": item['url_name'], "item_name": item['item_name'],
+                             "plan_text": describe_plan(flip['plan'])})
+                results.append(flip)
+
+        results.sort(key=lambda r: r['roi' if sort_by == "roi" else 'profit'], reverse=True)
+        return results
@@ -0,0 +1,228 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from api.warframe_market import WarframeMarketAPI
+from data.database import Database
+from services.metrics import metrics
+from services.price_calculator import PriceCalculator
+
+
+class MarketScanner:
+    """Refreshes cached set, part and arcane prices without any UI dependency.
+
+    `item_type` is 'arcane', 'part', or anything else for sets (the GUI passes its tab category).
+    """
+
+    CACHE_TTL = 3600
+    DEFAULT_MAX_RANK = 5
+    MAX_RETRIES = 3
+    # Seconds before the first retry of a failed item; doubles with every retry after that.
+    RETRY_DELAY = 2.0
+
+    def __init__(self, api=None, db=None, snapshots=None, pricing_pool=None):
+        self.api = api or WarframeMarketAPI()
+        self.db = db or Database()
+        # Optional SnapshotStore; when set, every fetched order book is archived with its prices.
+        self.snapshots = snapshots
+        # Optional services.price_pool.PricePool; when set, response bodies are decoded and priced there.
+        self.pricing_pool = pricing_pool
+
+    @classmethod
+    def normalize_max_rank(cls, max_rank):
+        if not max_rank or max_rank <= 0 or max_rank > cls.DEFAULT_MAX_RANK:
+            return cls.DEFAULT_MAX_RANK
+        return max_rank
+
+    def get_cached(self, item_id, item_type, force_refresh=False, fresh_since=None):
+        """Returns the cached price summary of an item if it can be reused.
+
+        Normally that means it is inside the TTL. A forced refresh only reuses prices written
+        after `fresh_since`, which lets an interrupted forced job skip what it already did.
+        """
+        if force_refresh and fresh_since is None:
+            return None
+
+        cached = self.load_cached(item_id, item_type)
+        if not cached:
+            metrics.cache_check("scanner", False, False)
+            return None
+        if force_refresh:
+            fresh = cached['timestamp'] >= fresh_since
+        else:
+            fresh = time.time() - cached['timestamp'] < self.CACHE_TTL
+        metrics.cache_check("scanner", True, fresh)
+        return cached if fresh else None
+
+    def load_cached(self, item_id, item_type):
+        """The latest cached price summary of an item however old it is, or None."""
+        if item_type == 'arcane':
+            return self.db.get_arcane_price(item_id)
+        if item_type == 'part':
+            return self.db.get_latest_part_prices([item_id]).get(item_id)
+        return self.db.get_set_price(item_id)
+
+    @classmethod
+    def price(cls, orders, item_type, max_rank=DEFAULT_MAX_RANK):
+        if item_type == 'arcane':
+            return PriceCalculator.summarize_arcane(orders, cls.normalize_max_rank(max_rank))
+        return PriceCalculator.summarize_item(orders)
+
+    def fetch_book(self, url_name, item_type, max_rank=DEFAULT_MAX_RANK):
+        """Downloads the order book of an item and returns (summary, orders). Does not touch the database.
+
+        With a pricing pool, orders is None unless there is a snapshot store to archive them in.
+        """
+        if self.pricing_pool is not None:
+            body = self.api.get_orders_raw(url_name)
+            return self.pricing_pool.submit("json", body, item_type, max_rank,
+                                            keep_orders=self.snapshots is not None).result()
+        orders = self.api.get_orders(url_name, raise_errors=True)
+        return self.price(orders, item_type, max_rank), orders
+
+    def fetch(self, url_name, item_type, max_rank=DEFAULT_MAX_RANK):
+        """Downloads the order book of an item and prices it. Does not touch the database."""
+        return self.fetch_book(url_name, item_type, max_rank)[0]
+
+    def save(self, item_id, item_type, summary, orders=None):
+        # The snapshot and the derived rows share a timestamp so re-pricing can find the rows again.
+        now = time.time()
+        if item_type == 'arcane':
+            self.db.save_arcane_price(
+                item_id, summary['max_rank'],
+                summary['avg_r0'], summary['avg_max'], summary['avg_flip'],
+                summary['low_r0'], summary['low_max'], summary['low_flip'], now
+            )
+            if summary.get('ranks'):
+                self.db.save_arcane_ranks(item_id, summary['ranks'], now)
+        elif item_type == 'part':
+            # Part prices are shared by every set the part belongs to, so they are not tied to a set row.
+            self.db.save_part_price(None, item_id, summary['avg'], summary['low'], now)
+        else:
+            self.db.save_set_price(item_id, summary['avg'], summary['low'], now)
+
+        if self.snapshots is not None and orders is not None:
+            self.snapshots.save(item_id, 'arcane' if item_type == 'arcane' else 'part' if item_type == 'part' else 'set',
+                                orders, now)
+
+    def refresh(self, item_id, url_name, item_type, max_rank=DEFAULT_MAX_RANK, force_refresh=False, fresh_since=None):
+        """Returns (summary, from_cache) for one item, fetching and saving it when the cache is stale."""
+        cached = self.get_cached(item_id, item_type, force_refresh, fresh_since)
+        if cached:
+            return cached, True
+
+        summary, orders = self.fetch_book(url_name, item_type, max_rank)
+        self.save(item_id, item_type, summary, orders)
+        return summary, False
+
+    def scan(self, items, workers=1, force_refresh=False, on_result=None):
+        """Refreshes many items at once, keeping the work in memory only.
+
+        `items` is a list of (item_id, url_name, item_type, max_rank) tuples. Order books are
+        downloaded by `workers` threads sharing the API rate limit, while every database write
+        happens on the calling thread. `on_result(item, summary, from_cache)` is called per item.
+        """
+        entries = [(item, force_refresh, None) for item in items]
+        return self._process(entries, workers, on_result)
+
+    def run_job(self, name, items, workers=1, force_refresh=False, on_result=None, resume=True):
+        """Like scan(), but checkpoints every item in the scan_jobs tables.
+
+        Failed items are retried up to MAX_RETRIES times, waiting longer before every round. A job
+        that still has failed items is left with status 'failed', and the next run with the same
+        name resumes it: items already done are skipped and the failed ones get new retries.
+        """
+        job = self.db.get_open_scan_job(name)
+        if job and not resume:
+            self.db.finish_scan_job(job['id'], status="abandoned")
+            job = None
+
+        if job:
+            job_id = job['id']
+            self.db.retry_failed_scan_items(job_id)
+            self.db.add_scan_job_items(job_id, items, force_refresh, reset=False)
+        else:
+            job_id = self.db.create_scan_job(name)
+            self.db.add_scan_job_items(job_id, items, force_refresh)
+
+        stats = {"job_id": job_id, "resumed": job is not None, "items": 0, "cached": 0, "fetched": 0, "failed": 0, "elapsed": 0.0}
+        rounds = 0
+        while True:
+            pending = self.db.get_scan_job_items(job_id, self.MAX_RETRIES)
+            if not pending:
+                break
+
+            # Retry rounds go over items of the first round again; count each item once.
+            if rounds:
+                time.sleep(self.retry_delay(rounds - 1))
+            else:
+                stats["items"] = len(pending)
+            rounds += 1
+            entries = [self._job_entry(row) for row in pending]
+            round_stats = self._process(entries, workers, on_result, job_id)
+            for key in ("cached", "fetched", "elapsed"):
+                stats[key] += round_stats[key]
+
+        stats["failed"] = self.finish_job(job_id)
+        return stats
+
+    @classmethod
+    def retry_delay(cls, retries):
+        """Seconds to wait before retrying an item that has failed `retries` + 1 times."""
+        return cls.RETRY_DELAY * 2 ** retries
+
+    def finish_job(self, job_id):
+        """Closes a job, or marks it 'failed' so the next run resumes it. Returns the number of failed items."""
+        failed = self.db.get_scan_job_counts(job_id).get("failed", 0)
+        self.db.finish_scan_job(job_id, status="failed" if failed else "done")
+        return failed
+
+    @staticmethod
+    def _job_entry(row):
+        item = (row['item_id'], row['url_name'], row['item_type'], row['max_rank'])
+        return item, row['force_refresh'], row['queued']
+
+    def _process(self, entries, workers, on_result, job_id=None):
+        with metrics.timer("scan_seconds"):
+            return self._process_entries(entries, workers, on_result, job_id)
+
+    def _process_entries(self, entries, workers, on_result, job_id):
+        stats = {"items": len(entries), "cached": 0, "fetched": 0, "failed": 0}
+        start = time.perf_counter()
+
+        stale = []
+        for item, force_refresh, fresh_since in entries:
+            cached = self.get_cached(item[0], item[2], force_refresh, fresh_since)
+            if cached:
+                stats["cached"] += 1
+                if job_id is not None:
+                    self.db.set_scan_item_state(job_id, item[0], "done")
+                if on_result:
+                    on_result(item, cached, True)
+            else:
+                stale.append(item)
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {pool.submit(self.fetch_book, item[1], item[2], item[3]): item for item in stale}
+            remaining = len(futures)
+            metrics.set("queue_depth", remaining, queue="scanner")
+            for future in as_completed(futures):
+                item = futures[future]
+                remaining -= 1
+                metrics.set("queue_depth", remaining, queue="scanner")
+                try:
+                    summary, orders = future.result()
+                except Exception as e:
+                    print(f"Error scanning {item[1]}: {e}")
+                    stats["failed"] += 1
+                    if job_id is not None:
+                        self.db.set_scan_item_state(job_id, item[0], "failed", str(e))
+                    continue
+
+                self.save(item[0], item[2], summary, orders)
+                stats["fetched"] += 1
+                if job_id is not None:
+                    self.db.set_scan_item_state(job_id, item[0], "done")
+                if on_result:
+                    on_result(item, summary, False)
+
+        stats["elapsed"] = time.perf_counter() - start
+        return stats
@@ -0,0 +1,284 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds of the histogram buckets; +Inf is implied.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+HELP = {
+    "api_request_seconds": "warframe.market request latency by endpoint and HTTP status.",
+    "rate_limiter_wait_seconds": "Time spent waiting for the shared API rate limiter.",
+    "queue_depth": "Items waiting to be fetched, by queue.",
+    "cache_checks_total": "Cached price lookups by caller and whether the price was still inside the TTL.",
+    "db_query_seconds": "SQLite statement latency by operation and table.",
+    "db_commit_seconds": "SQLite commit latency.",
+    "ui_update_batch_size": "Price updates applied to a table per repaint, by category.",
+    "ui_flush_seconds": "Time to apply one batch of price updates to a table.",
+    "ui_populate_seconds": "Time to fill a table from the cache.",
+    "scan_seconds": "Duration of one MarketScanner pass over a list of items.",
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Estimate from the buckets, interpolating inside the one the quantile falls in."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= target and n:
+                low = self.buckets[i - 1] if i > 0 else 0.0
+                high = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return low + (high - low) * (target - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+class _NoTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Timer:
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+_NO_TIMER = _NoTimer()
+
+
+class Metrics:
+    """In-process counters, gauges and histograms for the hot paths.
+
+    Off by default: every call then returns after checking `enabled`, database statements included.
+    Turn it on with TENNOFLIP_METRICS=1, the "metrics" setting, or `cli.py --metrics-file/--metrics-port`;
+    connections that are already open start recording too.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.server = None
+        # Called as span_hook(name, seconds, labels) for every timing; services.profiler uses it.
+        self.span_hook = None
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+        if self.span_hook is not None and name.endswith("_seconds"):
+            self.span_hook(name, value, labels)
+
+    def cache_check(self, source, found, fresh):
+        """Counts one TTL check of a cached price: a hit, an expired price, or no price at all."""
+        if self.enabled:
+            self.inc("cache_checks_total", source=source, result="hit" if fresh else "expired" if found else "miss")
+
+    def timer(self, name, **labels):
+        """`with metrics.timer("name", label=...):` records the block's duration in seconds."""
+        return _Timer(self, name, labels) if self.enabled else _NO_TIMER
+
+    def snapshot(self):
+        """[(kind, name, labels, values)] of everything recorded so far, for the diagnostics dialog."""
+        rows = []
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                rows.append(("counter", name, dict(labels), {"value": value}))
+            for (name, labels), value in sorted(self.gauges.items()):
+                rows.append(("gauge", name, dict(labels), {"value": value}))
+            for (name, labels), h in sorted(self.histograms.items()):
+                rows.append(("histogram", name, dict(labels), {
+                    "count": h.count, "sum": h.sum, "avg": h.sum / h.count if h.count else 0.0,
+                    "p50": h.quantile(0.5), "p95": h.quantile(0.95), "p99": h.quantile(0.99)
+                }))
+        return rows
+
+    def render_prometheus(self):
+        """Everything in the Prometheus text exposition format."""
+        def label_text(labels, extra=None):
+            pairs = list(labels) + ([extra] if extra else [])
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                                  for k, v in pairs) + "}"
+
+        lines = []
+        with self.lock:
+            sections = (("counter", self.counters), ("gauge", self.gauges), ("histogram", self.histograms))
+            for kind, series in sections:
+                names = sorted({name for name, _ in series})
+                for name in names:
+                    metric = f"tennoflip_{name}"
+                    if name in HELP:
+                        lines.append(f"# HELP {metric} {HELP[name]}")
+                    lines.append(f"# TYPE {metric} {kind}")
+                    for (series_name, labels), value in sorted(series.items()):
+                        if series_name != name:
+                            continue
+                        if kind != "histogram":
+                            lines.append(f"{metric}{label_text(labels)} {value}")
+                            continue
+                        cumulative = 0
+                        for bound, count in zip(value.buckets + ("+Inf",), value.counts):
+                            cumulative += count
+                            lines.append(f"{metric}_bucket{label_text(labels, ('le', bound))} {cumulative}")
+                        lines.append(f"{metric}_sum{label_text(labels)} {value.sum}")
+                        lines.append(f"{metric}_count{label_text(labels)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Writes the metrics for node_exporter's textfile collector (atomically, via a temp file)."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp, path)
+
+    def serve(self, port=9464, host="127.0.0.1"):
+        """Serves /metrics over HTTP from a background thread. Returns the server."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server
+
+
+metrics = Metrics(enabled=os.environ.get("TENNOFLIP_METRICS", "") not in ("", "0"))
+
+
+_STATEMENT_RE = re.compile(r"^\s*(\w+).*?\b(?:FROM|INTO|UPDATE|TABLE(?: IF NOT EXISTS)?)\s+\"?(\w+)", re.I | re.S)
+_statement_labels = {}
+
+
+def statement_labels(sql):
+    """(operation, table) of a statement, cached per SQL string."""
+    labels = _statement_labels.get(sql)
+    if labels is None:
+        match = _STATEMENT_RE.match(sql)
+        if match:
+            labels = (match.group(1).upper(), match.group(2).lower())
+        else:
+            labels = ((sql.split() or ["?"])[0].upper(), "")
+        _statement_labels[sql] = labels
+    return labels
+
+
+class TimedCursor(sqlite3.Cursor):
+    # metrics.enabled is checked on every call, so turning metrics on covers long-lived connections.
+    def execute(self, sql, parameters=()):
+        if not metrics.enabled:
+            return super().execute(sql, parameters)
+        op, table = statement_labels(sql)
+        with metrics.timer("db_query_seconds", op=op, table=table):
+            return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not metrics.enabled:
+            return super().executemany(sql, seq_of_parameters)
+        op, table = statement_labels(sql)
+        with metrics.timer("db_query_seconds", op=op, table=table):
+            return super().executemany(sql, seq_of_parameters)
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection factory that records statement and commit latency."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        if not metrics.enabled:
+            return super().commit()
+        with metrics.timer("db_commit_seconds"):
+            super().commit()
+
+
+def connect(db_file, **kwargs):
+    """sqlite3.connect() with a connection that times statements and commits while metrics are enabled."""
+    kwargs["factory"] = TimedConnection
+    return sqlite3.connect(db_file, **kwargs)
@@ -0,0 +1,297 @@
+import json
+import socket
+import time
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from urllib.parse import urlparse
+from data.database import Database
+from services.market_scanner import MarketScanner
+from services.metrics import metrics
+from services.price_calculator import PriceCalculator
+
+# Events are JSON objects, one per message:
+#   {"event": "snapshot", "item": slug, "orders": [order, ...]}   replaces the whole book
+#   {"event": "created" | "updated", "item": slug, "order": order}
+#   {"event": "removed", "item": slug, "order_id": id}
+# Orders use the same fields as /v2/orders/item/{slug} responses.
+EVENTS = ("snapshot", "created", "updated", "removed")
+
+
+def normalize_order(order):
+    """Same field aliases as WarframeMarketAPI.get_orders()."""
+    normalized = dict(order)
+    if "type" in order and "order_type" not in order:
+        normalized["order_type"] = order["type"]
+    if "rank" in order and "mod_rank" not in order:
+        normalized["mod_rank"] = order["rank"]
+    return normalized
+
+
+class OrderBook:
+    """One item's live order book with its sell orders kept sorted for pricing.
+
+    summary() gives the same numbers as MarketScanner.price() on the full order list, but reads
+    them from the sorted lists instead of re-sorting every order on every change.
+    """
+
+    ARCANE_SKIP = 2
+    ARCANE_SLICE = 15
+    ITEM_SLICE = 5
+
+    def __init__(self, item_type, max_rank=MarketScanner.DEFAULT_MAX_RANK):
+        self.item_type = item_type
+        self.default_max_rank = MarketScanner.normalize_max_rank(max_rank)
+        self.orders = {}
+        self.by_rank = defaultdict(list)
+        self.ingame_by_rank = defaultdict(list)
+        self.visible = []
+        self.ingame = []
+        self.sell_ranks = Counter()
+
+    def _lists(self, order):
+        if order.get("order_type") != "sell":
+            return []
+        status = (order.get("user") or {}).get("status", "offline")
+        rank = order.get("mod_rank")
+        lists = [self.by_rank[rank]]
+        if status in ("online", "ingame"):
+            lists.append(self.visible)
+        if status == "ingame":
+            lists.append(self.ingame)
+            lists.append(self.ingame_by_rank[rank])
+        return lists
+
+    def _index(self, order_id, order, add):
+        entry = (order.get("platinum", 0), order_id)
+        for sorted_list in self._lists(order):
+            if add:
+                insort(sorted_list, entry)
+            else:
+                i = bisect_left(sorted_list, entry)
+                if i < len(sorted_list) and sorted_list[i] == entry:
+                    del sorted_list[i]
+        if order.get("order_type") == "sell":
+            self.sell_ranks[order.get("mod_rank") or 0] += 1 if add else -1
+
+    def upsert(self, order):
+        order = normalize_order(order)
+        order_id = order.get("id")
+        self.remove(order_id)
+        self.orders[order_id] = order
+        self._index(order_id, order, add=True)
+
+    def remove(self, order_id):
+        old = self.orders.pop(order_id, None)
+        if old is not None:
+            self._index(order_id, old, add=False)
+
+    def replace(self, orders):
+        self.__init__(self.item_type, self.default_max_rank)
+        for order in orders:
+            self.upsert(order)
+
+    def arcane_price(self, rank):
+        prices = [p for p, _ in self.by_rank[rank][self.ARCANE_SKIP:self.ARCANE_SKIP + self.ARCANE_SLICE]]
+        return sum(prices) / len(prices) if prices else 0.0
+
+    def cheapest(self, rank=None):
+        sorted_list = self.ingame if rank is None else self.ingame_by_rank[rank]
+        return sorted_list[0][0] if sorted_list else -1.0
+
+    def max_rank(self):
+        ranks = [r for r, count in self.sell_ranks.items() if count > 0]
+        detected = max(ranks) if ranks else 0
+        return detected if detected > 0 else self.default_max_rank
+
+    def summary(self):
+        if self.item_type != 'arcane':
+            top = [p for p, _ in self.visible[:self.ITEM_SLICE]]
+            return {"avg": sum(top) / len(top) if top else 0.0, "low": self.cheapest(), "orders_count": len(self.orders)}
+
+        max_rank = self.max_rank()
+        avg_r0, low_r0 = self.arcane_price(0), self.cheapest(0)
+        avg_max, low_max = self.arcane_price(max_rank), self.cheapest(max_rank)
+        ranks = {}
+        for rank in range(max_rank + 1):
+            avg, low = self.arcane_price(rank), self.cheapest(rank)
+            if avg > 0 or low > 0:
+                ranks[rank] = {"avg": avg, "low": low}
+        return {
+            "max_rank": max_rank,
+            "avg_r0": avg_r0,
+            "low_r0": low_r0,
+            "avg_max": avg_max,
+            "low_max": low_max,
+            "avg_flip": PriceCalculator.calculate_flip(avg_r0, avg_max, max_rank),
+            "low_flip": PriceCalculator.calculate_flip(low_r0, low_max, max_rank),
+            "ranks": ranks,
+            "orders_count": len(self.orders)
+        }
+
+
+class TcpLineTransport:
+    """Reads newline-delimited JSON events from a TCP socket (tools/fake_order_stream.py speaks it)."""
+
+    def __init__(self, host, port, timeout=1.0):
+        self.address = (host, port)
+        self.timeout = timeout
+        self.sock = None
+
+    def __iter__(self):
+        self.sock = socket.create_connection(self.address, timeout=self.timeout)
+        buffer = b""
+        while self.sock is not None:
+            try:
+                chunk = self.sock.recv(65536)
+            except socket.timeout:
+                # Yield control so the subscriber can flush and check whether it should stop.
+                yield None
+                continue
+            except OSError:
+                break
+            if not chunk:
+                break
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+
+    def close(self):
+        if self.sock is not None:
+            sock, self.sock = self.sock, None
+            sock.close()
+
+
+class WebsocketTransport:
+    """Reads JSON events from a websocket. Needs the optional websocket-client package.
+
+    `parse(message)` can turn the server's own message format into the events listed above;
+    by default messages are expected to already be in that form.
+    """
+
+    def __init__(self, url, parse=None, timeout=1.0):
+        self.url = url
+        self.parse = parse or json.loads
+        self.timeout = timeout
+        self.ws = None
+
+    def __iter__(self):
+        try:
+            import websocket
+        except ImportError:
+            raise RuntimeError("Websocket order streams need the websocket-client package (pip install websocket-client)")
+
+        self.ws = websocket.create_connection(self.url, timeout=self.timeout)
+        while self.ws is not None:
+            try:
+                message = self.ws.recv()
+            except websocket.WebSocketTimeoutException:
+                yield None
+                continue
+            except (websocket.WebSocketException, OSError):
+                break
+            if not message:
+                break
+            event = self.parse(message)
+            if event:
+                yield event
+
+    def close(self):
+        if self.ws is not None:
+            ws, self.ws = self.ws, None
+            ws.close()
+
+
+def open_transport(url):
+    """tcp://host:port for the line-JSON stream, ws:// or wss:// for a websocket."""
+    parsed = urlparse(url)
+    if parsed.scheme == "tcp":
+        return TcpLineTransport(parsed.hostname, parsed.port)
+    if parsed.scheme in ("ws", "wss"):
+        return WebsocketTransport(url)
+    raise ValueError(f"Unsupported order stream URL: {url}")
+
+
+class OrderStreamSubscriber:
+    """Keeps order books up to date from a stream of order events.
+
+    Changed books are re-priced and saved every `flush_interval` seconds through MarketScanner.save,
+    so the database sees the same rows a normal fetch would write; `on_update(slug, item_type,
+    summary)` is called for each of them. Events for items that are not in the catalog are ignored.
+    """
+
+    def __init__(self, transport, db=None, flush_interval=2.0, on_update=None):
+        self.transport = transport
+        self.db = db or Database()
+        self.scanner = MarketScanner(db=self.db)
+        self.flush_interval = flush_interval
+        self.on_update = on_update
+        self.running = False
+
+        self.items = {i['url_name']: i for i in self.db.get_all_items()}
+        self.books = {}
+        self.dirty = set()
+        self.stats = {"events": 0, "ignored": 0, "saved": 0}
+
+    @staticmethod
+    def item_type(item):
+        if item['item_type'] == 'arcane':
+            return 'arcane'
+        return 'set' if 'set' in item.get('tags', []) else 'part'
+
+    def handle(self, event):
+        """Applies one event. Returns the slug of the book it changed, or None."""
+        slug = event.get("item")
+        kind = event.get("event")
+        item = self.items.get(slug)
+        if item is None or kind not in EVENTS:
+            self.stats["ignored"] += 1
+            return None
+
+        book = self.books.get(slug)
+        if book is None:
+            book = self.books[slug] = OrderBook(self.item_type(item), item.get('max_rank'))
+
+        if kind == "snapshot":
+            book.replace(event.get("orders", []))
+        elif kind == "removed":
+            book.remove(event.get("order_id") or (event.get("order") or {}).get("id"))
+        else:
+            book.upsert(event["order"])
+
+        self.stats["events"] += 1
+        self.dirty.add(slug)
+        return slug
+
+    def flush(self):
+        """Saves and reports every book that changed since the last flush."""
+        dirty, self.dirty = self.dirty, set()
+        metrics.set("queue_depth", len(dirty), queue="order_stream")
+        for slug in dirty:
+            book = self.books[slug]
+            summary = book.summary()
+            self.scanner.save(self.items[slug]['id'], book.item_type, summary)
+            self.stats["saved"] += 1
+            if self.on_update:
+                self.on_update(slug, book.item_type, summary)
+        return len(dirty)
+
+    def run(self):
+        self.running = True
+        last_flush = time.monotonic()
+        try:
+            for event in self.transport:
+                if not self.running:
+                    break
+                if event is not None:
+                    self.handle(event)
+                if time.monotonic() - last_flush >= self.flush_interval:
+                    self.flush()
+                    last_flush = time.monotonic()
+        finally:
+            self.flush()
+            self.transport.close()
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,151 @@
+import json
+import os
+from threading import Lock
+
+PACKS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "packs.json")
+SUPPORTED_VERSION = 1
+
+
+def validate_pack(name, pack):
+    """Returns a list of problems with one pack definition (empty when it is usable)."""
+    if not isinstance(pack, dict):
+        return [f"{name}: must be an object"]
+    problems = []
+    cost = pack.get("cost")
+    if not isinstance(cost, (int, float)) or cost <= 0:
+        problems.append(f"{name}: cost must be a positive number")
+
+    tiers = pack.get("tiers")
+    if not isinstance(tiers, dict) or not tiers:
+        return problems + [f"{name}: tiers must be a non-empty object"]
+    for tier_name, slugs in tiers.items():
+        if not isinstance(slugs, list) or not all(isinstance(s, str) for s in slugs):
+            problems.append(f"{name}: tier {tier_name} must be a list of item slugs")
+
+    tier_probs = pack.get("tier_probs", {})
+    if not isinstance(tier_probs, dict):
+        return problems + [f"{name}: tier_probs must be an object"]
+    for tier_name, prob in tier_probs.items():
+        if tier_name not in tiers:
+            problems.append(f"{name}: probability given for unknown tier {tier_name}")
+        if not isinstance(prob, (int, float)) or not 0 <= prob <= 1:
+            problems.append(f"{name}: probability of {tier_name} must be between 0 and 1")
+    if not problems and abs(sum(tier_probs.values()) - 1) > 1e-6:
+        problems.append(f"{name}: tier probabilities add up to {sum(tier_probs.values()):g}, not 1")
+    return problems
+
+
+def load_packs(path=PACKS_FILE):
+    """Reads and validates a pack definition file. Returns (packs, problems); invalid packs are left out.
+
+    Raises OSError if the file can't be read and ValueError if it isn't a usable definition file.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} must contain a JSON object")
+
+    version = data.get("version")
+    if version != SUPPORTED_VERSION:
+        raise ValueError(f"Unsupported pack definition version {version!r} in {path}")
+
+    definitions = data.get("packs", {})
+    if not isinstance(definitions, dict):
+        raise ValueError(f"\"packs\" in {path} must be an object")
+
+    packs = {}
+    problems = []
+    for name, pack in definitions.items():
+        pack_problems = validate_pack(name, pack)
+        if pack_problems:
+            problems.extend(pack_problems)
+        else:
+            packs[name] = pack
+    return packs, problems
+
+
+class PackDefinitions:
+    """Pack definitions from data/packs.json, resolved once to catalog item ids.
+
+    The file is re-read when its modification time changes, so definitions can be edited while
+    the app is running; if an edit leaves it unreadable, the last good definitions stay in use.
+    Resolution is cached with it. While some slugs are still unknown (e.g. before the catalog has
+    been downloaded, or for a retired arcane) it is redone only when the catalog changes.
+    """
+
+    def __init__(self, path=PACKS_FILE):
+        self.path = path
+        self.lock = Lock()
+        self.mtime = None
+        self.packs = {}
+        self.resolved = None
+        self.resolved_catalog = None
+        self.error = None
+        self.unresolved_reported = False
+
+    def load(self):
+        """Returns the validated packs, reloading the file if it changed on disk."""
+        with self.lock:
+            try:
+                mtime = os.path.getmtime(self.path)
+                if mtime != self.mtime:
+                    # Recorded before parsing, so a broken file is reported once, not on every call.
+                    self.mtime = mtime
+                    packs, problems = load_packs(self.path)
+                    for problem in problems:
+                        print(f"Pack definitions: {problem}")
+                    self.packs = packs
+                    self.resolved = None
+                    self.unresolved_reported = False
+                self.error = None
+            except (OSError, ValueError) as e:
+                if str(e) != self.error:
+                    kept = f"keeping the {len(self.packs)} packs loaded before" if self.packs else "no packs loaded"
+                    print(f"Pack definitions: could not load {self.path} ({e}); {kept}")
+                self.error = str(e)
+            return self.packs
+
+    def resolve(self, db=None, items=None):
+        """Maps every slug to an item id, from `items` or the database's catalog.
+
+        Returns a dict with "packs" (the raw definitions), "tiers" (name -> tier -> [item ids]),
+        "ids" (slug -> id), "slugs" (id -> slug) and "unresolved" ([(pack name, slug)]).
+        """
+        packs = self.load()
+        with self.lock:
+            if self.resolved and not self.resolved["unresolved"]:
+                return self.resolved
+            catalog = ("items", len(items)) if items is not None else ("db", db.get_catalog_state())
+            if self.resolved and catalog == self.resolved_catalog:
+                return self.resolved
+
+            if items is None:
+                items = db.get_all_items()
+            ids = {i['url_name']: i['id'] for i in items}
+
+            tiers = {}
+            unresolved = []
+            for name, pack in packs.items():
+                tiers[name] = {}
+                for tier_name, slugs in pack['tiers'].items():
+                    tiers[name][tier_name] = [ids[slug] for slug in slugs if slug in ids]
+                    unresolved.extend((name, slug) for slug in slugs if slug not in ids)
+
+            if unresolved and not self.unresolved_reported:
+                self.unresolved_reported = True
+                print(f"Pack definitions: {len(unresolved)} unknown arcanes: "
+                      + ", ".join(f"{slug} ({name})" for name, slug in unresolved))
+
+            used = {slug for pack in packs.values() for slugs in pack['tiers'].values() for slug in slugs}
+            self.resolved = {
+                "packs": packs,
+                "tiers": tiers,
+                "ids": {slug: ids[slug] for slug in used if slug in ids},
+                "slugs": {ids[slug]: slug for slug in used if slug in ids},
+                "unresolved": unresolved
+            }
+            self.resolved_catalog = catalog
+            return self.resolved
+
+
+pack_definitions = PackDefinitions()
@@ -0,0 +1,95 @@
+import math
+import random
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def draw_distribution(tiers):
+    """Platinum distribution of a single arcane draw as {value: probability}.
+
+    `tiers` is a list of (tier probability, [arcane prices]). A tier is entered with its
+    probability and then one of its arcanes is picked uniformly; a tier without prices is worth 0.
+    """
+    dist = {}
+    for prob, prices in tiers:
+        if prob <= 0:
+            continue
+        if not prices:
+            dist[0.0] = dist.get(0.0, 0) + prob
+            continue
+        share = prob / len(prices)
+        for price in prices:
+            value = round(price, 2)
+            dist[value] = dist.get(value, 0) + share
+    return dist
+
+
+def convolve(a, b):
+    """Distribution of the sum of two independent draws."""
+    out = {}
+    for va, pa in a.items():
+        for vb, pb in b.items():
+            value = round(va + vb, 2)
+            out[value] = out.get(value, 0) + pa * pb
+    return out
+
+
+def sum_distribution(single, draws=3):
+    total = {0.0: 1.0}
+    for _ in range(draws):
+        total = convolve(total, single)
+    return total
+
+
+def summarize(dist, threshold):
+    """Mean, variance, percentiles and probability of ending below `threshold` for a distribution."""
+    items = sorted(dist.items())
+    mass = sum(p for _, p in items) or 1.0
+    mean = sum(v * p for v, p in items) / mass
+    variance = sum((v - mean) ** 2 * p for v, p in items) / mass
+
+    percentiles = {}
+    targets = list(PERCENTILES)
+    cumulative = 0.0
+    for value, p in items:
+        cumulative += p / mass
+        while targets and cumulative >= targets[0] / 100 - 1e-12:
+            percentiles[targets.pop(0)] = value
+    for q in targets:
+        percentiles[q] = items[-1][0] if items else 0.0
+
+    return {
+        "mean": mean,
+        "variance": variance,
+        "std": math.sqrt(variance),
+        "percentiles": percentiles,
+        "p_loss": sum(p for v, p in items if v < threshold) / mass
+    }
+
+
+def exact(tiers, threshold, draws=3):
+    """Exact statistics of the total of `draws` independent draws."""
+    return summarize(sum_distribution(draw_distribution(tiers), draws), threshold)
+
+
+def monte_carlo(tiers, threshold, draws=3, samples=100000, seed=None, draw_rule=None):
+    """Sampled statistics of a pack, for rules the exact convolution cannot express.
+
+    Draws for all samples are made in one random.choices call. `draw_rule(values)` can replace
+    the plain sum of one pack's draws (e.g. to model duplicates being worth less).
+    """
+    single = draw_distribution(tiers)
+    values = list(single)
+    weights = [single[v] for v in values]
+    rng = random.Random(seed)
+
+    picks = rng.choices(values, weights=weights, k=samples * draws)
+    combine = draw_rule or sum
+    totals = [combine(picks[i:i + draws]) for i in range(0, len(picks), draws)]
+
+    dist = {}
+    share = 1.0 / samples
+    for total in totals:
+        value = round(total, 2)
+        dist[value] = dist.get(value, 0) + share
+    return summarize(dist, threshold)
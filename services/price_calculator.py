@@ -93,3 +93,60 @@ class PriceCalculator:
                 prices[rank] = p
                 
         return prices
+
+    @staticmethod
+    def detect_max_rank(orders, default=5):
+        """Finds the highest rank listed in the sell orders, falling back to the default."""
+        sell_ranks = [o.get("mod_rank") or 0 for o in orders if o.get("order_type") == "sell"]
+        detected = max(sell_ranks) if sell_ranks else 0
+        return detected if detected > 0 else default
+
+    @staticmethod
+    def calculate_flip(price_r0, price_max, max_rank):
+        """Profit of fusing enough rank 0 copies into one max rank arcane and selling it."""
+        if price_r0 <= 0 or price_max <= 0:
+            return 0
+        required_count = (max_rank + 1) * (max_rank + 2) // 2
+        return (required_count * price_r0) - price_max
+
+    @staticmethod
+    def summarize_arcane(orders, max_rank=5):
+        """Builds the rank 0 / max rank price summary shown in the arcane tables."""
+        max_rank = PriceCalculator.detect_max_rank(orders, default=max_rank)
+
+        avg_r0 = PriceCalculator.calculate_price(orders, "arcane", rank=0)
+        cheap_r0 = PriceCalculator.calculate_cheapest(orders, rank=0)
+        avg_max = PriceCalculator.calculate_price(orders, "arcane", rank=max_rank)
+        cheap_max = PriceCalculator.calculate_cheapest(orders, rank=max_rank)
+
+        return {
+            "max_rank": max_rank,
+            "avg_r0": avg_r0,
+            "low_r0": cheap_r0,
+            "avg_max": avg_max,
+            "low_max": cheap_max,
+            "avg_flip": PriceCalculator.calculate_flip(avg_r0, avg_max, max_rank),
+            "low_flip": PriceCalculator.calculate_flip(cheap_r0, cheap_max, max_rank),
+            "ranks": PriceCalculator.summarize_arcane_ranks(orders, max_rank),
+            "orders_count": len(orders)
+        }
+
+    @staticmethod
+    def summarize_arcane_ranks(orders, max_rank=5):
+        """Average and cheapest price of every rank from 0 to max_rank that has sell orders."""
+        ranks = {}
+        for rank in range(max_rank + 1):
+            avg = PriceCalculator.calculate_price(orders, "arcane", rank=rank)
+            low = PriceCalculator.calculate_cheapest(orders, rank=rank)
+            if avg > 0 or low > 0:
+                ranks[rank] = {"avg": avg, "low": low}
+        return ranks
+
+    @staticmethod
+    def summarize_item(orders):
+        """Builds the average / cheapest price summary for sets and parts."""
+        return {
+            "avg": PriceCalculator.calculate_price(orders, "item"),
+            "low": PriceCalculator.calculate_cheapest(orders),
+            "orders_count": len(orders)
+        }
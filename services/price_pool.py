@@ -0,0 +1,112 @@
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from threading import Lock
+from api.warframe_market import WarframeMarketAPI
+from data.snapshots import decode_orders
+from services.market_scanner import MarketScanner
+from services.metrics import metrics
+
+# Payload formats: an orders response body as downloaded, or a data.snapshots blob.
+FORMATS = {
+    "json": WarframeMarketAPI.parse_orders,
+    "rows": decode_orders,
+}
+
+
+def price_payload(fmt, payload, item_type, max_rank=MarketScanner.DEFAULT_MAX_RANK, keep_orders=False):
+    """Decodes one raw order book and prices it. Returns (summary, orders or None)."""
+    orders = FORMATS[fmt](payload)
+    return MarketScanner.price(orders, item_type, max_rank), orders if keep_orders else None
+
+
+def price_chunk(jobs):
+    return [(key,) + price_payload(*job) for key, *job in jobs]
+
+
+class PricePool:
+    """Decodes and prices raw order books in worker processes, so JSON parsing and the pricing
+    loops don't hold the GIL the GUI and download threads need.
+
+    Only the bytes go to a worker and only the small summary comes back, unless the orders are
+    asked for (e.g. to archive them). `processes=0` does the same work inline on the calling thread.
+    """
+
+    CHUNK_SIZE = 32
+
+    def __init__(self, processes=None, chunk_size=CHUNK_SIZE):
+        self.processes = (os.cpu_count() or 1) if processes is None else processes
+        self.chunk_size = chunk_size
+        self.executor = ProcessPoolExecutor(self.processes) if self.processes > 0 else None
+
+    def submit(self, fmt, payload, item_type, max_rank=MarketScanner.DEFAULT_MAX_RANK, keep_orders=False):
+        """Prices one book. Returns a Future of (summary, orders or None)."""
+        if self.executor is not None:
+            return self.executor.submit(price_payload, fmt, payload, item_type, max_rank, keep_orders)
+        future = Future()
+        try:
+            future.set_result(price_payload(fmt, payload, item_type, max_rank, keep_orders))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def map(self, jobs, keep_orders=False):
+        """Prices (key, fmt, payload, item_type, max_rank) jobs, yielding (key, summary, orders or None)
+        in input order as soon as each result is ready.
+
+        Jobs go out in chunks with at most two chunks per process in flight, so a long generator
+        such as SnapshotStore.iter_latest() is never read into memory all at once.
+        """
+        if self.executor is None:
+            for key, *job in jobs:
+                yield (key,) + price_payload(*job, keep_orders=keep_orders)
+            return
+
+        window = 2 * self.processes
+        pending = deque()
+        chunk = []
+        for key, fmt, payload, item_type, max_rank in jobs:
+            chunk.append((key, fmt, payload, item_type, max_rank, keep_orders))
+            if len(chunk) < self.chunk_size:
+                continue
+            pending.append(self.executor.submit(price_chunk, chunk))
+            chunk = []
+            metrics.set("queue_depth", len(pending), queue="price_pool")
+            if len(pending) >= window:
+                yield from pending.popleft().result()
+        if chunk:
+            pending.append(self.executor.submit(price_chunk, chunk))
+        while pending:
+            metrics.set("queue_depth", len(pending), queue="price_pool")
+            yield from pending.popleft().result()
+        metrics.set("queue_depth", 0, queue="price_pool")
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+_shared = None
+_shared_lock = Lock()
+
+
+def configure_price_pool(processes):
+    """Sets how many processes the app-wide pool uses; 0 keeps pricing on the fetching threads."""
+    global _shared
+    with _shared_lock:
+        if _shared is not None:
+            _shared.close()
+        _shared = PricePool(processes) if processes > 0 else None
+
+
+def shared_price_pool():
+    """The app-wide PricePool, or None unless configure_price_pool() turned it on."""
+    with _shared_lock:
+        return _shared
@@ -0,0 +1,217 @@
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from services.metrics import metrics
+
+# Where a sample or an allocation is attributed: the first rule matching a frame, walking from the
+# innermost frame outwards. (subsystem, path fragment, function name or None for any)
+SUBSYSTEM_RULES = (
+    ("rate limit", "api/scheduler.py", "wait"),
+    ("json", "json/", None),
+    ("network", "urllib3/", None),
+    ("network", "requests/", None),
+    ("network", "http/client.py", None),
+    ("network", "socket.py", None),
+    ("network", "ssl.py", None),
+    ("sqlite", "data/database.py", None),
+    ("sqlite", "data/snapshots.py", None),
+    ("pricing", "services/price_calculator.py", None),
+    ("pricing", "services/order_stream.py", None),
+    ("pricing", "services/pack_distribution.py", None),
+    ("pricing", "services/flip_optimizer.py", None),
+    ("qt", "ui/", None),
+    ("qt", "PySide6/", None),
+    ("waiting", "threading.py", None),
+    ("waiting", "concurrent/futures/", None),
+    ("waiting", "queue.py", None),
+)
+
+
+def subsystem_of(frames, skip=()):
+    """frames: [(filename, function)] innermost first. Returns the subsystem name."""
+    for filename, function in frames:
+        path = filename.replace("\\", "/")
+        for name, fragment, rule_function in SUBSYSTEM_RULES:
+            if name not in skip and fragment in path and (rule_function is None or rule_function == function):
+                return name
+    return "other"
+
+
+def frame_label(code):
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}.{code.co_name}"
+
+
+class SamplingProfiler:
+    """Samples every thread's Python stack at a fixed interval while a scan or the GUI runs.
+
+    Writes, into `output_dir`:
+      stacks.folded  collapsed stacks ("thread;outer;...;inner count") for flamegraph.pl or speedscope
+      trace.json     wall-clock spans (requests, limiter waits, commits, scans, repaints) per thread,
+                     in Chrome trace format for chrome://tracing or ui.perfetto.dev
+      metrics.prom   the services.metrics counters collected meanwhile
+      summary.txt    the top functions, time per subsystem, span totals and, with memory=True,
+                     peak traced memory per subsystem
+    Spans come from services.metrics timings, so metrics are switched on while profiling. Sampling
+    barely slows anything down; tracemalloc makes allocation-heavy code several times slower, so
+    memory tracking is opt-in and its timings should not be compared with a plain profile.
+    """
+
+    def __init__(self, output_dir, interval=0.005, memory=False, memory_interval=1.0, top=25):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.memory = memory
+        self.memory_interval = memory_interval
+        self.top = top
+
+        self.stacks = Counter()
+        self.self_counts = Counter()
+        self.total_counts = Counter()
+        self.subsystems = Counter()
+        self.samples = 0
+        self.spans = []
+        self.memory_peaks = defaultdict(int)
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+        self.started = None
+        self.elapsed = 0.0
+        self._metrics_were_enabled = metrics.enabled
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.running = True
+        metrics.enable()
+        metrics.span_hook = self.record_span
+        if self.memory:
+            tracemalloc.start(8)
+        self.thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stops sampling, writes the output files and returns the summary text."""
+        if not self.running:
+            return ""
+        self.running = False
+        self.thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        metrics.span_hook = None
+        if self.memory:
+            self._sample_memory()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            peak = 0
+        summary = self.summary(peak)
+        self.write(summary)
+        metrics.enable(self._metrics_were_enabled)
+        return summary
+
+    def record_span(self, name, seconds, labels):
+        end = time.perf_counter()
+        thread = threading.current_thread()
+        with self.lock:
+            self.spans.append((name, labels, end - seconds, seconds, thread.ident, thread.name))
+
+    def _run(self):
+        own = threading.get_ident()
+        next_memory = time.perf_counter() + self.memory_interval
+        while self.running:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self._sample(names.get(ident, str(ident)), frame)
+            self.samples += 1
+            if self.memory and time.perf_counter() >= next_memory:
+                self._sample_memory()
+                next_memory = time.perf_counter() + self.memory_interval
+            time.sleep(self.interval)
+
+    def _sample(self, thread_name, frame):
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        if not codes:
+            return
+        labels = [frame_label(code) for code in codes]
+        self.stacks[";".join([thread_name] + labels[::-1])] += 1
+        self.self_counts[labels[0]] += 1
+        for label in set(labels):
+            self.total_counts[label] += 1
+        self.subsystems[subsystem_of([(code.co_filename, code.co_name) for code in codes])] += 1
+
+    def _sample_memory(self):
+        """Current traced memory per subsystem; the peaks are kept across samples."""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        current = Counter()
+        for stat in snapshot.statistics("traceback"):
+            # Threads and pools hold allocations made by the code they run; credit that code instead.
+            frames = [(f.filename, None) for f in reversed(stat.traceback)]
+            current[subsystem_of(frames, skip=("waiting",))] += stat.size
+        for name, size in current.items():
+            self.memory_peaks[name] = max(self.memory_peaks[name], size)
+
+    def summary(self, peak=0):
+        total = max(1, sum(self.subsystems.values()))
+        lines = [f"Profiled {self.elapsed:.1f}s, {self.samples} samples every {self.interval * 1000:.0f} ms", ""]
+
+        lines.append("Time per subsystem (share of thread samples):")
+        for name, count in self.subsystems.most_common():
+            lines.append(f"  {name:<12} {count / total:7.1%}")
+
+        lines += ["", f"Top {self.top} functions by self samples:"]
+        for label, count in self.self_counts.most_common(self.top):
+            lines.append(f"  {count / total:7.1%}  {label}")
+
+        lines += ["", f"Top {self.top} functions by total samples:"]
+        for label, count in self.total_counts.most_common(self.top):
+            lines.append(f"  {count / total:7.1%}  {label}")
+
+        if self.spans:
+            totals = defaultdict(lambda: [0, 0.0])
+            for name, _, _, seconds, _, _ in self.spans:
+                totals[name][0] += 1
+                totals[name][1] += seconds
+            lines += ["", "Spans (wall clock, summed over threads):"]
+            for name, (count, seconds) in sorted(totals.items(), key=lambda kv: -kv[1][1]):
+                lines.append(f"  {name:<28} {count:7} x  {seconds:9.3f}s total  {seconds / count * 1000:8.2f} ms avg")
+
+        if self.memory_peaks:
+            lines += ["", f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB. Peak per subsystem:"]
+            for name, size in sorted(self.memory_peaks.items(), key=lambda kv: -kv[1]):
+                lines.append(f"  {name:<12} {size / 1024 / 1024:8.2f} MiB")
+        return "\n".join(lines) + "\n"
+
+    def write(self, summary):
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, "stacks.folded"), "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+        events = []
+        threads = {}
+        for name, labels, start, seconds, ident, thread_name in self.spans:
+            threads[ident] = thread_name
+            events.append({"name": name, "cat": name.rsplit("_seconds", 1)[0], "ph": "X", "pid": os.getpid(), "tid": ident,
+                           "ts": (start - self.started) * 1e6, "dur": seconds * 1e6, "args": labels})
+        for ident, thread_name in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": ident, "args": {"name": thread_name}})
+        with open(os.path.join(self.output_dir, "trace.json"), "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+        metrics.write_textfile(os.path.join(self.output_dir, "metrics.prom"))
+        with open(os.path.join(self.output_dir, "summary.txt"), "w", encoding="utf-8") as f:
+            f.write(summary)
+
+
+def default_output_dir():
+    return os.path.join("profiles", time.strftime("%Y%m%d-%H%M%S"))
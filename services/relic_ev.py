@@ -0,0 +1,245 @@
+import json
+import os
+import re
+import time
+from data.database import Database
+from services.market_scanner import MarketScanner
+from services.metrics import metrics
+
+RELICS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "relics.json")
+SUPPORTED_VERSION = 1
+RARITIES = ("common", "uncommon", "rare")
+REFINEMENTS = ("intact", "exceptional", "flawless", "radiant")
+# The community-maintained export of the official drop tables.
+DROP_TABLE_URL = "https://drops.warframestat.us/data/relics.json"
+
+
+def load_relics(path=RELICS_FILE):
+    """Reads and validates a relic drop table file. Returns (refinements, relics, problems).
+
+    `refinements` maps refinement -> rarity -> chance of each single reward of that rarity.
+    Relics with problems are left out.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    version = data.get("version")
+    if version != SUPPORTED_VERSION:
+        raise ValueError(f"Unsupported relic data version {version!r} in {path}")
+
+    refinements = data.get("refinements", {})
+    for refinement in REFINEMENTS:
+        chances = refinements.get(refinement)
+        if not isinstance(chances, dict) or set(chances) != set(RARITIES):
+            raise ValueError(f"Refinement {refinement} must give a chance for {', '.join(RARITIES)}")
+
+    relics = []
+    problems = []
+    for relic in data.get("relics", []):
+        name = relic.get("name") or "?"
+        rewards = relic.get("rewards")
+        if not isinstance(rewards, list) or not rewards:
+            problems.append(f"{name}: rewards must be a non-empty list")
+            continue
+        bad = [r for r in rewards if r.get("rarity") not in RARITIES or not isinstance(r.get("item"), str)]
+        if bad:
+            problems.append(f"{name}: every reward needs an item slug and a rarity ({', '.join(RARITIES)})")
+            continue
+        relics.append({"name": name, "rewards": rewards})
+    return refinements, relics, problems
+
+
+def reward_slug(name, by_name):
+    """warframe.market slug of a drop table reward name, through the catalog's names when it knows it."""
+    key = " ".join(name.lower().split())
+    for candidate in (key, key + " blueprint"):
+        if candidate in by_name:
+            return by_name[candidate]
+    return re.sub(r"[^a-z0-9]+", "_", key).strip("_")
+
+
+def reward_rarity(reward):
+    rarity = str(reward.get("rarity", "")).lower()
+    if rarity in RARITIES:
+        return rarity
+    # Intact chances in percent: 25.33 common, 11 uncommon, 2 rare.
+    chance = reward.get("chance") or 0
+    return "common" if chance >= 20 else "uncommon" if chance >= 5 else "rare"
+
+
+def import_drop_table(data, catalog=()):
+    """Turns the public relic drop table (see DROP_TABLE_URL) into relics.json entries.
+
+    That table lists every relic once per refinement; rewards and rarities are the same in each,
+    so the intact entry is used. Reward names are matched to catalog items where possible.
+    """
+    entries = data.get("relics", []) if isinstance(data, dict) else data
+    by_name = {item['item_name'].lower(): item['url_name'] for item in catalog}
+    relics = {}
+    for entry in entries:
+        name = f"{entry.get('tier', '')} {entry.get('relicName', '')}".strip()
+        intact = (entry.get("state") or "Intact").lower() == "intact"
+        if not name or (name in relics and not intact):
+            continue
+        rewards = [{"item": reward_slug(r["itemName"], by_name), "rarity": reward_rarity(r)}
+                   for r in entry.get("rewards", []) if r.get("itemName")]
+        if rewards:
+            rewards.sort(key=lambda r: (RARITIES.index(r["rarity"]), r["item"]))
+            relics[name] = {"name": name, "rewards": rewards}
+    return [relics[name] for name in sorted(relics)]
+
+
+def save_relics(relics, path=RELICS_FILE):
+    """Replaces the relics in a drop table file, keeping its refinement chances."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    data["relics"] = relics
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+class RelicCalculator:
+    """Expected platinum of every relic at every refinement, from cached part prices.
+
+    Rewards are resolved to item ids once, prices are read in bulk, and per-rarity price sums are
+    kept in memory for both price modes, so a single part price change only touches the relics
+    that can drop that part (see update_price).
+    """
+
+    MODES = ("avg", "low")
+
+    def __init__(self, db=None, path=RELICS_FILE):
+        self.db = db or Database()
+        self.path = path
+
+        self.refinements = {}
+        self.relics = []
+        self.rewards = {}
+        self.dependents = {}
+        self.slugs = {}
+        self.unresolved = []
+
+        self.prices = {}
+        self.missing = set()
+        self.stale = set()
+        self.rarity_sums = {}
+
+    def load_definitions(self, items=None):
+        self.refinements, self.relics, problems = load_relics(self.path)
+        for problem in problems:
+            print(f"Relic data: {problem}")
+
+        if items is None:
+            items = self.db.get_all_items()
+        ids = {i['url_name']: i['id'] for i in items}
+
+        # relic name -> [(item id, rarity)] and item id -> [relic names]
+        self.rewards = {}
+        self.dependents = {}
+        self.slugs = {}
+        self.unresolved = []
+        for relic in self.relics:
+            resolved = []
+            for reward in relic['rewards']:
+                item_id = ids.get(reward['item'])
+                if item_id is None:
+                    # Untradeable rewards such as Forma blueprints are simply worth nothing here.
+                    self.unresolved.append((relic['name'], reward['item']))
+                    continue
+                resolved.append((item_id, reward['rarity']))
+                self.slugs[item_id] = reward['item']
+                relics = self.dependents.setdefault(item_id, [])
+                if relic['name'] not in relics:
+                    relics.append(relic['name'])
+            self.rewards[relic['name']] = resolved
+
+    def load_prices(self):
+        """Reads every reward's latest part (or set) price in two queries."""
+        if not self.rewards:
+            self.load_definitions()
+
+        cached = self.db.get_latest_set_prices()
+        cached.update(self.db.get_latest_part_prices())
+        now = time.time()
+
+        self.prices = {}
+        self.missing = set()
+        self.stale = set()
+        for item_id in self.dependents:
+            p = cached.get(item_id)
+            fresh = bool(p) and now - p['timestamp'] < MarketScanner.CACHE_TTL
+            metrics.cache_check("relics", bool(p), fresh)
+            if not p:
+                self.missing.add(item_id)
+                continue
+            if not fresh:
+                self.stale.add(item_id)
+            self.prices[item_id] = {mode: max(p.get(mode) or 0, 0) for mode in self.MODES}
+
+        self.rebuild_sums()
+
+    def rebuild_sums(self):
+        self.rarity_sums = {}
+        for name, rewards in self.rewards.items():
+            sums = {(rarity, mode): 0.0 for rarity in RARITIES for mode in self.MODES}
+            for item_id, rarity in rewards:
+                price = self.prices.get(item_id)
+                if price:
+                    for mode in self.MODES:
+                        sums[(rarity, mode)] += price[mode]
+            self.rarity_sums[name] = sums
+
+    def update_price(self, item_id, avg, low):
+        """Applies a new price for one part and returns the names of the relics whose EV changed."""
+        if item_id not in self.dependents:
+            return []
+
+        new = {"avg": max(avg or 0, 0), "low": max(low or 0, 0)}
+        old = self.prices.get(item_id) or {mode: 0 for mode in self.MODES}
+        self.prices[item_id] = new
+        self.missing.discard(item_id)
+        self.stale.discard(item_id)
+
+        for name in self.dependents[item_id]:
+            sums = self.rarity_sums[name]
+            for reward_id, rarity in self.rewards[name]:
+                if reward_id == item_id:
+                    for mode in self.MODES:
+                        sums[(rarity, mode)] += new[mode] - old[mode]
+        return list(self.dependents[item_id])
+
+    def relic_ev(self, name, refinement="intact", mode="avg"):
+        chances = self.refinements[refinement]
+        sums = self.rarity_sums[name]
+        return sum(chances[rarity] * sums[(rarity, mode)] for rarity in RARITIES)
+
+    def relic_result(self, name, mode="avg"):
+        result = {"name": name}
+        for refinement in REFINEMENTS:
+            result[refinement] = self.relic_ev(name, refinement, mode)
+        result["unpriced"] = sum(1 for item_id, _ in self.rewards[name] if item_id not in self.prices)
+        return result
+
+    def results(self, mode="avg", sort_by="radiant"):
+        results = [self.relic_result(relic['name'], mode) for relic in self.relics]
+        results.sort(key=lambda r: r[sort_by], reverse=True)
+        return results
+
+    def refresh_prices(self, scanner=None, workers=3, item_ids=None, on_result=None):
+        """Prices missing or stale rewards through the market scanner's resumable job."""
+        if item_ids is None:
+            item_ids = self.missing | self.stale
+        scanner = scanner or MarketScanner(db=self.db)
+
+        def apply(item, summary, from_cache):
+            self.update_price(item[0], summary['avg'], summary['low'])
+            if on_result:
+                on_result(item, summary, from_cache)
+
+        work = [(item_id, self.slugs[item_id], 'part', MarketScanner.DEFAULT_MAX_RANK) for item_id in item_ids]
+        if not work:
+            return {"items": 0, "cached": 0, "fetched": 0, "failed": 0, "elapsed": 0.0}
+        return scanner.run_job("relics", work, workers=workers, force_refresh=True, on_result=apply)
@@ -0,0 +1,42 @@
+import time
+from data.database import Database
+from services.market_scanner import MarketScanner
+
+
+def reprice(db=None, snapshots=None, on_progress=None, pool=None):
+    """Recomputes the derived price tables from the newest stored order book of every item.
+
+    Nothing is downloaded: each snapshot is priced again with the current PriceCalculator rules
+    and written back over the row saved at the same fetch (see Database.replace_prices). With a
+    services.price_pool.PricePool, the snapshots are decoded and priced in its processes.
+    """
+    db = db or Database()
+    start = time.perf_counter()
+
+    if pool is None:
+        priced = (((item_id, item_type, timestamp), MarketScanner.price(orders, item_type))
+                  for item_id, item_type, timestamp, orders in snapshots.iter_latest())
+    else:
+        jobs = (((item_id, item_type, timestamp), "rows", blob, item_type, MarketScanner.DEFAULT_MAX_RANK)
+                for item_id, item_type, timestamp, blob in snapshots.iter_latest(raw=True))
+        priced = ((key, summary) for key, summary, _ in pool.map(jobs))
+
+    arcanes, sets, parts, ranks = [], [], [], []
+    count = 0
+    for (item_id, item_type, timestamp), summary in priced:
+        if item_type == 'arcane':
+            arcanes.append((item_id, summary['max_rank'], summary['avg_r0'], summary['avg_max'], summary['avg_flip'],
+                            summary['low_r0'], summary['low_max'], summary['low_flip'], timestamp))
+            if summary.get('ranks'):
+                ranks.append((item_id, summary['ranks'], timestamp))
+        elif item_type == 'part':
+            parts.append((item_id, summary['avg'], summary['low'], timestamp))
+        else:
+            sets.append((item_id, summary['avg'], summary['low'], timestamp))
+        count += 1
+        if on_progress:
+            on_progress(count)
+
+    db.replace_prices(arcanes=arcanes, sets=sets, parts=parts, ranks=ranks)
+    return {"items": count, "arcanes": len(arcanes), "sets": len(sets), "parts": len(parts),
+            "elapsed": time.perf_counter() - start}
@@ -0,0 +1,107 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+def trigrams(token):
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """In-memory name index for the search bars.
+
+    Built once per catalog. A query matches a row when the whole query is a substring of its
+    text (the old behaviour) or when every query word is a prefix of some word in it, so
+    "ar grace" finds "Arcane Grace". When nothing matches, each query word may instead match a
+    word that shares enough trigrams with it, which tolerates typos like "arcne grace".
+    """
+
+    def __init__(self, texts, min_similarity=0.4):
+        self.texts = [t.lower() for t in texts]
+        self.min_similarity = min_similarity
+
+        token_rows = defaultdict(set)
+        for row, text in enumerate(self.texts):
+            for token in tokenize(text):
+                token_rows[token].add(row)
+
+        self.tokens = sorted(token_rows)
+        self.token_rows = dict(token_rows)
+
+        # Trigram postings are kept per row (for substring search) and per word (for typo matching).
+        self.token_trigrams = {}
+        self.trigram_tokens = defaultdict(set)
+        for token in self.token_rows:
+            grams = trigrams(token)
+            self.token_trigrams[token] = grams
+            for gram in grams:
+                self.trigram_tokens[gram].add(token)
+
+        self.row_trigrams = defaultdict(set)
+        for row, text in enumerate(self.texts):
+            for i in range(len(text) - 2):
+                self.row_trigrams[text[i:i + 3]].add(row)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def prefix_rows(self, prefix):
+        rows = set()
+        i = bisect_left(self.tokens, prefix)
+        while i < len(self.tokens) and self.tokens[i].startswith(prefix):
+            rows |= self.token_rows[self.tokens[i]]
+            i += 1
+        return rows
+
+    def substring_rows(self, query):
+        grams = [query[i:i + 3] for i in range(len(query) - 2)]
+        if grams:
+            candidates = set.intersection(*(self.row_trigrams.get(g, set()) for g in grams))
+        else:
+            candidates = range(len(self.texts))
+        return {row for row in candidates if query in self.texts[row]}
+
+    def fuzzy_token_rows(self, token):
+        query_grams = trigrams(token)
+        shared = defaultdict(int)
+        for gram in query_grams:
+            for candidate in self.trigram_tokens.get(gram, ()):
+                shared[candidate] += 1
+
+        rows = set()
+        for candidate, count in shared.items():
+            # Dice coefficient between the two words' trigram sets.
+            similarity = 2 * count / (len(query_grams) + len(self.token_trigrams[candidate]))
+            if similarity >= self.min_similarity:
+                rows |= self.token_rows[candidate]
+        return rows
+
+    def match_tokens(self, query_tokens, fuzzy):
+        rows = None
+        for token in query_tokens:
+            token_match = self.prefix_rows(token)
+            if fuzzy:
+                token_match |= self.fuzzy_token_rows(token)
+            rows = token_match if rows is None else rows & token_match
+            if not rows:
+                return set()
+        return rows or set()
+
+    def search(self, query, fuzzy=True):
+        """Returns the set of matching rows, or None when the query is empty (show everything)."""
+        query = query.strip().lower()
+        if not query:
+            return None
+
+        query_tokens = tokenize(query)
+        rows = self.substring_rows(query) | self.match_tokens(query_tokens, fuzzy=False)
+        if not rows and fuzzy:
+            rows = self.match_tokens(query_tokens, fuzzy=True)
+        return rows
@@ -0,0 +1,118 @@
+import hashlib
+import json
+from concurrent.futures import as_completed
+from api.warframe_market import WarframeMarketAPI
+from api.scheduler import request_pool
+from data.database import Database
+
+VERSION_SETTING = "set_components_version"
+# Set id -> failed attempts since the catalog last changed; a set is given up on after MAX_RETRIES.
+RETRIES_SETTING = "set_components_retries"
+MAX_RETRIES = 3
+
+
+def catalog_sets(catalog):
+    return [item for item in catalog if 'set' in item.get('tags', [])]
+
+
+def catalog_signature(sets):
+    """Fingerprint of the sets in the catalog; it only changes when sets are added or removed."""
+    digest = hashlib.sha1()
+    for set_id in sorted(s['id'] for s in sets):
+        digest.update(set_id.encode())
+    return digest.hexdigest()
+
+
+class SetComponentsService:
+    """Keeps the set_components table (which parts make up each set) filled from the API."""
+
+    def __init__(self, api=None, db=None):
+        self.api = api or WarframeMarketAPI()
+        self.db = db or Database()
+
+    def resolve_parts(self, set_item_id, set_slug, items_in_set, by_id=None, by_slug=None):
+        """Maps a get_item_details response to (part_item_id, quantity) pairs.
+
+        Parts that aren't in the catalog are kept under their slug, so the details popup can still
+        price them; everything else reads compositions joined with the catalog and skips them.
+        """
+        components = []
+        for part in items_in_set:
+            # Identifier could be a slug or an ID depending on API response format
+            resolved = None
+            for identifier in (part.get("id"), part.get("url_name") or part.get("slug")):
+                if not identifier:
+                    continue
+                if by_id is not None:
+                    resolved = by_id.get(identifier) or by_slug.get(identifier)
+                else:
+                    resolved = self.db.get_item_by_id(identifier) or self.db.get_item_by_slug(identifier)
+                if resolved:
+                    break
+
+            if not resolved:
+                slug = part.get("url_name") or part.get("slug")
+                print(f"Unknown part in {set_slug}: {slug or part.get('id')}")
+                if slug and slug != set_slug:
+                    components.append((slug, part.get("quantity", 1)))
+                continue
+            if resolved['id'] == set_item_id or resolved['url_name'] == set_slug:
+                continue
+            components.append((resolved['id'], part.get("quantity", 1)))
+        return components
+
+    def fetch_components(self, set_item_id, set_slug, include_unknown=False):
+        """Downloads and stores the composition of one set, returning it in get_set_components form."""
+        items_in_set = self.api.get_item_details(set_slug)
+        components = self.resolve_parts(set_item_id, set_slug, items_in_set)
+        if components:
+            self.db.save_set_components(set_item_id, components)
+        return self.db.get_set_components(set_item_id, include_unknown)
+
+    def get_components(self, set_item_id, set_slug, include_unknown=False):
+        """Returns the stored composition, fetching it only if this set has never been seen."""
+        return (self.db.get_set_components(set_item_id, include_unknown)
+                or self.fetch_components(set_item_id, set_slug, include_unknown))
+
+    def prefetch_all(self, catalog, force=False, on_progress=None):
+        """Fills in the composition of every set in the catalog that does not have one yet.
+
+        While the catalog's sets are unchanged since the last run, only sets that failed are tried
+        again, up to MAX_RETRIES times in all; sets whose parts can never be resolved then stop
+        costing requests until the catalog changes. Detail requests go out concurrently through the
+        shared request pool; database writes stay on the calling thread.
+        """
+        sets = catalog_sets(catalog)
+        signature = catalog_signature(sets)
+        if not force and self.db.get_setting(VERSION_SETTING) == signature:
+            retries = json.loads(self.db.get_setting(RETRIES_SETTING) or "{}")
+            missing = [s for s in sets if 0 < retries.get(s['id'], 0) < MAX_RETRIES]
+            if not missing:
+                return {"sets": len(sets), "fetched": 0, "failed": 0, "up_to_date": True}
+        else:
+            retries = {}
+            known = set(self.db.get_all_set_components())
+            missing = [s for s in sets if force or s['id'] not in known]
+
+        by_id = {item['id']: item for item in catalog}
+        by_slug = {item['url_name']: item for item in catalog}
+
+        stats = {"sets": len(sets), "fetched": 0, "failed": 0, "up_to_date": False}
+        pool = request_pool()
+        futures = {pool.submit(self.api.get_item_details, s['url_name']): s for s in missing}
+        for done, future in enumerate(as_completed(futures), 1):
+            set_item = futures[future]
+            components = self.resolve_parts(set_item['id'], set_item['url_name'], future.result(), by_id, by_slug)
+            if components:
+                self.db.save_set_components(set_item['id'], components)
+                retries.pop(set_item['id'], None)
+                stats["fetched"] += 1
+            else:
+                retries[set_item['id']] = retries.get(set_item['id'], 0) + 1
+                stats["failed"] += 1
+            if on_progress:
+                on_progress(done, len(missing))
+
+        self.db.set_setting(RETRIES_SETTING, json.dumps(retries))
+        self.db.set_setting(VERSION_SETTING, signature)
+        return stats
@@ -1,149 +1,241 @@
+import time
+from concurrent.futures import as_completed
 from api.warframe_market import WarframeMarketAPI
+from api.scheduler import request_pool
 from data.database import Database
-from services.price_calculator import PriceCalculator
+from services.market_scanner import MarketScanner
+from services.metrics import metrics
+from services import pack_distribution
+from services.pack_definitions import pack_definitions
 
 class VosforCalculator:
-    PACKS = {
-        "Cavia Collection": { 
-             "cost": 200,
-             "tiers": {
-                 "uncommon": ["melee_fortification", "melee_retaliation"],
-                 "rare": ["arcane_battery", "arcane_ice_storm", "melee_afflictions", "melee_animosity", "melee_exposure", "melee_influence", "melee_vortex", "secondary_fortifier", "secondary_surge"],
-                 "legendary": ["melee_duplicate", "melee_crescendo"]
-             },
-             "tier_probs": {"uncommon": 0.45, "rare": 0.50, "legendary": 0.05}
-        },
-        "Duviri Collection": {
-            "cost": 200,
-            "tiers": {
-                "uncommon": ["arcane_intention", "magus_aggress"],
-                "rare": ["arcane_power_ramp", "primary_blight", "primary_exhilarate", "primary_obstruct", "shotgun_vendetta", "akimbo_slip_shot", "secondary_outburst"],
-                "legendary": ["arcane_reaper", "longbow_sharpshot", "secondary_shiver"] 
-            },
-            "tier_probs": {"uncommon": 0.45, "rare": 0.50, "legendary": 0.05}
-        },
-        "Eidolon Collection": {
-            "cost": 200,
-            "tiers": {
-                "common": ["arcane_consequence", "arcane_ice", "arcane_momentum", "arcane_nullifier", "arcane_tempo", "arcane_warmth"],
-                "uncommon": ["arcane_acceleration", "arcane_agility", "arcane_awakening", "arcane_deflection", "arcane_eruption", "arcane_guardian", "arcane_healing", "arcane_phantasm", "arcane_resistance", "arcane_strike", "arcane_trickery", "arcane_velocity", "arcane_victory"],
-                "rare": ["arcane_aegis", "arcane_arachne", "arcane_avenger", "arcane_fury", "arcane_precision", "arcane_pulse", "arcane_rage", "arcane_ultimatum"],
-                "legendary": ["arcane_barrier", "arcane_energize", "arcane_grace"]
-            },
-            "tier_probs": {"common": 0.40, "uncommon": 0.35, "rare": 0.20, "legendary": 0.05} 
-        },
-        "Holdfasts Collection": { 
-            "cost": 200,
-            "tiers": {
-                "rare": ["arcane_blessing", "arcane_rise", "molt_augmented", "molt_efficiency", "molt_reconstruct", "molt_vigor", "fractalized_reset", "primary_frostbite", "cascadia_accuracy", "cascadia_empowered", "cascadia_flare", "cascadia_overcharge", "conjunction_voltage", "emergence_dissipate", "emergence_renewed", "emergence_savior", "eternal_eradicate", "eternal_logistics", "eternal_onslaught"]
-            },
-             "tier_probs": {"rare": 1.0} 
-        },
-        "Höllvania Collection": { 
-             "cost": 200,
-             "tiers": {
-                 "rare": ["arcane_bellicose", "arcane_camisado", "arcane_crepuscular", "arcane_impetus", "arcane_truculence", "melee_doughty", "primary_crux", "secondary_enervate"],
-                 "legendary": ["arcane_escapist", "arcane_hot_shot", "arcane_universal_fallout"]
-             },
-             "tier_probs": {"rare": 0.95, "legendary": 0.05}
-        },
-        "Necralisk Collection": {
-            "cost": 200,
-            "tiers": {
-                 "rare": ["arcane_double_back", "arcane_steadfast", "theorem_contagion", "theorem_demulcent", "theorem_infection", "primary_plated_round", "secondary_encumber", "secondary_kinship", "residual_boils", "residual_malodor", "residual_shock", "residual_viremia"]
-            },
-            "tier_probs": {"rare": 1.0}
-        },
-        "Ostron Collection": {
-            "cost": 200,
-            "tiers": {
-                "common": ["magus_husk", "magus_vigor", "virtuos_null", "virtuos_tempo"],
-                "uncommon": ["exodia_triumph", "exodia_valor", "magus_cadence", "magus_cloud", "magus_replenish", "virtuos_fury", "virtuos_strike"],
-                "rare": ["exodia_brave", "exodia_force", "exodia_hunt", "exodia_might", "magus_elevate", "magus_nourish", "virtuos_ghost", "virtuos_shadow"]
-            },
-            "tier_probs": {"common": 0.10, "uncommon": 0.30, "rare": 0.60}
-        },
-        "Solaris Collection": {
-            "cost": 200,
-            "tiers": {
-                "common": ["magus_accelerant", "magus_anomaly", "magus_drive", "magus_firewall", "magus_overload", "virtuos_spike", "virtuos_surge"],
-                "uncommon": ["magus_glitch", "magus_repair", "virtuos_forge", "virtuos_trojan"],
-                "rare": ["pax_bolt", "pax_charge", "pax_seeker", "pax_soar", "magus_destruct", "magus_lockdown", "magus_melt", "magus_revert"]
-            },
-            "tier_probs": {"common": 0.15, "uncommon": 0.15, "rare": 0.70}
-        },
-        "Steel Path Collection": {
-            "cost": 200,
-            "tiers": {
-                "rare": ["arcane_blade_charger", "arcane_bodyguard", "arcane_pistoleer", "arcane_primary_charger", "arcane_tanker", "primary_deadhead", "primary_dexterity", "primary_merciless", "secondary_deadhead", "secondary_dexterity", "secondary_merciless"]
-            },
-             "tier_probs": {"rare": 1.0}
-        },
-        "Descendia Collection": {
-            "cost": 200,
-            "tiers": {
-                "rare": ["arcane_circumvent", "arcane_concentration", "arcane_expertise", "arcane_persistence", "primary_bulwark", "primary_debilitate", "primary_overcharge", "secondary_irradiate", "melee_careen"]
-            },
-            "tier_probs": {"rare": 1.0}
+    """Expected value of the Vosfor arcane packs defined in data/packs.json.
+
+    Everything is keyed by item id: slugs are resolved once by PackDefinitions, prices are read
+    in bulk, and EVs come from per-tier price sums kept in memory for both price modes.
+    """
+
+    MODES = ("avg", "cheapest")
+
+    def __init__(self, api=None, db=None, definitions=None):
+        self.api = api or WarframeMarketAPI()
+        self.db = db or Database()
+        self.definitions = definitions or pack_definitions
+        
+        self.packs = {}
+        self.tiers = {}
+        self.ids = {}
+        self.slugs = {}
+        self.unresolved = []
+        self.dependents = {}
+        
+        self.prices = {}
+        self.pending = set()
+        self.stale = set()
+        # Never-priced arcanes whose fetch failed; load_prices() puts them back in pending for another try.
+        self.unavailable = set()
+        self.tier_sums = {}
+        self.loaded = False
+
+    def load_definitions(self, items=None):
+        """Picks up the current pack definitions (cached unless data/packs.json changed)."""
+        resolved = self.definitions.resolve(self.db, items)
+        self.packs = resolved['packs']
+        self.tiers = resolved['tiers']
+        self.ids = resolved['ids']
+        self.slugs = resolved['slugs']
+        self.unresolved = resolved['unresolved']
+        
+        # item id -> [(pack name, tier name)] so one price change only touches the packs that use it
+        self.dependents = {}
+        for name, tiers in self.tiers.items():
+            for tier_name, item_ids in tiers.items():
+                for item_id in item_ids:
+                    self.dependents.setdefault(item_id, []).append((name, tier_name))
+
+    def load_prices(self):
+        """Reads every pack arcane's latest price in one query. Does not touch the network.
+
+        Arcanes that were never priced go to `pending` and are left out of the tier averages until
+        refresh_prices() fetches them; arcanes older than the cache TTL go to `stale` and keep their
+        old price meanwhile.
+        """
+        self.load_definitions()
+        cached = self.db.get_latest_arcane_prices()
+        now = time.time()
+        
+        self.prices = {}
+        self.pending = set()
+        self.stale = set()
+        self.unavailable = set()
+        for item_id in self.dependents:
+            p = cached.get(item_id)
+            fresh = bool(p) and now - p['timestamp'] < MarketScanner.CACHE_TTL
+            metrics.cache_check("packs", bool(p), fresh)
+            if not p:
+                self.pending.add(item_id)
+                continue
+            if not fresh:
+                self.stale.add(item_id)
+            
+            self.prices[item_id] = {"avg": max(p.get('avg_r0') or 0, 0), "cheapest": max(p.get('low_r0') or 0, 0)}
+        
+        self.rebuild_tier_sums()
+        self.loaded = True
+
+    def refresh_prices(self, item_ids=None, on_price=None):
+        """Fetches the given arcanes (by default every pending or stale one) concurrently.
+
+        Requests go through the shared request pool, so they respect the global rate limit.
+        Each result is saved on the calling thread and then passed to `on_price(slug, summary)`;
+        without a callback it is applied to the tier sums straight away. Returns the failed slugs.
+        """
+        if item_ids is None:
+            item_ids = self.pending | self.stale
+        if on_price is None:
+            on_price = lambda slug, summary: self.update_price(slug, summary['avg_r0'], summary['low_r0'])
+        
+        scanner = MarketScanner(self.api, self.db)
+        pool = request_pool()
+        futures = {
+            pool.submit(scanner.fetch, self.slugs[item_id], 'arcane', MarketScanner.DEFAULT_MAX_RANK): item_id
+            for item_id in item_ids if item_id in self.slugs
+        }
+        
+        failed = []
+        for future in as_completed(futures):
+            item_id = futures[future]
+            slug = self.slugs[item_id]
+            try:
+                summary = future.result()
+            except Exception as e:
+                print(f"Error fetching price for {slug}: {e}")
+                failed.append(slug)
+                continue
+            
+            scanner.save(item_id, 'arcane', summary)
+            on_price(slug, summary)
+        return failed
+
+    def rebuild_tier_sums(self):
+        self.tier_sums = {}
+        for name, tiers in self.tiers.items():
+            for tier_name, item_ids in tiers.items():
+                priced = [self.prices[item_id] for item_id in item_ids if item_id in self.prices]
+                self.tier_sums[(name, tier_name)] = {
+                    "count": len(priced),
+                    "avg": sum(p["avg"] for p in priced),
+                    "cheapest": sum(p["cheapest"] for p in priced)
+                }
+
+    def price_of(self, slug, mode="avg"):
+        p = self.prices.get(self.ids.get(slug))
+        return p[mode] if p else 0
+
+    def update_price(self, slug, avg, cheapest):
+        """Applies a new price for one arcane and returns the names of the packs whose EV changed."""
+        item_id = self.ids.get(slug)
+        if item_id not in self.dependents:
+            return []
+        
+        new = {"avg": max(avg or 0, 0), "cheapest": max(cheapest or 0, 0)}
+        old = self.prices.get(item_id)
+        is_new = old is None
+        if is_new:
+            # First price for this arcane: it joins the tier averages it belongs to.
+            old = {mode: 0 for mode in self.MODES}
+        self.prices[item_id] = new
+        self.pending.discard(item_id)
+        self.stale.discard(item_id)
+        self.unavailable.discard(item_id)
+        
+        affected = []
+        for name, tier_name in self.dependents[item_id]:
+            sums = self.tier_sums[(name, tier_name)]
+            if is_new:
+                sums["count"] += 1
+            for mode in self.MODES:
+                sums[mode] += new[mode] - old[mode]
+            if name not in affected:
+                affected.append(name)
+        return affected
+
+    def mark_failed(self, slugs):
+        """Moves pending arcanes whose fetch failed to `unavailable`. Returns the names of the packs that use them."""
+        affected = []
+        for slug in slugs:
+            item_id = self.ids.get(slug)
+            if item_id not in self.pending:
+                continue
+            self.pending.discard(item_id)
+            self.unavailable.add(item_id)
+            for name, _ in self.dependents[item_id]:
+                if name not in affected:
+                    affected.append(name)
+        return affected
+
+    def pack_ev(self, name, mode="avg"):
+        """Expected platinum from opening one pack (3 arcanes), using only in-memory tier sums."""
+        tier_probs = self.packs[name].get('tier_probs', {})
+        
+        pack_total_ev = 0
+        for tier_name in self.tiers[name]:
+            prob = tier_probs.get(tier_name, 0)
+            sums = self.tier_sums.get((name, tier_name))
+            if prob == 0 or not sums or not sums["count"]: continue
+            pack_total_ev += (sums[mode] / sums["count"]) * prob
+        
+        return pack_total_ev * 3
+
+    def is_pending(self, name):
+        """True while some arcane of the pack has no price yet, so its EV is only partial."""
+        return any(item_id in self.pending for item_ids in self.tiers[name].values() for item_id in item_ids)
+
+    def unavailable_in(self, name):
+        """Slugs of the pack's arcanes that have no price because their fetch failed."""
+        return sorted(self.slugs[item_id] for item_ids in self.tiers[name].values()
+                      for item_id in item_ids if item_id in self.unavailable)
+
+    def pack_tiers(self, name, mode="avg"):
+        """[(tier probability, [known arcane prices])] of a pack, the input of pack_distribution."""
+        tier_probs = self.packs[name].get('tier_probs', {})
+        return [
+            (tier_probs.get(tier_name, 0), [self.prices[i][mode] for i in item_ids if i in self.prices])
+            for tier_name, item_ids in self.tiers[name].items()
+        ]
+
+    def pack_risk(self, name, mode="avg", threshold=None, method="exact", samples=100000, seed=None):
+        """Distribution statistics of one pack's 3-arcane return.
+
+        The loss threshold defaults to the pack's cost, the same figure the EV is compared to.
+        """
+        if threshold is None:
+            threshold = self.packs[name]['cost']
+        tiers = self.pack_tiers(name, mode)
+        if method == "monte_carlo":
+            return pack_distribution.monte_carlo(tiers, threshold, samples=samples, seed=seed)
+        return pack_distribution.exact(tiers, threshold)
+
+    def pack_result(self, name, mode="avg"):
+        risk = self.pack_risk(name, mode)
+        return {
+            "name": name,
+            "cost": self.packs[name]['cost'],
+            "ev": self.pack_ev(name, mode),
+            "std": risk['std'],
+            "median": risk['percentiles'][50],
+            "percentiles": risk['percentiles'],
+            "p_loss": risk['p_loss'],
+            "pending": self.is_pending(name),
+            "unavailable": self.unavailable_in(name)
         }
-    }
-    
-    def __init__(self):
-        self.api = WarframeMarketAPI()
-        self.db = Database()
+
+    def results(self, mode="avg"):
+        return [self.pack_result(name, mode) for name in self.packs]
 
     def calculate_all_packs(self, mode="avg"):
         """Calculates expected values for all arcane packs based on current market prices and drop probabilities."""
-        results = []
-        for name, data in self.PACKS.items():
-            cost = data['cost']
-            tiers = data['tiers']
-            tier_probs = data.get('tier_probs', {})
-            
-            pack_total_ev = 0
-            
-            for tier_name, slugs in tiers.items():
-                if not slugs: continue
-                prob = tier_probs.get(tier_name, 0)
-                if prob == 0: continue
-                
-                tier_prices = []
-                for slug in slugs:
-                    item = self.db.get_item_by_slug(slug)
-                    if not item: continue
-                    item_id = item['id']
-                    
-                    p = self.db.get_arcane_price(item_id)
-                    price = 0
-                    
-                    if p:
-                        if mode == "cheapest":
-                            price = p.get('low_r0', 0)
-                        else:
-                            price = p.get('avg_r0', 0)
-                    else:
-                        orders = self.api.get_orders(slug)
-                        avg_r0 = PriceCalculator.calculate_price(orders, "arcane", rank=0)
-                        low_r0 = PriceCalculator.calculate_cheapest(orders, rank=0)
-                        avg_max = PriceCalculator.calculate_price(orders, "arcane", rank=5)
-                        low_max = PriceCalculator.calculate_cheapest(orders, rank=5)
-                        
-                        self.db.save_arcane_price(item_id, 5, avg_r0, avg_max, 0, low_r0, low_max, 0)
-                        price = low_r0 if mode == "cheapest" else avg_r0
-                    
-                    if price <= 0: price = 0
-                    tier_prices.append(price)
-                
-                if tier_prices:
-                    avg_tier_val = sum(tier_prices) / len(tier_prices)
-                    pack_total_ev += avg_tier_val * prob
-            
-            total_ev_3x = pack_total_ev * 3
-            
-            results.append({
-                "name": name,
-                "cost": cost,
-                "ev": total_ev_3x
-            })
-            
-        return results
+        if not self.loaded:
+            self.load_prices()
+            self.refresh_prices()
+        return self.results(mode)
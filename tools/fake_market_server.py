@@ -0,0 +1,311 @@
+"""Local stand-in for the warframe.market API, for benchmarks and offline testing.
+
+    python tools/fake_market_server.py                              # synthetic catalog on http://127.0.0.1:8766
+    python tools/fake_market_server.py --db data/cache.db --snapshots-db data/snapshots.db
+    python tools/fake_market_server.py --latency 150 --rate-limit 3 --error-rate 0.02
+
+Serves /v2/items, /v2/items/{slug} and /v2/orders/item/{slug} in the shape WarframeMarketAPI
+reads. The catalog and set parts come from a cache.db when given, order books from a recorded
+snapshots.db (see `cli.py scan --snapshots`); anything missing is generated from `--seed`, so the
+same seed always serves the same books. /_stats returns request counts as JSON.
+
+Point the app or the CLI at it with TENNOFLIP_API_URL=http://127.0.0.1:8766.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data.database import Database
+from data.snapshots import SnapshotStore
+
+SET_TAGS = (["warframe"], ["weapon", "primary"], ["weapon", "secondary"], ["weapon", "melee"])
+PART_NAMES = {
+    "warframe": ("blueprint", "neuroptics", "chassis", "systems"),
+    "weapon": ("blueprint", "barrel", "receiver", "stock")
+}
+
+
+def synthetic_catalog(arcanes=150, sets=400, seed=1):
+    """(items, set_parts) of a made-up catalog, items in the shape get_items() returns.
+
+    set_parts maps set slugs to [(part slug, quantity)].
+    """
+    rng = random.Random(seed)
+    items, set_parts = [], {}
+
+    def add(slug, tags, **extra):
+        item = {"id": "%024x" % rng.getrandbits(96), "url_name": slug,
+                "item_name": slug.replace("_", " ").title(), "tags": tags, "max_rank": -1}
+        item.update(extra)
+        items.append(item)
+
+    for i in range(arcanes):
+        add(f"arcane_synthetic_{i:04d}", ["arcane_enhancement", rng.choice(("common", "rare", "legendary"))],
+            max_rank=rng.choice((3, 5, 5, 5)))
+    for i in range(sets):
+        tags = SET_TAGS[i % len(SET_TAGS)]
+        kind = "warframe" if "warframe" in tags else "weapon"
+        name = f"synthetic_{i:04d}_prime"
+        add(f"{name}_set", ["set", "prime"] + tags)
+        set_parts[f"{name}_set"] = []
+        for part in PART_NAMES[kind]:
+            slug = f"{name}_{part}"
+            add(slug, ["prime", "component", kind], ducats=rng.choice((15, 25, 45, 65, 100)),
+                vaulted=rng.random() < 0.3)
+            set_parts[f"{name}_set"].append((slug, 2 if part == "barrel" and rng.random() < 0.1 else 1))
+    return items, set_parts
+
+
+def catalog_from_db(db):
+    """(items, set_parts) of a recorded catalog in a cache.db."""
+    items = db.get_all_items()
+    slugs = {i['id']: i['url_name'] for i in items}
+    set_parts = {slugs[set_id]: [(p['url_name'], p['quantity']) for p in parts]
+                 for set_id, parts in db.get_all_set_components().items() if set_id in slugs}
+    return items, set_parts
+
+
+def synthetic_orders(rng, arcane, max_rank, count):
+    """Random order book in the /v2/orders response shape."""
+    base = rng.randint(5, 300)
+    orders = []
+    for _ in range(count):
+        rank = rng.choice((0, 0, 0, max_rank)) if arcane else None
+        price = base * ((max_rank + 1) * (max_rank + 2) // 2 if rank else 1)
+        orders.append({
+            "id": "%024x" % rng.getrandbits(96),
+            "type": rng.choice(("sell", "sell", "buy")),
+            "platinum": max(1, int(price * rng.uniform(0.7, 1.5))),
+            "quantity": rng.randint(1, 5),
+            "rank": rank,
+            "visible": True,
+            "user": {"status": rng.choice(("ingame", "online", "offline")), "ingameName": f"tenno{rng.randint(1, 99999)}"}
+        })
+    return orders
+
+
+def to_api_order(order):
+    """Order in the get_orders() shape (as SnapshotStore returns them) back to the /v2 shape."""
+    return {"id": order["id"], "type": order["order_type"], "platinum": order["platinum"], "quantity": 1,
+            "rank": order["mod_rank"], "visible": True, "user": dict(order["user"])}
+
+
+class FakeMarket:
+    """The data behind the server: catalog, set parts and order books, generated lazily."""
+
+    def __init__(self, items, set_parts=None, books=None, seed=1, orders_per_item=60):
+        self.items = {i['url_name']: i for i in items}
+        self.set_parts = set_parts or {}
+        self.books = dict(books or {})
+        self.seed = seed
+        self.orders_per_item = orders_per_item
+        self.lock = threading.Lock()
+
+    def catalog(self):
+        # get_items() reads the item name from "en"; everything it does not map ends up in "meta"
+        return [{
+            "id": i['id'], "slug": i['url_name'], "en": {"item_name": i['item_name']}, "tags": i.get('tags', []),
+            "maxRank": i.get('max_rank', -1), "ducats": i.get('ducats'), "tradingTax": i.get('trading_tax'),
+            "vaulted": i.get('vaulted')
+        } for i in self.items.values()]
+
+    def item(self, slug):
+        item = self.items.get(slug)
+        if item is None:
+            return None
+        return {
+            "id": item['id'], "slug": slug, "tags": item.get('tags', []), "en": {"item_name": item['item_name']},
+            "setParts": [{"id": self.items[p]['id'] if p in self.items else None, "slug": p, "quantityInSet": q}
+                         for p, q in self.set_parts.get(slug, [])]
+        }
+
+    def orders(self, slug):
+        if slug not in self.items:
+            return None
+        with self.lock:
+            book = self.books.get(slug)
+            if book is None:
+                item = self.items[slug]
+                rng = random.Random(f"{self.seed}:{slug}")
+                arcane = item.get('item_type') == 'arcane' or 'arcane_enhancement' in item.get('tags', [])
+                max_rank = item.get('max_rank') if (item.get('max_rank') or 0) > 0 else 5
+                count = max(1, int(rng.gauss(self.orders_per_item, self.orders_per_item / 3)))
+                book = self.books[slug] = synthetic_orders(rng, arcane, max_rank, count)
+            return book
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        """Returns 0 when a request may go through, else the seconds until it could."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+
+class MarketHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, delayed ACKs stall every keep-alive reply ~40 ms.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count(status)
+
+    def do_GET(self):
+        server = self.server
+        path = urlparse(self.path).path.rstrip("/")
+        if path == "/_stats":
+            return self.send_json(200, server.snapshot_stats())
+
+        if server.limiter is not None:
+            wait = server.limiter.take()
+            if wait:
+                return self.send_json(429, {"error": "Too Many Requests"}, {"Retry-After": f"{wait:.2f}"})
+
+        if server.latency or server.jitter:
+            time.sleep(max(0.0, server.latency + server.rng_uniform(-server.jitter, server.jitter)) / 1000)
+
+        if server.error_rate and server.rng_uniform(0, 1) < server.error_rate:
+            return self.send_json(500, {"error": "Injected failure"})
+
+        parts = path.strip("/").split("/")
+        market = server.market
+        if parts == ["v2", "items"]:
+            return self.send_json(200, {"apiVersion": "fake", "data": market.catalog()})
+        if len(parts) == 3 and parts[:2] == ["v2", "items"]:
+            item = market.item(parts[2])
+            return self.send_json(200, {"data": item}) if item else self.send_json(404, {"error": "Not Found"})
+        if len(parts) == 4 and parts[:3] == ["v2", "orders", "item"]:
+            orders = market.orders(parts[3])
+            return self.send_json(200, {"data": orders}) if orders is not None else self.send_json(404, {"error": "Not Found"})
+        return self.send_json(404, {"error": "Not Found"})
+
+
+class FakeMarketServer(ThreadingHTTPServer):
+    """HTTP server around a FakeMarket.
+
+    latency and jitter are in milliseconds; rate_limit is requests per second across all clients
+    (0 turns it off) and answers the excess with 429 + Retry-After; error_rate is the share of
+    requests answered with a 500.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, market, host="127.0.0.1", port=8766, latency=0.0, jitter=0.0, rate_limit=0.0,
+                 error_rate=0.0, seed=None, verbose=False):
+        super().__init__((host, port), MarketHandler)
+        self.market = market
+        self.latency = latency
+        self.jitter = jitter
+        self.limiter = TokenBucket(rate_limit) if rate_limit else None
+        self.error_rate = error_rate
+        self.verbose = verbose
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+    def rng_uniform(self, low, high):
+        with self.lock:
+            return self.rng.uniform(low, high)
+
+    def count(self, status):
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats[str(status)] += 1
+
+    def snapshot_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serves in a background thread, for tests and benchmarks."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--db", help="cache.db to take the catalog and set parts from (synthetic otherwise).")
+    parser.add_argument("--snapshots-db", help="Recorded order books to serve (synthetic otherwise).")
+    parser.add_argument("--arcanes", type=int, default=150, help="Synthetic catalog size.")
+    parser.add_argument("--sets", type=int, default=400, help="Synthetic catalog size (each set has 4 parts).")
+    parser.add_argument("--orders", type=int, default=60, help="Average synthetic orders per item.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Milliseconds added to every response.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- milliseconds on top of --latency.")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requests per second before answering 429.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with a 500.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="Log every request.")
+    args = parser.parse_args()
+
+    if args.db:
+        items, set_parts = catalog_from_db(Database(args.db))
+    else:
+        items, set_parts = synthetic_catalog(args.arcanes, args.sets, args.seed)
+
+    books = {}
+    if args.snapshots_db:
+        slugs = {i['id']: i['url_name'] for i in items}
+        store = SnapshotStore(args.snapshots_db)
+        books = {slugs[item_id]: [to_api_order(o) for o in orders]
+                 for item_id, _, _, orders in store.iter_latest() if item_id in slugs}
+        store.close()
+
+    market = FakeMarket(items, set_parts, books, args.seed, args.orders)
+    server = FakeMarketServer(market, args.host, args.port, args.latency, args.jitter, args.rate_limit,
+                              args.error_rate, args.seed, args.verbose)
+    print(f"Serving {len(items)} items ({len(books)} recorded books) on {server.url} (Ctrl+C to stop)")
+    print(f"  TENNOFLIP_API_URL={server.url} python cli.py scan ...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
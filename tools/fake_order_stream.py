@@ -0,0 +1,144 @@
+"""Local stand-in for a live order event stream, for trying and testing services.order_stream.
+
+    python tools/fake_order_stream.py                       # 200 catalog items on tcp://127.0.0.1:8765
+    python tools/fake_order_stream.py --items 50 --rate 500
+
+Every client first gets a snapshot of each book, then random created / updated / removed events
+at `--rate` events per second. Point the app at it with the "order_stream" setting or run
+`cli.py stream tcp://127.0.0.1:8765`.
+"""
+import argparse
+import json
+import os
+import random
+import socketserver
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data.database import Database
+
+
+class FakeMarket:
+    """Random order books that drift one event at a time. Thread safe."""
+
+    def __init__(self, items, seed=None):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.books = {}
+        for item in items:
+            arcane = item['item_type'] == 'arcane'
+            max_rank = item.get('max_rank') if arcane and (item.get('max_rank') or 0) > 0 else 5
+            base = self.rng.randint(5, 300)
+            self.books[item['url_name']] = {
+                "arcane": arcane, "max_rank": max_rank, "base": base,
+                "orders": {o["id"]: o for o in (self.new_order(arcane, max_rank, base) for _ in range(self.rng.randint(10, 80)))}
+            }
+
+    def new_order(self, arcane, max_rank, base):
+        rank = self.rng.choice((0, 0, 0, max_rank)) if arcane else None
+        price = base * (rank * 3 + 1 if rank else 1)
+        return {
+            "id": "%024x" % self.rng.getrandbits(96),
+            "type": self.rng.choice(("sell", "sell", "buy")),
+            "platinum": max(1, int(price * self.rng.uniform(0.7, 1.5))),
+            "quantity": 1,
+            "rank": rank,
+            "user": {"status": self.rng.choice(("ingame", "online", "offline"))}
+        }
+
+    def snapshots(self):
+        with self.lock:
+            return [{"event": "snapshot", "item": slug, "orders": list(book["orders"].values())}
+                    for slug, book in self.books.items()]
+
+    def next_event(self):
+        with self.lock:
+            slug = self.rng.choice(list(self.books))
+            book = self.books[slug]
+            orders = book["orders"]
+            roll = self.rng.random()
+            if roll < 0.35 or len(orders) < 5:
+                order = self.new_order(book["arcane"], book["max_rank"], book["base"])
+                orders[order["id"]] = order
+                return {"event": "created", "item": slug, "order": order}
+            order_id = self.rng.choice(list(orders))
+            if roll < 0.7:
+                order = dict(orders[order_id], platinum=max(1, orders[order_id]["platinum"] + self.rng.randint(-5, 5)),
+                             user={"status": self.rng.choice(("ingame", "online", "offline"))})
+                orders[order_id] = order
+                return {"event": "updated", "item": slug, "order": order}
+            del orders[order_id]
+            return {"event": "removed", "item": slug, "order_id": order_id}
+
+
+class StreamHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        market, rate = self.server.market, self.server.rate
+        try:
+            for event in market.snapshots():
+                self.wfile.write(json.dumps(event).encode() + b"\n")
+            interval = 1.0 / rate if rate > 0 else 0
+            while not self.server.stopping:
+                self.wfile.write(json.dumps(market.next_event()).encode() + b"\n")
+                if interval:
+                    time.sleep(interval)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class FakeOrderStreamServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, market, host="127.0.0.1", port=8765, rate=50.0):
+        super().__init__((host, port), StreamHandler)
+        self.market = market
+        self.rate = rate
+        self.stopping = False
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"tcp://{host}:{port}"
+
+    def start(self):
+        """Serves in a background thread, for tests and benchmarks."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.stopping = True
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--items", type=int, default=200, help="Catalog items to simulate (arcanes first).")
+    parser.add_argument("--rate", type=float, default=50.0, help="Events per second per client.")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--db", help="Path of the cache database to take the catalog from.")
+    args = parser.parse_args()
+
+    db = Database(args.db) if args.db else Database()
+    catalog = sorted(db.get_all_items(), key=lambda i: (i['item_type'] != 'arcane', i['url_name']))
+    if not catalog:
+        parser.error("The catalog is empty; open the app or run `cli.py scan` once to download it")
+
+    server = FakeOrderStreamServer(FakeMarket(catalog[:args.items], args.seed), args.host, args.port, args.rate)
+    print(f"Streaming {len(server.market.books)} order books on {server.url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stopping = True
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
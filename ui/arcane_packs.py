@@ -1,12 +1,13 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QHeaderView, QLabel, QLineEdit, QPushButton, QDialog)
 from PySide6.QtCore import Qt, QThread, Signal, QTimer
-from ui.common import PriceToggle
+from services.search_index import SearchIndex
+from ui.common import PriceToggle, price_events
 
 class NumericTableWidgetItem(QTableWidgetItem):
     def __lt__(self, other):
         try:
-            t1 = self.text().replace('p', '').replace(',', '').strip()
-            t2 = other.text().replace('p', '').replace(',', '').strip()
+            t1 = self.text().replace('p', '').replace(',', '').replace('~', '').replace('%', '').strip()
+            t2 = other.text().replace('p', '').replace(',', '').replace('~', '').replace('%', '').strip()
             f1 = float(t1) if t1 and t1 != 'N/A' else -1.0
             f2 = float(t2) if t2 and t2 != 'N/A' else -1.0
             return f1 < f2
@@ -21,7 +22,7 @@ class RarityTableWidgetItem(QTableWidgetItem):
         return v1 < v2
 
 class CollectionDetailsPopup(QDialog):
-    def __init__(self, pack_name, parent=None, mode="avg"):
+    def __init__(self, pack_name, parent=None, mode="avg", calc=None):
         super().__init__(parent)
         self.setWindowTitle(f"Collection: {pack_name}")
         self.resize(500, 600)
@@ -29,12 +30,11 @@ class CollectionDetailsPopup(QDialog):
         self.layout.setContentsMargins(15, 15, 15, 15)
         self.layout.setSpacing(10)
         
-        from services.vosfor_calculator import VosforCalculator
-        from data.database import Database
-        
-        calc = VosforCalculator()
-        db = Database()
-        pack = calc.PACKS.get(pack_name)
+        if calc is None:
+            from services.vosfor_calculator import VosforCalculator
+            calc = VosforCalculator()
+            calc.load_prices()
+        pack = calc.packs.get(pack_name)
         
         if not pack:
             self.layout.addWidget(QLabel("Pack info not found."))
@@ -57,17 +57,7 @@ class CollectionDetailsPopup(QDialog):
         rows = []
         for tier_name, slugs in pack['tiers'].items():
             for slug in slugs:
-                item = db.get_item_by_slug(slug)
-                price_val = 0
-                if item:
-                    item_id = item['id']
-                    p = db.get_arcane_price(item_id)
-                    if p:
-                        if mode == "cheapest":
-                             price_val = p.get('low_r0', 0)
-                        else:
-                             price_val = p.get('avg_r0', 0)
-                
+                price_val = calc.price_of(slug, mode)
                 price_str = f"{price_val:.1f}p" if price_val > 0 else "N/A"
                 rows.append((slug.replace("_", " ").title(), tier_name.capitalize(), price_str))
         
@@ -80,6 +70,8 @@ class CollectionDetailsPopup(QDialog):
         self.table.setSortingEnabled(True)
 
 class ArcanePacksWidget(QWidget):
+    SEARCH_DEBOUNCE_MS = 120
+
     def __init__(self):
         super().__init__()
         self.show_cheapest = False
@@ -95,9 +87,17 @@ class ArcanePacksWidget(QWidget):
         controls.setSpacing(8)
         self.search_bar = QLineEdit()
         self.search_bar.setPlaceholderText("Search packs/values...")
-        self.search_bar.textChanged.connect(self.filter_packs)
+        self.search_bar.textChanged.connect(self.schedule_search)
         controls.addWidget(self.search_bar)
 
+        self.search_index = SearchIndex([])
+        self.search_texts = []
+        self.search_rows = {}
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(lambda: self.filter_packs(self.search_bar.text()))
+
         self.toggle_widget = PriceToggle()
         self.toggle_widget.toggled.connect(self.toggle_price_mode)
         controls.addWidget(self.toggle_widget)
@@ -109,8 +109,8 @@ class ArcanePacksWidget(QWidget):
         self.layout.addLayout(controls)
 
         self.table = QTableWidget()
-        self.table.setColumnCount(3)
-        self.table.setHorizontalHeaderLabels(["Pack Name", "Cost", "Expected Value (p)"])
+        self.table.setColumnCount(6)
+        self.table.setHorizontalHeaderLabels(["Pack Name", "Cost", "Expected Value (p)", "Median (p)", "Std Dev (p)", "P(Loss)"])
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.table.setSortingEnabled(True)
         self.table.setEditTriggers(QTableWidget.NoEditTriggers)
@@ -121,63 +121,162 @@ class ArcanePacksWidget(QWidget):
         self.layout.addWidget(self.table)
         
         self.calc_thread = None
+        self.calc = None
         self.results = []
+        self.row_items = {}
         
+        price_events.arcane_price_updated.connect(self.on_arcane_price)
         QTimer.singleShot(500, self.calculate)
 
+    def mode(self):
+        return "cheapest" if self.show_cheapest else "avg"
+
     def toggle_price_mode(self, show_cheapest):
         self.show_cheapest = show_cheapest
-        self.calculate()
+        # Both modes' tier sums are already in memory, so switching does not touch the database.
+        if self.calc:
+            self.on_results_ready(self.calc)
+        else:
+            self.calculate()
 
     def calculate(self):
         if self.calc_thread and self.calc_thread.isRunning():
             return
         
-        mode = "cheapest" if self.show_cheapest else "avg"
-        self.calc_thread = EVThread(mode)
+        self.calc_thread = EVThread()
         self.calc_thread.result_ready.connect(self.on_results_ready)
+        self.calc_thread.price_fetched.connect(self.on_price_fetched)
+        self.calc_thread.prices_failed.connect(self.on_prices_failed)
         self.calc_thread.start()
         
-    def on_results_ready(self, results):
-        self.results = results
+    def on_results_ready(self, calc):
+        self.calc = calc
+        self.results = calc.results(self.mode())
         self.populate_table()
+        self.update_header()
+
+    def update_header(self):
+        missing = len(self.calc.unavailable) if self.calc else 0
+        self.header.setText("Arcane Packs Expected Value (Vosfor)" + (
+            f" - {missing} arcane prices could not be loaded, Calculate EVs tries again" if missing else ""))
+
+    def on_arcane_price(self, url_name, data_r0, data_max):
+        if not self.calc:
+            return
+        had_unavailable = bool(self.calc.unavailable)
+        self.update_results(self.calc.update_price(url_name, data_r0.get('avg'), data_r0.get('cheapest')))
+        if had_unavailable:
+            self.update_header()
+
+    def on_prices_failed(self, slugs):
+        if not self.calc:
+            return
+        self.update_results(self.calc.mark_failed(slugs))
+        self.update_header()
+
+    def update_results(self, affected):
+        for name in affected:
+            result = self.calc.pack_result(name, self.mode())
+            for i, r in enumerate(self.results):
+                if r['name'] == name:
+                    self.results[i] = result
+            items = self.row_items.get(name)
+            if items:
+                self.set_result_cells(items, result)
+            row = self.search_rows.get(name)
+            if row is not None:
+                self.search_texts[row] = self.search_text(result)
+                self.search_index = None
+        # The EVs are part of the search text, so a search in progress has to be run again.
+        if self.search_index is None and self.search_bar.text():
+            self.schedule_search(None)
+
+    def search_text(self, result):
+        # Packs can also be found by the arcanes they contain.
+        pack = self.calc.packs.get(result['name'], {})
+        arcanes = [slug.replace("_", " ") for slugs in pack.get('tiers', {}).values() for slug in slugs]
+        return " ".join([result['name'], str(result['cost']), f"{result['ev']:.1f}p"] + arcanes)
+
+    def on_price_fetched(self, slug, summary):
+        self.on_arcane_price(slug, {'avg': summary['avg_r0'], 'cheapest': summary['low_r0']}, {})
+
+    def set_result_cells(self, items, result):
+        ev_item, median_item, std_item, loss_item = items
+        # "~" marks an EV that still misses some arcane prices.
+        unavailable = result.get('unavailable')
+        prefix = "~" if result.get('pending') or unavailable else ""
+        ev_item.setText(f"{prefix}{result['ev']:.1f}p")
+        if unavailable:
+            ev_item.setToolTip("Price unavailable for " + ", ".join(s.replace("_", " ").title() for s in unavailable)
+                               + "; left out of the EV")
+        else:
+            ev_item.setToolTip("Some arcane prices are still loading" if result.get('pending') else "")
+
+        pct = result['percentiles']
+        median_item.setText(f"{result['median']:.1f}p")
+        median_item.setToolTip("  ".join(f"P{q}: {v:.1f}p" for q, v in sorted(pct.items())))
+        std_item.setText(f"{result['std']:.1f}p")
+        loss_item.setText(f"{result['p_loss'] * 100:.1f}%")
+        loss_item.setToolTip(f"Chance that the 3 arcanes are worth less than the pack cost ({result['cost']})")
 
     def populate_table(self):
         self.table.setSortingEnabled(False)
         self.table.setRowCount(len(self.results))
+        self.row_items = {}
+        self.search_texts = []
+        self.search_rows = {}
         for row, r in enumerate(self.results):
-            self.table.setItem(row, 0, QTableWidgetItem(r['name']))
+            name_item = QTableWidgetItem(r['name'])
+            name_item.setData(Qt.UserRole, row)
+            self.table.setItem(row, 0, name_item)
             self.table.setItem(row, 1, NumericTableWidgetItem(str(r['cost'])))
-            self.table.setItem(row, 2, NumericTableWidgetItem(f"{r['ev']:.1f}p"))
+            items = tuple(NumericTableWidgetItem() for _ in range(4))
+            self.set_result_cells(items, r)
+            self.row_items[r['name']] = items
+            for col, item in enumerate(items, 2):
+                self.table.setItem(row, col, item)
+
+            self.search_rows[r['name']] = row
+            self.search_texts.append(self.search_text(r))
+        self.search_index = SearchIndex(self.search_texts)
         self.table.sortItems(2, Qt.DescendingOrder)
         self.table.setSortingEnabled(True)
         self.filter_packs(self.search_bar.text())
 
+    def schedule_search(self, _text):
+        self.search_timer.start()
+
     def filter_packs(self, text):
-        text = text.lower()
+        if self.search_index is None:
+            # Rebuilt lazily: a batch of price updates changes many EVs before anyone searches.
+            self.search_index = SearchIndex(self.search_texts)
+        rows = self.search_index.search(text)
+        self.table.setUpdatesEnabled(False)
         for row in range(self.table.rowCount()):
-            visible = False
-            for col in range(self.table.columnCount()):
-                item = self.table.item(row, col)
-                if item and text in item.text().lower():
-                    visible = True
-                    break
+            item = self.table.item(row, 0)
+            visible = rows is None or (item is not None and item.data(Qt.UserRole) in rows)
             self.table.setRowHidden(row, not visible)
+        self.table.setUpdatesEnabled(True)
 
     def show_collection(self, index):
         pack_name = self.table.item(index.row(), 0).text()
-        popup = CollectionDetailsPopup(pack_name, self, mode="cheapest" if self.show_cheapest else "avg")
+        popup = CollectionDetailsPopup(pack_name, self, mode=self.mode(), calc=self.calc)
         popup.exec()
 
 class EVThread(QThread):
-    result_ready = Signal(list)
-
-    def __init__(self, mode="avg"):
-        super().__init__()
-        self.mode = mode
+    result_ready = Signal(object)
+    price_fetched = Signal(str, dict)
+    prices_failed = Signal(list)
 
     def run(self):
         from services.vosfor_calculator import VosforCalculator
         calc = VosforCalculator()
-        results = calc.calculate_all_packs(mode=self.mode)
-        self.result_ready.emit(results)
+        calc.load_prices()
+        missing = calc.pending | calc.stale
+        
+        # Show what the cache already knows, then fill in the rest; the widget applies each price
+        # on the GUI thread so the calculator is never modified from two threads.
+        self.result_ready.emit(calc)
+        failed = calc.refresh_prices(missing, on_price=self.price_fetched.emit)
+        if failed:
+            self.prices_failed.emit(failed)
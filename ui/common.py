@@ -1,5 +1,11 @@
 from PySide6.QtWidgets import QWidget, QHBoxLayout, QPushButton, QButtonGroup
-from PySide6.QtCore import Signal
+from PySide6.QtCore import QObject, Signal
+
+class PriceEvents(QObject):
+    """App-wide price notifications, so one tab can react to prices fetched by another."""
+    arcane_price_updated = Signal(str, dict, dict)
+
+price_events = PriceEvents()
 
 class PriceToggle(QWidget):
     toggled = Signal(bool)
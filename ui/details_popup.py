@@ -1,11 +1,18 @@
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem, QHeaderView, QCheckBox)
 from PySide6.QtCore import QThread, Signal
+from concurrent.futures import as_completed
 from api.warframe_market import WarframeMarketAPI
-from services.price_calculator import PriceCalculator
+from api.scheduler import request_pool
+from services.market_scanner import MarketScanner
+from services.metrics import metrics
+from services.price_pool import shared_price_pool
+from services.set_components import SetComponentsService
 import time
 
 class DetailsFetcher(QThread):
     data_ready = Signal(dict)
+    component_ready = Signal(dict)
+    components_done = Signal()
 
     def __init__(self, url_name, item_type):
         super().__init__()
@@ -14,11 +21,13 @@ class DetailsFetcher(QThread):
         self.api = WarframeMarketAPI()
         from data.database import Database
         self.db = Database()
+        self.scanner = MarketScanner(self.api, self.db, pricing_pool=shared_price_pool())
 
     def run(self):
         item = self.db.get_item_by_slug(self.url_name)
         if not item:
-             self.data_ready.emit({"orders_count": 0, "price": -1, "rank_prices": {}, "components": []})
+             self.data_ready.emit({"orders_count": 0, "price": -1, "price_low": -1, "rank_prices": {}, "rank_prices_low": {}})
+             self.components_done.emit()
              return
              
         item_id = item['id']
@@ -30,122 +39,62 @@ class DetailsFetcher(QThread):
             if cached_chk and cached_chk.get('max_rank'):
                 max_rank = cached_chk['max_rank']
         
-        orders = []
-        price = -1.0
-        price_low = -1.0
-        rank_prices = {}
-        rank_prices_low = {}
-        
-        hit = False
-        if is_arcane:
-            cached = self.db.get_arcane_price(item_id)
-            if cached and (time.time() - cached['timestamp'] < 3600):
-                price = cached['avg_r0']
-                price_low = cached['low_r0']
-                rank_prices = {
-                    max_rank: cached['avg_max']
-                }
-                rank_prices_low = {
-                    max_rank: cached['low_max']
-                }
-                hit = True
-        else:
-            cached = self.db.get_set_price(item_id)
-            if cached and (time.time() - cached['timestamp'] < 3600):
-                price = cached['avg']
-                price_low = cached['low']
-                hit = True
+        data = {"orders_count": 0, "price": -1.0, "price_low": -1.0, "rank_prices": {}, "rank_prices_low": {}}
+        try:
+            summary, from_cache = self.scanner.refresh(item_id, self.url_name, self.item_type, max_rank)
+        except Exception as e:
+            print(f"Error fetching details for {self.url_name}: {e}")
+            summary, from_cache = None, True
 
-        if not hit:
-            orders = self.api.get_orders(self.url_name)
-            price = PriceCalculator.calculate_price(orders, self.item_type, rank=0 if is_arcane else -1)
-            price_low = PriceCalculator.calculate_cheapest(orders, rank=0 if is_arcane else -1)
-            
+        if summary:
+            if not from_cache:
+                data["orders_count"] = summary.get("orders_count", 0)
             if is_arcane:
-                rank_prices_raw = PriceCalculator.calculate_rank_prices(orders, self.item_type)
-                detected_max_rank = 0
-                if orders:
-                    sell_orders = [o for o in orders if o.get("order_type") == "sell"]
-                    if sell_orders:
-                        detected_max_rank = max(o.get("mod_rank", 0) for o in sell_orders)
-                if detected_max_rank <= 0: detected_max_rank = max_rank
-                
-                avg_max = rank_prices_raw.get(detected_max_rank, -1)
-                low_max = PriceCalculator.calculate_cheapest(orders, rank=detected_max_rank)
-                
-                required_count = (detected_max_rank + 1) * (detected_max_rank + 2) // 2
-                flip_avg = (required_count * price) - avg_max if price > 0 and avg_max > 0 else 0
-                flip_low = (required_count * price_low) - low_max if price_low > 0 and low_max > 0 else 0
-                
-                self.db.save_arcane_price(item_id, detected_max_rank, price, avg_max, flip_avg, price_low, low_max, flip_low)
-                rank_prices = {detected_max_rank: avg_max}
-                rank_prices_low = {detected_max_rank: low_max}
+                data["price"] = summary['avg_r0']
+                data["price_low"] = summary['low_r0']
+                data["rank_prices"] = {summary['max_rank']: summary['avg_max']}
+                data["rank_prices_low"] = {summary['max_rank']: summary['low_max']}
             else:
-                self.db.save_set_price(item_id, price, price_low)
+                data["price"] = summary['avg']
+                data["price_low"] = summary['low']
 
-        # Handle components
-        component_prices = []
+        # Show the main price right away; set components stream in after it.
+        self.data_ready.emit(data)
+        
         if not is_arcane:
-            set_cached = self.db.get_set_price(item_id)
-            if set_cached:
-                parts = self.db.get_parts_prices(set_cached['id'])
-                if parts:
-                    for p in parts:
-                        component_prices.append({"name": p['name'], "price": p['avg'], "low": p['low']})
-            
-            if not component_prices:
-                items_in_set = self.api.get_item_details(self.url_name)
-                if items_in_set:
-                    # Determine set_id again
-                    set_cached = self.db.get_set_price(item_id)
-                    if not set_cached:
-                         orders_set = self.api.get_orders(self.url_name)
-                         p_set = PriceCalculator.calculate_price(orders_set, self.item_type)
-                         c_set = PriceCalculator.calculate_cheapest(orders_set)
-                         set_id = self.db.save_set_price(item_id, p_set, c_set)
-                    else:
-                         set_id = set_cached['id']
-                         
-                    for item_part in items_in_set:
-                        # Identifier could be a slug or an ID depending on API response format
-                        identifier = item_part.get("url_name") or item_part.get("slug")
-                        if not identifier: continue
-                        
-                        resolved = self.db.get_item_by_id(identifier)
-                        if not resolved:
-                            resolved = self.db.get_item_by_slug(identifier)
-                            
-                        if resolved:
-                            c_id = resolved['id']
-                            c_slug = resolved['url_name']
-                            c_name = resolved['item_name']
-                        else:
-                            # If not found in DB, rely on what we have, but it might be an ID
-                            c_id = identifier
-                            c_slug = identifier
-                            c_name = item_part.get("en", {}).get("item_name", identifier)
-
-                        # CRITICAL: Filter out the set itself to avoid duplicate pricing
-                        if c_id == item_id or c_slug == self.url_name: 
-                            continue
-
-                        c_orders = self.api.get_orders(c_slug)
-                        c_price = PriceCalculator.calculate_price(c_orders, "item")
-                        c_cheap = PriceCalculator.calculate_cheapest(c_orders)
-                        
-                        if resolved:
-                             self.db.save_part_price(set_id, c_id, c_price, c_cheap)
-                        
-                        component_prices.append({"name": c_name, "price": c_price, "low": c_cheap})
+            self.fetch_components(item_id)
+        self.components_done.emit()
 
-        self.data_ready.emit({
-            "orders_count": len(orders),
-            "price": price,
-            "price_low": price_low,
-            "rank_prices": rank_prices,
-            "rank_prices_low": rank_prices_low,
-            "components": component_prices
-        })
+    def fetch_components(self, item_id):
+        # Set composition is static and normally prefetched; only a brand-new set needs a details request.
+        # Parts missing from the catalog come back with an id of None; they are priced but not saved.
+        components = SetComponentsService(self.api, self.db).get_components(item_id, self.url_name, include_unknown=True)
+        cached_prices = self.db.get_latest_part_prices(c['id'] for c in components if c['id'])
+        
+        to_fetch = []
+        for order, c in enumerate(components):
+            cached = cached_prices.get(c['id'])
+            fresh = bool(cached) and time.time() - cached['timestamp'] < MarketScanner.CACHE_TTL
+            metrics.cache_check("details", bool(cached), fresh)
+            if fresh:
+                self.component_ready.emit({"order": order, "name": c['item_name'], "quantity": c['quantity'], "price": cached['avg'], "low": cached['low']})
+            else:
+                to_fetch.append((order, c))
+        
+        # All parts are requested at once through the shared pool; each row is sent as soon as it is priced.
+        pool = request_pool()
+        futures = {pool.submit(self.scanner.fetch_book, c['url_name'], 'part'): (order, c) for order, c in to_fetch}
+        for future in as_completed(futures):
+            order, c = futures[future]
+            try:
+                summary, orders = future.result()
+            except Exception as e:
+                print(f"Error fetching orders for {c['url_name']}: {e}")
+                continue
+            
+            if c['id']:
+                self.scanner.save(c['id'], 'part', summary, orders)
+            self.component_ready.emit({"order": order, "name": c['item_name'], "quantity": c['quantity'], "price": summary['avg'], "low": summary['low']})
 
 class DetailsPopup(QDialog):
     def __init__(self, item_name, url_name, item_type, show_cheapest=False, parent=None):
@@ -159,6 +108,8 @@ class DetailsPopup(QDialog):
         self.item_type = item_type
         self.show_cheapest = show_cheapest
         self.current_data = None
+        self.components = []
+        self.loading_components = item_type != "arcane"
         
         self.header = QLabel(f"Fetching data for {item_name}...")
         self.header.setObjectName("header")
@@ -176,6 +127,8 @@ class DetailsPopup(QDialog):
         
         self.fetcher = DetailsFetcher(url_name, item_type)
         self.fetcher.data_ready.connect(self.populate)
+        self.fetcher.component_ready.connect(self.add_component)
+        self.fetcher.components_done.connect(self.on_components_done)
         self.fetcher.start()
         
     def populate(self, data):
@@ -187,6 +140,15 @@ class DetailsPopup(QDialog):
             
         self.refresh_table()
         
+    def add_component(self, component):
+        self.components.append(component)
+        self.components.sort(key=lambda c: c['order'])
+        self.refresh_table()
+        
+    def on_components_done(self):
+        self.loading_components = False
+        self.refresh_table()
+        
     def refresh_table(self):
         if not self.current_data:
             return
@@ -205,17 +167,20 @@ class DetailsPopup(QDialog):
         for rank, price in sorted(r_prices.items()):
             rows.append((f"Rank {rank}", f"{price:.1f}p"))
             
-        components = data.get("components", [])
-        if components:
-            rows.append(("--- Components ---", ""))
+        components = self.components
+        if components or self.loading_components:
+            rows.append(("--- Components (loading...) ---" if self.loading_components else "--- Components ---", ""))
             total_parts_price = 0
             for c in components:
                 price_val = c.get('low', c['price']) if self.show_cheapest else c['price']
+                quantity = c.get('quantity', 1)
                 parts_label = c['name']
+                if quantity > 1:
+                    parts_label += f" x{quantity}"
                 if self.show_cheapest:
                     parts_label += " (Low)"
-                rows.append((parts_label, f"{price_val:.1f}p"))
-                total_parts_price += price_val
+                rows.append((parts_label, f"{price_val * quantity:.1f}p"))
+                total_parts_price += price_val * quantity
             rows.append(("Sum of Components", f"{total_parts_price:.1f}p"))
             
         self.table.setRowCount(len(rows))
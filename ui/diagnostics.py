@@ -0,0 +1,97 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QTableWidget, QTableWidgetItem, QHeaderView,
+                               QCheckBox, QPushButton, QFileDialog)
+from PySide6.QtCore import QTimer
+from data.database import Database
+from services.metrics import metrics
+
+
+def format_value(name, value):
+    if name.endswith("_seconds"):
+        return f"{value * 1000:.1f} ms"
+    if isinstance(value, float):
+        return f"{value:.1f}"
+    return str(value)
+
+
+class DiagnosticsDialog(QDialog):
+    """Live view of services.metrics: request latency, limiter waits, queues, cache and database timings."""
+
+    REFRESH_MS = 1000
+    COLUMNS = ["Metric", "Labels", "Count", "Avg", "p50", "p95", "p99"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Diagnostics")
+        self.resize(820, 560)
+        self.layout = QVBoxLayout(self)
+        self.layout.setContentsMargins(15, 15, 15, 15)
+        self.layout.setSpacing(10)
+
+        controls = QHBoxLayout()
+        self.enabled_box = QCheckBox("Collect metrics")
+        self.enabled_box.setChecked(metrics.enabled)
+        self.enabled_box.toggled.connect(self.set_enabled)
+        controls.addWidget(self.enabled_box)
+        controls.addStretch(1)
+
+        reset_btn = QPushButton("Reset")
+        reset_btn.clicked.connect(self.reset)
+        controls.addWidget(reset_btn)
+
+        export_btn = QPushButton("Export...")
+        export_btn.clicked.connect(self.export)
+        controls.addWidget(export_btn)
+        self.layout.addLayout(controls)
+
+        self.status = QLabel()
+        self.layout.addWidget(self.status)
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.layout.addWidget(self.table)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+        self.refresh()
+
+    def set_enabled(self, enabled):
+        metrics.enable(enabled)
+        Database().set_setting("metrics", "1" if enabled else "0")
+        self.refresh()
+
+    def reset(self):
+        metrics.reset()
+        self.refresh()
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export metrics", "tennoflip.prom", "Prometheus text (*.prom *.txt)")
+        if path:
+            metrics.write_textfile(path)
+
+    def refresh(self):
+        if not metrics.enabled:
+            self.status.setText("Metrics are off. Database timings start with connections opened after turning them on.")
+        elif metrics.server is not None:
+            host, port = metrics.server.server_address[:2]
+            self.status.setText(f"Also served at http://{host}:{port}/metrics")
+        else:
+            self.status.setText("")
+
+        rows = metrics.snapshot()
+        self.table.setRowCount(len(rows))
+        for row, (kind, name, labels, values) in enumerate(rows):
+            label_text = ", ".join(f"{k}={v}" for k, v in labels.items())
+            if kind == "histogram":
+                cells = [name, label_text, str(values["count"])] + [
+                    format_value(name, values[key]) for key in ("avg", "p50", "p95", "p99")]
+            else:
+                cells = [name, label_text, format_value(name, values["value"]), "", "", "", ""]
+            for column, text in enumerate(cells):
+                self.table.setItem(row, column, QTableWidgetItem(text))
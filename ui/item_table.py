@@ -1,172 +1,212 @@
-from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QTableWidget, QTableWidgetItem, QHeaderView, QPushButton)
-from PySide6.QtCore import Qt, QThread, Signal
+import time
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QTableView, QHeaderView, QPushButton)
+from PySide6.QtCore import QThread, Signal, QTimer
 from api.warframe_market import WarframeMarketAPI
 from data.database import Database
-from services.price_calculator import PriceCalculator
+from services.access_tracker import AccessTracker, CacheWarmer
+from services.catalog import load_catalog, filter_by_category
+from services.market_scanner import MarketScanner
+from services.metrics import metrics, SIZE_BUCKETS
+from services.price_pool import shared_price_pool
+from services.search_index import SearchIndex
+from services.set_components import SetComponentsService
 from ui.details_popup import DetailsPopup
-from ui.common import PriceToggle
-import time
+from ui.common import PriceToggle, price_events
+from ui.table_models import ItemTableModel, RowFilterProxyModel
 
 class DataLoader(QThread):
     data_loaded = Signal(list)
 
-    def __init__(self, item_type):
+    def __init__(self, item_type, db_file=None):
         super().__init__()
         self.item_type = item_type
         self.api = WarframeMarketAPI()
-        self.db = Database()
+        self.db = Database(db_file)
 
     def run(self):
-        items = self.db.get_all_items()
-        
-        if not items:
-            api_items = self.api.get_items()
-            self.db.save_items(api_items)
-            items = self.db.get_all_items()
-        
-        filtered = []
-        
-        for x in items:
-            tags = x.get('tags', [])
-            
-            if self.item_type == 'warframe':
-                if 'set' in tags and 'warframe' in tags:
-                    filtered.append(x)
-            
-            elif self.item_type == 'primary':
-                if 'set' in tags and 'primary' in tags and 'weapon' in tags:
-                     filtered.append(x)
-            elif self.item_type == 'secondary':
-                if 'set' in tags and 'secondary' in tags and 'weapon' in tags:
-                     filtered.append(x)
-            elif self.item_type == 'melee':
-                if 'set' in tags and 'melee' in tags and 'weapon' in tags:
-                     filtered.append(x)
-            
-            elif self.item_type == 'arcane':
-                if 'arcane_enhancement' in tags or 'arcane' in tags:
-                    filtered.append(x)
+        items = load_catalog(self.api, self.db)
+        self.data_loaded.emit(filter_by_category(items, self.item_type))
+
+class SetComponentsLoader(QThread):
+    """Fills the set_components table for the whole catalog in the background."""
+    finished_loading = Signal(dict)
+
+    def run(self):
+        db = Database()
+        api = WarframeMarketAPI()
+        catalog = load_catalog(api, db)
+        stats = SetComponentsService(api, db).prefetch_all(catalog)
+        self.finished_loading.emit(stats)
+
+def price_signal_data(item_type, summary):
+    """Splits a MarketScanner summary into the (rank 0, max rank) dicts the tables expect."""
+    if item_type == 'arcane':
+        data_r0 = {'avg': summary['avg_r0'], 'cheapest': summary['low_r0']}
+        data_rmax = {'avg': summary['avg_max'], 'cheapest': summary['low_max'], 'flip': summary['low_flip'], 'flip_avg': summary['avg_flip']}
+        return data_r0, data_rmax
+    return {'avg': summary['avg'], 'cheapest': summary['low']}, {}
 
-        if not filtered and items and self.item_type == 'unknown':
-             filtered = items 
-             
-        self.data_loaded.emit(filtered)
 
 class PriceFetcherThread(QThread):
     price_updated = Signal(str, dict, dict) 
 
-    def __init__(self):
+    def __init__(self, category, db_file=None):
         super().__init__()
+        self.job_name = f"gui:{category}"
+        self.job_id = None
+        self.incoming = []
         self.queue = []
         self.running = True
-        self.api = WarframeMarketAPI()
-        self.db = Database()
+        self.scanner = MarketScanner(db=Database(db_file), pricing_pool=shared_price_pool())
 
     def add_to_queue(self, items, force_refresh=False):
-        for item in items:
-            entry = item + (force_refresh,)
-            if entry not in self.queue:
-                self.queue.append(entry)
+        # Called from the GUI thread; the fetcher thread persists the batch on its next loop.
+        self.incoming.append((list(items), force_refresh))
+
+    def sync_queue(self):
+        """Checkpoints newly queued items into the scan job and reloads the remaining work from it.
+
+        Only needed when items were added; in between, the fetcher keeps self.queue in step with
+        the states it writes.
+        """
+        if not self.incoming:
+            return
+        db = self.scanner.db
+        while self.incoming:
+            items, force_refresh = self.incoming.pop(0)
+            if self.job_id is None:
+                self.job_id = db.create_scan_job(self.job_name)
+            db.add_scan_job_items(self.job_id, items, force_refresh)
+        self.load_queue()
+
+    def load_queue(self):
+        # Failed items keep waiting out their retry delay across reloads.
+        due = {entry['item_id']: entry['due'] for entry in self.queue if 'due' in entry}
+        self.queue = self.scanner.db.get_scan_job_items(self.job_id, MarketScanner.MAX_RETRIES)
+        for entry in self.queue:
+            if entry['item_id'] in due and entry['retries']:
+                entry['due'] = due[entry['item_id']]
+        self.queue_changed()
+
+    def queue_changed(self):
+        metrics.set("queue_depth", len(self.queue), queue=self.job_name)
+        if not self.queue and self.job_id is not None:
+            self.scanner.finish_job(self.job_id)
+            self.job_id = None
+
+    def next_entry(self):
+        """The first queued item that isn't waiting to be retried, or None."""
+        now = time.time()
+        for i, entry in enumerate(self.queue):
+            if entry.get('due', 0) <= now:
+                return i, entry
+        return None
 
     def run(self):
+        # Pick up whatever an earlier session left unfinished, including the items that failed.
+        job = self.scanner.db.get_open_scan_job(self.job_name)
+        if job:
+            self.job_id = job['id']
+            self.scanner.db.retry_failed_scan_items(self.job_id)
+            self.load_queue()
+
         while self.running:
-            if not self.queue:
+            self.sync_queue()
+            found = self.next_entry()
+            if found is None:
                 self.msleep(100)
                 continue
             
-            item_id, url_name, item_type, max_rank, force_refresh = self.queue.pop(0)
-            is_arcane = (item_type == 'arcane')
-            target_max_rank = max_rank
-            
-            db_max_rank = target_max_rank
-            if is_arcane and (db_max_rank <= 0 or db_max_rank > 5):
-                db_max_rank = 5
-                
-            cached_arcane = None
-            cached_set = None
-            
-            if is_arcane:
-                cached_arcane = self.db.get_arcane_price(item_id)
-            else:
-                cached_set = self.db.get_set_price(item_id)
-            
-            hit = False
-            if not force_refresh:
-                if is_arcane and cached_arcane and (time.time() - cached_arcane['timestamp'] < 3600):
-                    hit = True
-                elif not is_arcane and cached_set and (time.time() - cached_set['timestamp'] < 3600):
-                    hit = True
-            
-            if hit:
-                if is_arcane:
-                    data_r0 = {'avg': cached_arcane['avg_r0'], 'cheapest': cached_arcane['low_r0']}
-                    data_rmax = {'avg': cached_arcane['avg_max'], 'cheapest': cached_arcane['low_max'], 'flip': cached_arcane['low_flip'], 'flip_avg': cached_arcane['avg_flip']}
-                    self.price_updated.emit(url_name, data_r0, data_rmax)
-                else:
-                    data_price = {'avg': cached_set['avg'], 'cheapest': cached_set['low']}
-                    self.price_updated.emit(url_name, data_price, {})
+            i, entry = found
+            item_id, url_name, item_type = entry['item_id'], entry['url_name'], entry['item_type']
+            try:
+                summary, _ = self.scanner.refresh(item_id, url_name, item_type, entry['max_rank'],
+                                                  entry['force_refresh'], fresh_since=entry['queued'])
+            except Exception as e:
+                print(f"Error fetching prices for {url_name}: {e}")
+                self.scanner.db.set_scan_item_state(self.job_id, item_id, "failed", str(e))
+                # Move on to the other items; this one goes to the back and waits before its retry.
+                del self.queue[i]
+                entry['retries'] += 1
+                if entry['retries'] < MarketScanner.MAX_RETRIES:
+                    entry['due'] = time.time() + MarketScanner.retry_delay(entry['retries'] - 1)
+                    self.queue.append(entry)
+                self.queue_changed()
                 continue
 
-            orders = self.api.get_orders(url_name)
+            self.scanner.db.set_scan_item_state(self.job_id, item_id, "done")
+            del self.queue[i]
+            self.queue_changed()
             
-            if is_arcane:
-                sell_orders = [o for o in orders if o.get("order_type") == "sell"]
-                detected_rank = target_max_rank
-                if sell_orders:
-                    detected_rank = max(o.get("mod_rank", 0) for o in sell_orders)
-                if detected_rank <= 0: detected_rank = 5
-                
-                target_max_rank = detected_rank
-
-                avg_r0 = PriceCalculator.calculate_price(orders, "arcane", rank=0)
-                cheap_r0 = PriceCalculator.calculate_cheapest(orders, rank=0)
-                
-                avg_rmax = PriceCalculator.calculate_price(orders, "arcane", rank=target_max_rank)
-                cheap_rmax = PriceCalculator.calculate_cheapest(orders, rank=target_max_rank)
-                
-                required_count = (target_max_rank + 1) * (target_max_rank + 2) // 2
-                
-                flip_cheap = 0
-                if cheap_r0 > 0 and cheap_rmax > 0:
-                    flip_cheap = (required_count * cheap_r0) - cheap_rmax
-                
-                flip_avg = 0
-                if avg_r0 > 0 and avg_rmax > 0:
-                    flip_avg = (required_count * avg_r0) - avg_rmax
-                
-                self.db.save_arcane_price(item_id, target_max_rank, avg_r0, avg_rmax, flip_avg, cheap_r0, cheap_rmax, flip_cheap)
-                
-                self.price_updated.emit(url_name, 
-                    {'avg': avg_r0, 'cheapest': cheap_r0}, 
-                    {'avg': avg_rmax, 'cheapest': cheap_rmax, 'flip': flip_cheap, 'flip_avg': flip_avg}
-                )
-            else:
-                avg = PriceCalculator.calculate_price(orders, "item")
-                cheap = PriceCalculator.calculate_cheapest(orders)
-                self.db.save_set_price(item_id, avg, cheap)
-                self.price_updated.emit(url_name, {'avg': avg, 'cheapest': cheap}, {})
+            self.price_updated.emit(url_name, *price_signal_data(item_type, summary))
 
     def stop(self):
         self.running = False
 
 
-class NumericTableWidgetItem(QTableWidgetItem):
-    def __lt__(self, other):
+class OrderStreamThread(QThread):
+    """Keeps prices live from an order event stream (see services.order_stream)."""
+    price_updated = Signal(str, dict, dict)
+
+    def __init__(self, url):
+        super().__init__()
+        self.url = url
+        self.subscriber = None
+
+    def run(self):
+        from services.order_stream import OrderStreamSubscriber, open_transport
         try:
-            t1 = self.text().replace('p', '').strip()
-            t2 = other.text().replace('p', '').strip()
-            f1 = float(t1) if t1 and t1 != '...' else -1.0
-            f2 = float(t2) if t2 and t2 != '...' else -1.0
-            return f1 < f2
-        except ValueError:
-            return super().__lt__(other)
+            self.subscriber = OrderStreamSubscriber(
+                open_transport(self.url),
+                on_update=lambda slug, item_type, summary: self.price_updated.emit(slug, *price_signal_data(item_type, summary)))
+            self.subscriber.run()
+        except Exception as e:
+            print(f"Order stream {self.url} stopped: {e}")
+
+    def stop(self):
+        if self.subscriber:
+            self.subscriber.stop()
+
 
+class CacheWarmThread(QThread):
+    """One predictive warming pass over the most looked-at items (see services.access_tracker)."""
+    price_updated = Signal(str, dict, dict)
+
+    def __init__(self, budget=CacheWarmer.BUDGET, db_file=None):
+        super().__init__()
+        self.budget = budget
+        self.db_file = db_file
+
+    def run(self):
+        scanner = MarketScanner(db=Database(self.db_file), pricing_pool=shared_price_pool())
+
+        def on_result(item, summary, from_cache):
+            # Parts only matter to the details popup, which reads them from the cache.
+            if item[2] != 'part':
+                self.price_updated.emit(item[1], *price_signal_data(item[2], summary))
+
+        try:
+            stats = CacheWarmer(scanner, budget=self.budget).warm(on_result)
+        except Exception as e:
+            print(f"Cache warming failed: {e}")
+            return
+        if stats:
+            print(f"Warmed {stats['fetched']} prices ({stats['failed']} failed) in {stats['elapsed']:.1f}s")
 
 
 class ItemTableWidget(QWidget):
-    def __init__(self, category):
+    UPDATE_INTERVAL_MS = 33
+    SEARCH_DEBOUNCE_MS = 120
+    # Rows count as looked at once the table has stayed still this long.
+    VISIBLE_ACCESS_DELAY_MS = 2000
+    # A search counts as looking for its results once it narrows the table down to this many rows.
+    SEARCH_ACCESS_ROWS = 5
+
+    def __init__(self, category, db_file=None):
         super().__init__()
         self.category = category
+        # Another cache.db than the app's, for benchmarks; every thread opens its own connection to it.
+        self.db_file = db_file
         self.show_cheapest = False
         self.layout = QVBoxLayout(self)
         self.layout.setContentsMargins(12, 12, 12, 12)
@@ -177,9 +217,15 @@ class ItemTableWidget(QWidget):
         
         self.search_bar = QLineEdit()
         self.search_bar.setPlaceholderText("Search...")
-        self.search_bar.textChanged.connect(self.filter_items)
+        self.search_bar.textChanged.connect(self.schedule_search)
         controls_layout.addWidget(self.search_bar)
         
+        self.search_index = SearchIndex([])
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.run_search)
+        
         self.toggle_widget = PriceToggle()
         self.toggle_widget.toggled.connect(self.toggle_price_mode)
         controls_layout.addWidget(self.toggle_widget)
@@ -195,77 +241,55 @@ class ItemTableWidget(QWidget):
         
         self.layout.addLayout(controls_layout)
         
-        self.table = QTableWidget()
-        self.db = Database()
+        self.db = Database(db_file)
+        self.model = ItemTableModel(self.category, self)
+        self.proxy = RowFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
         
-        if self.category == 'arcane':
-            self.table.setColumnCount(4)
-            self.table.setHorizontalHeaderLabels(["Item Name", "Price (R0)", "Price (Max)", "Flip Profit"])
-        else:
-            self.table.setColumnCount(2)
-            self.table.setHorizontalHeaderLabels(["Item Name", "Price"])
-            
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setEditTriggers(QTableView.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableView.SelectRows)
         self.table.setSortingEnabled(True)
         self.table.doubleClicked.connect(self.open_details)
         self.table.verticalHeader().setVisible(False)
         self.table.verticalHeader().setDefaultSectionSize(30)
         self.table.setShowGrid(True)
         self.layout.addWidget(self.table)
+
+        self.access = AccessTracker(self.db)
+        self.visible_timer = QTimer(self)
+        self.visible_timer.setSingleShot(True)
+        self.visible_timer.setInterval(self.VISIBLE_ACCESS_DELAY_MS)
+        self.visible_timer.timeout.connect(self.record_visible_rows)
+        self.table.verticalScrollBar().valueChanged.connect(self.visible_timer.start)
         
         self.items = []
         self.full_items = []
         
-        self.price_fetcher = PriceFetcherThread()
+        self.pending_updates = {}
+        self.update_timer = QTimer(self)
+        self.update_timer.setSingleShot(True)
+        self.update_timer.setInterval(self.UPDATE_INTERVAL_MS)
+        self.update_timer.timeout.connect(self.flush_price_updates)
+        
+        self.price_fetcher = PriceFetcherThread(self.category, db_file)
         self.price_fetcher.price_updated.connect(self.update_price_cell)
-        self.price_fetcher.start()
 
+        # Let the page paint before the loader and fetcher threads spin up.
+        QTimer.singleShot(0, self.start_background_work)
+
+    def start_background_work(self):
+        self.price_fetcher.start()
         self.load_data()
 
     def toggle_price_mode(self, show_cheapest):
         self.show_cheapest = show_cheapest
-        self.refresh_table_values()
-
-    def refresh_table_values(self):
-        for row in range(self.table.rowCount()):
-            name_item = self.table.item(row, 0)
-            if not name_item: continue
-            
-            p1_item = self.table.item(row, 1)
-            p1_avg = name_item.data(Qt.UserRole + 2)
-            p1_cheap = name_item.data(Qt.UserRole + 3)
-            
-            val1 = p1_cheap if self.show_cheapest else p1_avg
-            if val1 and val1 > 0:
-                p1_item.setText(f"{val1:.1f}p")
-            
-            if self.category == 'arcane':
-                p2_item = self.table.item(row, 2)
-                p2_avg = name_item.data(Qt.UserRole + 4)
-                p2_cheap = name_item.data(Qt.UserRole + 5)
-                
-                val2 = p2_cheap if self.show_cheapest else p2_avg
-                if val2 and val2 > 0:
-                    p2_item.setText(f"{val2:.1f}p")
-                
-                flip_item = self.table.item(row, 3)
-                flip_val_cheap = name_item.data(Qt.UserRole + 6)
-                flip_val_avg = name_item.data(Qt.UserRole + 7)
-                
-                flip_val = flip_val_cheap if self.show_cheapest else flip_val_avg
-                
-                if flip_val is not None:
-                    flip_item.setText(f"{flip_val:.1f}p")
-                    if flip_val > 0:
-                        flip_item.setForeground(Qt.green)
-                    elif flip_val < 0:
-                        flip_item.setForeground(Qt.red)
-                    else:
-                         flip_item.setForeground(Qt.gray)
+        self.model.set_show_cheapest(show_cheapest)
 
     def load_data(self):
-        self.loader = DataLoader(self.category)
+        self.loader = DataLoader(self.category, self.db_file)
         self.loader.data_loaded.connect(self.on_data_loaded)
         self.loader.start()
 
@@ -275,104 +299,89 @@ class ItemTableWidget(QWidget):
         self.populate_table()
 
     def populate_table(self):
-        self.table.setSortingEnabled(False)
-        self.table.setRowCount(0)
-        self.table.setRowCount(len(self.items))
-        
-        is_arcane = (self.category == 'arcane')
-        
-        for row, item in enumerate(self.items):
-            url_name = item['url_name']
-            item_id = item['id']
-            name_item = QTableWidgetItem(item['item_name'])
-            name_item.setData(Qt.UserRole, url_name) 
-            name_item.setData(Qt.UserRole + 10, item_id) # Store internal ID
-            
-            p1_avg, p1_cheap = -1.0, -1.0
-            p2_avg, p2_cheap, f_cheap, f_avg = -1.0, -1.0, 0.0, 0.0
-            
-            max_rank = 5 # Default
-            
-            if is_arcane:
-                cached_arcane = self.db.get_arcane_price(item_id)
-                if cached_arcane:
-                    p1_avg = cached_arcane['avg_r0']
-                    p1_cheap = cached_arcane['low_r0']
-                    p2_avg = cached_arcane['avg_max']
-                    p2_cheap = cached_arcane['low_max']
-                    f_cheap = cached_arcane['low_flip']
-                    f_avg = cached_arcane['avg_flip']
-                    if cached_arcane.get('max_rank'):
-                        max_rank = cached_arcane['max_rank']
-            else:
-                cached_set = self.db.get_set_price(item_id)
-                if cached_set:
-                    p1_avg = cached_set['avg']
-                    p1_cheap = cached_set['low']
-            
-            name_item.setData(Qt.UserRole + 1, max_rank)
-            
-            name_item.setData(Qt.UserRole + 2, p1_avg)
-            name_item.setData(Qt.UserRole + 3, p1_cheap)
-            name_item.setData(Qt.UserRole + 4, p2_avg)
-            name_item.setData(Qt.UserRole + 5, p2_cheap)
-            name_item.setData(Qt.UserRole + 6, f_cheap)
-            name_item.setData(Qt.UserRole + 7, f_avg)
-            
-            price_item = NumericTableWidgetItem("...") 
-            self.table.setItem(row, 0, name_item)
-            self.table.setItem(row, 1, price_item)
-            
-            if is_arcane:
-                self.table.setItem(row, 2, NumericTableWidgetItem("..."))
-                self.table.setItem(row, 3, NumericTableWidgetItem("..."))
+        with metrics.timer("ui_populate_seconds", category=self.category):
+            self._populate_table()
 
-        self.refresh_table_values()
-        self.table.setSortingEnabled(True)
+    def _populate_table(self):
+        if self.category == 'arcane':
+            cached_prices = self.db.get_latest_arcane_prices()
+        else:
+            cached_prices = self.db.get_latest_set_prices()
+        
+        self.pending_updates = {}
+        self.model.set_items(self.items, cached_prices)
+        self.search_index = SearchIndex(self.model.names)
         if self.search_bar.text():
             self.filter_items(self.search_bar.text())
+        self.visible_timer.start()
+
+    def schedule_search(self, _text):
+        # Restarting the timer on every keystroke means only the last one triggers a lookup.
+        self.search_timer.start()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.visible_timer.start()
+
+    def run_search(self):
+        self.filter_items(self.search_bar.text())
+        if 0 < self.proxy.rowCount() <= self.SEARCH_ACCESS_ROWS:
+            self.record_access(range(self.proxy.rowCount()), "search")
+        self.visible_timer.start()
+
+    def record_access(self, proxy_rows, kind):
+        items = []
+        for proxy_row in proxy_rows:
+            info = self.model.row_info(self.proxy.mapToSource(self.proxy.index(proxy_row, 0)).row())
+            items.append((info['id'], info['url_name'], self.category))
+        self.access.record(items, kind)
+
+    def record_visible_rows(self):
+        if not self.isVisible() or not self.proxy.rowCount():
+            return
+        first = self.table.rowAt(0)
+        last = self.table.rowAt(self.table.viewport().height() - 1)
+        if first < 0:
+            return
+        if last < 0:
+            last = self.proxy.rowCount() - 1
+        self.record_access(range(first, last + 1), "visible")
 
     def filter_items(self, text):
-        text = text.lower()
-        self.items = [i for i in self.full_items if text in i['item_name'].lower()]
-        
-        for row in range(self.table.rowCount()):
-            item = self.table.item(row, 0)
-            if item:
-                self.table.setRowHidden(row, text not in item.text().lower())
+        rows = self.search_index.search(text)
+        if rows is None:
+            self.items = self.full_items
+        else:
+            self.items = [self.full_items[row] for row in sorted(rows)]
+        self.proxy.set_visible_rows(rows)
 
     def fetch_visible_prices(self):
         requests = []
-        for row in range(self.table.rowCount()):
-            if not self.table.isRowHidden(row):
-                item = self.table.item(row, 0)
-                if item:
-                    url_name = item.data(Qt.UserRole)
-                    item_id = item.data(Qt.UserRole + 10)
-                    max_rank = item.data(Qt.UserRole + 1)
-                    requests.append((item_id, url_name, self.category, max_rank))
+        for proxy_row in range(self.proxy.rowCount()):
+            row = self.proxy.mapToSource(self.proxy.index(proxy_row, 0)).row()
+            info = self.model.row_info(row)
+            requests.append((info['id'], info['url_name'], self.category, info['max_rank']))
         self.price_fetcher.add_to_queue(requests, force_refresh=True)
         
     def update_price_cell(self, url_name, data_r0, data_max):
-        for row in range(self.table.rowCount()):
-            item = self.table.item(row, 0)
-            if item and item.data(Qt.UserRole) == url_name:
-                item.setData(Qt.UserRole + 2, data_r0.get('avg', -1.0))
-                item.setData(Qt.UserRole + 3, data_r0.get('cheapest', -1.0))
-                
-                if self.category == 'arcane' and data_max:
-                    item.setData(Qt.UserRole + 4, data_max.get('avg', -1.0))
-                    item.setData(Qt.UserRole + 5, data_max.get('cheapest', -1.0))
-                    item.setData(Qt.UserRole + 6, data_max.get('flip', 0.0))
-                    item.setData(Qt.UserRole + 7, data_max.get('flip_avg', 0.0))
-                
-                self.refresh_table_values()
-                break
+        # Updates arrive one signal per item; buffer them and apply them together once per frame.
+        self.pending_updates[url_name] = (data_r0, data_max)
+        if not self.update_timer.isActive():
+            self.update_timer.start()
+
+    def flush_price_updates(self):
+        updates, self.pending_updates = self.pending_updates, {}
+        if updates:
+            metrics.observe("ui_update_batch_size", len(updates), SIZE_BUCKETS, category=self.category)
+            with metrics.timer("ui_flush_seconds", category=self.category):
+                self.model.update_prices(updates)
+            if self.category == 'arcane':
+                for url_name, (data_r0, data_max) in updates.items():
+                    price_events.arcane_price_updated.emit(url_name, data_r0, data_max)
                 
     def open_details(self, index):
-        row = index.row()
-        item_name = self.table.item(row, 0).text()
-        url_name = self.table.item(row, 0).data(Qt.UserRole)
+        info = self.model.row_info(self.proxy.mapToSource(index).row())
+        self.access.record([(info['id'], info['url_name'], self.category)], "popup")
         
-        popup = DetailsPopup(item_name, url_name, self.category, self.show_cheapest, self)
+        popup = DetailsPopup(info['item_name'], info['url_name'], self.category, self.show_cheapest, self)
         popup.exec()
@@ -1,13 +1,35 @@
 from PySide6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QListWidget, QStackedWidget, QPushButton
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer
 from PySide6.QtGui import QIcon
-from ui.item_table import ItemTableWidget
-from ui.arcane_packs import ArcanePacksWidget
 from ui.styles import get_styles
 from data.database import Database
+from services.metrics import metrics
+from services.access_tracker import CacheWarmer
+from services.price_pool import configure_price_pool
 import os
 
+def _item_page(category):
+    def build():
+        from ui.item_table import ItemTableWidget
+        return ItemTableWidget(category)
+    return build
+
+def _packs_page():
+    from ui.arcane_packs import ArcanePacksWidget
+    return ArcanePacksWidget()
+
 class MainWindow(QMainWindow):
+    PAGES = [
+        ("Warframes", _item_page("warframe")),
+        ("Primary", _item_page("primary")),
+        ("Secondary", _item_page("secondary")),
+        ("Melee", _item_page("melee")),
+        ("Arcanes", _item_page("arcane")),
+        ("Arcane Packs", _packs_page),
+    ]
+    # How often the most looked-at prices are topped up while the app is idle.
+    WARM_INTERVAL_MS = 5 * 60 * 1000
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Tenno Flip")
@@ -20,6 +42,19 @@ class MainWindow(QMainWindow):
         
         self.db = Database()
         self.current_theme = self.db.get_setting("theme", "dark")
+        if self.db.get_setting("metrics") == "1":
+            metrics.enable()
+        metrics_port = self.db.get_setting("metrics_port")
+        if metrics.enabled and metrics_port:
+            try:
+                metrics.serve(int(metrics_port))
+            except (OSError, ValueError) as e:
+                print(f"Could not serve metrics on port {metrics_port}: {e}")
+        # Worker processes for decoding and pricing order books, off the GUI's GIL; 0 or unset keeps it in-thread.
+        try:
+            configure_price_pool(int(self.db.get_setting("pricing_processes", "0")))
+        except ValueError:
+            print("Ignoring pricing_processes: not a number")
         self.setStyleSheet(get_styles(self.current_theme))
         
         main_widget = QWidget()
@@ -42,7 +77,7 @@ class MainWindow(QMainWindow):
         self.sidebar.setFixedHeight(41)
         self.sidebar.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.sidebar.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.sidebar.addItems(["Warframes", "Primary", "Secondary", "Melee", "Arcanes", "Arcane Packs"])
+        self.sidebar.addItems([title for title, _ in self.PAGES])
         self.sidebar.currentRowChanged.connect(self.display_section)
         top_bar_layout.addWidget(self.sidebar, 1)
         
@@ -52,31 +87,120 @@ class MainWindow(QMainWindow):
         self.theme_btn.setFixedSize(32, 32)
         self.theme_btn.clicked.connect(self.toggle_theme)
         top_bar_layout.addWidget(self.theme_btn)
+
+        self.diagnostics_btn = QPushButton("📊")
+        self.diagnostics_btn.setObjectName("theme_toggle")
+        self.diagnostics_btn.setFixedSize(32, 32)
+        self.diagnostics_btn.setToolTip("Diagnostics")
+        self.diagnostics_btn.clicked.connect(self.open_diagnostics)
+        top_bar_layout.addWidget(self.diagnostics_btn)
         
         main_layout.addWidget(top_bar_widget)
         
         self.content_stack = QStackedWidget()
         main_layout.addWidget(self.content_stack)
         
-        self.warframe_page = ItemTableWidget("warframe")
-        self.primary_page = ItemTableWidget("primary")
-        self.secondary_page = ItemTableWidget("secondary")
-        self.melee_page = ItemTableWidget("melee")
-        self.arcanes_page = ItemTableWidget("arcane")
-        self.packs_page = ArcanePacksWidget()
-        
-        self.content_stack.addWidget(self.warframe_page)
-        self.content_stack.addWidget(self.primary_page)
-        self.content_stack.addWidget(self.secondary_page)
-        self.content_stack.addWidget(self.melee_page)
-        self.content_stack.addWidget(self.arcanes_page)
-        self.content_stack.addWidget(self.packs_page) 
+        # Pages are built the first time their tab is selected, so the window can paint before
+        # any table, database connection or fetcher thread exists.
+        self.pages = {}
+        for _ in self.PAGES:
+            self.content_stack.addWidget(QWidget())
         
+        # Select the first tab without building it; it is built right after the first paint.
+        self.first_paint_done = False
+        self.sidebar.blockSignals(True)
         self.sidebar.setCurrentRow(0)
+        self.sidebar.blockSignals(False)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.first_paint_done:
+            self.first_paint_done = True
+            QTimer.singleShot(0, lambda: self.display_section(self.sidebar.currentRow()))
+            QTimer.singleShot(0, self.start_background_jobs)
+
+    def start_background_jobs(self):
+        from ui.item_table import SetComponentsLoader
+        self.components_loader = SetComponentsLoader()
+        self.components_loader.start()
+
+        # Optional live prices, e.g. tcp://127.0.0.1:8765 for tools/fake_order_stream.py.
+        self.order_stream = None
+        stream_url = self.db.get_setting("order_stream")
+        if stream_url:
+            from ui.item_table import OrderStreamThread
+            self.order_stream = OrderStreamThread(stream_url)
+            self.order_stream.price_updated.connect(self.on_background_price)
+            self.order_stream.start()
+
+        # Refresh the prices of the items looked at most, now and whenever the app is idle.
+        self.warm_thread = None
+        self.warm_timer = QTimer(self)
+        self.warm_timer.setInterval(self.WARM_INTERVAL_MS)
+        self.warm_timer.timeout.connect(self.warm_cache)
+        self.warm_timer.start()
+        self.warm_cache()
+
+    def warm_cache(self):
+        try:
+            budget = int(self.db.get_setting("warm_budget", CacheWarmer.BUDGET))
+        except ValueError:
+            budget = CacheWarmer.BUDGET
+        if budget <= 0 or (self.warm_thread and self.warm_thread.isRunning()):
+            return
+        # Only when no tab is fetching prices for the user.
+        for page in self.pages.values():
+            fetcher = getattr(page, "price_fetcher", None)
+            if fetcher and (fetcher.queue or fetcher.incoming):
+                return
+        from ui.item_table import CacheWarmThread
+        self.warm_thread = CacheWarmThread(budget)
+        self.warm_thread.price_updated.connect(self.on_background_price)
+        self.warm_thread.start()
+
+    def on_background_price(self, url_name, data_r0, data_max):
+        arcane_page = None
+        for page in self.pages.values():
+            if hasattr(page, "update_price_cell"):
+                page.update_price_cell(url_name, data_r0, data_max)
+                if getattr(page, "category", None) == "arcane":
+                    arcane_page = page
+        # The Arcanes tab re-broadcasts its updates to the packs page; do it here while it isn't built.
+        if data_max and arcane_page is None:
+            from ui.common import price_events
+            price_events.arcane_price_updated.emit(url_name, data_r0, data_max)
+
+    def closeEvent(self, event):
+        if getattr(self, "order_stream", None):
+            self.order_stream.stop()
+            self.order_stream.wait(2000)
+        if getattr(self, "warm_thread", None):
+            self.warm_thread.wait(2000)
+        super().closeEvent(event)
+
+    def ensure_page(self, index):
+        page = self.pages.get(index)
+        if page is None:
+            page = self.PAGES[index][1]()
+            self.pages[index] = page
+            placeholder = self.content_stack.widget(index)
+            self.content_stack.insertWidget(index, page)
+            self.content_stack.removeWidget(placeholder)
+            placeholder.deleteLater()
+        return page
+
+    def build_all_pages(self):
+        for index in range(len(self.PAGES)):
+            self.ensure_page(index)
 
     def display_section(self, index):
+        self.ensure_page(index)
         self.content_stack.setCurrentIndex(index)
 
+    def open_diagnostics(self):
+        from ui.diagnostics import DiagnosticsDialog
+        DiagnosticsDialog(self).exec()
+
     def toggle_theme(self):
         if self.current_theme == "dark":
             self.current_theme = "light"
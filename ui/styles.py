@@ -51,7 +51,7 @@ def get_styles(theme="dark"):
         background-color: transparent;
     }}
     
-    QTableWidget {{
+    QTableWidget, QTableView {{
         background-color: {colors['widget_bg']};
         border: 1px solid {colors['border']};
         gridline-color: {colors['border']};
@@ -102,7 +102,7 @@ def get_styles(theme="dark"):
         font-weight: bold;
     }}
 
-    QTableWidget::item:selected {{
+    QTableWidget::item:selected, QTableView::item:selected {{
         background-color: {colors['item_selected']};
         color: {colors['text_header']};
     }}
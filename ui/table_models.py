@@ -0,0 +1,160 @@
+from array import array
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from PySide6.QtGui import QColor
+
+SortRole = Qt.UserRole + 1
+
+
+class ItemTableModel(QAbstractTableModel):
+    """Column store behind the set and arcane tables.
+
+    Prices live in flat `array('d')` columns indexed by source row, so the proxy can sort on
+    raw numbers and an update only touches the rows it changed.
+    """
+
+    PRICE_FIELDS = ("avg_r0", "low_r0", "avg_max", "low_max", "avg_flip", "low_flip")
+
+    def __init__(self, category, parent=None):
+        super().__init__(parent)
+        self.category = category
+        self.is_arcane = (category == 'arcane')
+        self.show_cheapest = False
+
+        if self.is_arcane:
+            self.headers = ["Item Name", "Price (R0)", "Price (Max)", "Flip Profit"]
+        else:
+            self.headers = ["Item Name", "Price"]
+
+        self.clear()
+
+    def clear(self):
+        self.ids = []
+        self.url_names = []
+        self.names = []
+        self.max_ranks = array('b')
+        self.prices = {field: array('d') for field in self.PRICE_FIELDS}
+        self.row_of = {}
+
+    def set_items(self, items, cached_prices):
+        """Replaces the table content. `cached_prices` maps item id -> cached price row (arcanes or sets)."""
+        self.beginResetModel()
+        self.clear()
+        for row, item in enumerate(items):
+            self.ids.append(item['id'])
+            self.url_names.append(item['url_name'])
+            self.names.append(item['item_name'])
+            self.row_of[item['url_name']] = row
+
+            cached = cached_prices.get(item['id'])
+            values = self._values_from_cache(cached)
+            max_rank = 5
+            if self.is_arcane and cached and cached.get('max_rank'):
+                max_rank = cached['max_rank']
+            self.max_ranks.append(max_rank)
+            for field in self.PRICE_FIELDS:
+                self.prices[field].append(values[field])
+        self.endResetModel()
+
+    def _values_from_cache(self, cached):
+        values = {"avg_r0": -1.0, "low_r0": -1.0, "avg_max": -1.0, "low_max": -1.0, "avg_flip": 0.0, "low_flip": 0.0}
+        if not cached:
+            return values
+        if self.is_arcane:
+            for field in self.PRICE_FIELDS:
+                values[field] = cached[field] if cached[field] is not None else values[field]
+        else:
+            values["avg_r0"] = cached['avg'] if cached['avg'] is not None else -1.0
+            values["low_r0"] = cached['low'] if cached['low'] is not None else -1.0
+        return values
+
+    def update_prices(self, updates):
+        """Applies a batch of price_updated payloads: url_name -> (data_r0, data_max)."""
+        last_col = self.columnCount() - 1
+        for url_name, (data_r0, data_max) in updates.items():
+            row = self.row_of.get(url_name)
+            if row is None:
+                continue
+
+            self.prices["avg_r0"][row] = data_r0.get('avg', -1.0)
+            self.prices["low_r0"][row] = data_r0.get('cheapest', -1.0)
+            if self.is_arcane and data_max:
+                self.prices["avg_max"][row] = data_max.get('avg', -1.0)
+                self.prices["low_max"][row] = data_max.get('cheapest', -1.0)
+                self.prices["low_flip"][row] = data_max.get('flip', 0.0)
+                self.prices["avg_flip"][row] = data_max.get('flip_avg', 0.0)
+
+            self.dataChanged.emit(self.index(row, 1), self.index(row, last_col))
+
+    def set_show_cheapest(self, show_cheapest):
+        self.show_cheapest = show_cheapest
+        if self.rowCount():
+            self.dataChanged.emit(self.index(0, 1), self.index(self.rowCount() - 1, self.columnCount() - 1))
+
+    def row_info(self, row):
+        return {
+            "id": self.ids[row],
+            "url_name": self.url_names[row],
+            "item_name": self.names[row],
+            "max_rank": self.max_ranks[row]
+        }
+
+    def value(self, row, column):
+        """Raw number shown in a price column for the current price mode."""
+        prefix = "low_" if self.show_cheapest else "avg_"
+        field = {1: "r0", 2: "max", 3: "flip"}[column]
+        return self.prices[prefix + field][row]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.ids)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+
+        if column == 0:
+            if role in (Qt.DisplayRole, SortRole):
+                return self.names[row]
+            return None
+
+        val = self.value(row, column)
+        is_flip = (column == 3)
+
+        if role == Qt.DisplayRole:
+            if is_flip or val > 0:
+                return f"{val:.1f}p"
+            return "..."
+        if role == SortRole:
+            return val if is_flip or val > 0 else -1.0
+        if role == Qt.ForegroundRole and is_flip:
+            if val > 0:
+                return QColor(Qt.green)
+            if val < 0:
+                return QColor(Qt.red)
+            return QColor(Qt.gray)
+        return None
+
+
+class RowFilterProxyModel(QSortFilterProxyModel):
+    """Sorts on SortRole and shows only an explicit set of source rows (None shows everything)."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.visible_rows = None
+        self.setSortRole(SortRole)
+        self.setDynamicSortFilter(True)
+
+    def set_visible_rows(self, rows):
+        self.visible_rows = rows
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return self.visible_rows is None or source_row in self.visible_rows